@@ -0,0 +1,286 @@
+import hashlib
+import json
+import math
+import os
+import time
+from collections.abc import Mapping
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+from .localcache import INVALIDATION_CHANNEL, InvalidationListener, LocalCache, TierCounters, redis_client
+
+# Cada modelo do catálogo tem um contador de geração no cache. As chaves das respostas incluem as gerações
+# dos modelos de que dependem: alterar um modelo incrementa a sua geração e as respostas antigas deixam
+# de ser encontradas (e expiram por `CATALOG_CACHE_TIMEOUT`), sem apagar nem varrer chaves.
+GENERATION_PART = 'part'
+GENERATION_CAR_MODEL = 'car_model'
+GENERATION_FITMENT = 'fitment'
+CATALOG_GENERATIONS = (GENERATION_PART, GENERATION_CAR_MODEL, GENERATION_FITMENT)
+
+# Camada em memória de cada processo na frente do Redis. As gerações locais valem por no máximo
+# `CATALOG_LOCAL_CACHE_TTL` segundos e são descartadas antes disso pelas mensagens de invalidação;
+# as respostas locais, como as do Redis, são indexadas pelas gerações e nunca ficam desatualizadas.
+local_generations = LocalCache()
+local_responses = LocalCache()
+redis_responses = TierCounters()
+invalidation_listener = InvalidationListener(local_generations.delete_many, local_generations.clear)
+
+
+def generation_key(name):
+    return f"catalog:generation:{name}"
+
+
+def modified_key(name):
+    return f"catalog:modified:{name}"
+
+
+# Avança o instante da última alteração de cada chave para max(anterior + 1, agora), em segundos inteiros,
+# numa única operação atômica do Redis
+BUMP_MODIFIED_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    local value = math.max((tonumber(redis.call('GET', key)) or 0) + 1, tonumber(ARGV[1]))
+    redis.call('SET', key, value)
+end
+"""
+
+
+def _bump_modified(names, now):
+    """
+    Registra uma alteração dos modelos `names` no instante `now` (segundos inteiros, como no `Last-Modified`).
+
+    O valor é sempre maior que o anterior, mesmo com duas alterações no mesmo segundo: um cliente que
+    guardou o `Last-Modified` da primeira não recebe 304 para um `If-Modified-Since` depois da segunda.
+    Em rajadas de alterações, o valor pode ficar alguns segundos à frente do relógio.
+    """
+    client = redis_client(cache)
+    if client is not None:
+        client.register_script(BUMP_MODIFIED_SCRIPT)(keys=[cache.make_key(modified_key(name)) for name in names], args=[now])
+        return
+    # Sem o Redis (testes e desenvolvimento), o cache é do próprio processo
+    previous = cache.get_many([modified_key(name) for name in names])
+    cache.set_many(
+        {modified_key(name): max(int(previous.get(modified_key(name), 0)) + 1, now) for name in names}, None
+    )
+
+
+def _initial_generation():
+    # Começa no instante atual (em microssegundos): se o contador for perdido num reinício do Redis,
+    # a nova geração não repete uma já usada por respostas ainda em cache
+    return time.time_ns() // 1000
+
+
+def get_generation_state(names, local=False):
+    """
+    Gerações atuais dos modelos `names`, na mesma ordem, e o instante (timestamp) da alteração mais recente
+    entre eles, com uma única leitura do cache. Cria as gerações que ainda não existem.
+
+    Com `local`, usa primeiro as gerações guardadas no processo (ver `local_generations`).
+    """
+    ttl = settings.CATALOG_LOCAL_CACHE_TTL
+    local = local and ttl > 0
+    if local:
+        invalidation_listener.start(redis_client(cache))
+        states = [local_generations.get(name) for name in names]
+        if all(state is not None for state in states):
+            return _combine_states(states)
+        epoch = local_generations.epoch
+
+    keys = [generation_key(name) for name in names]
+    values = cache.get_many(keys + [modified_key(name) for name in names])
+    missing = [name for name, key in zip(names, keys) if key not in values]
+    if missing:
+        now = math.ceil(time.time())
+        for name in missing:
+            cache.add(generation_key(name), _initial_generation(), None)
+            cache.add(modified_key(name), now, None)
+        values.update(cache.get_many([generation_key(name) for name in missing] + [modified_key(name) for name in missing]))
+    states = [(values.get(generation_key(name)), values.get(modified_key(name))) for name in names]
+    if local:
+        for name, state in zip(names, states):
+            local_generations.set(name, state, ttl, epoch)
+    return _combine_states(states)
+
+
+def _combine_states(states):
+    modified = [state[1] for state in states if state[1] is not None]
+    return tuple(state[0] for state in states), max(modified, default=None)
+
+
+def get_generations(names):
+    """
+    Gerações atuais dos modelos `names`, na mesma ordem, criando as que ainda não existem.
+    """
+    return get_generation_state(names)[0]
+
+
+def bump_generations(*names):
+    """
+    Incrementa (com o INCR atômico do Redis) a geração dos modelos `names`, invalidando as respostas em cache,
+    e registra o instante da alteração, usado no `Last-Modified` (ver `_bump_modified`).
+    """
+    for name in names:
+        try:
+            cache.incr(generation_key(name))
+        except ValueError:
+            cache.add(generation_key(name), _initial_generation(), None)
+    _bump_modified(names, math.ceil(time.time()))
+    # Este processo descarta as gerações locais na hora; os demais, ao receber a mensagem
+    local_generations.delete_many(names)
+    client = redis_client(cache)
+    if client is not None:
+        client.publish(INVALIDATION_CHANNEL, ','.join(names))
+
+
+class PendingGenerations:
+    """
+    Gerações a incrementar no commit de uma transação, registradas num único `on_commit` por transação.
+    """
+
+    def __init__(self):
+        self.names = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        bump_generations(*sorted(self.names))
+
+
+def _pending_generations(connection):
+    # O callback continua na lista enquanto a transação (ou o savepoint em que foi registrado) estiver aberta;
+    # depois de um rollback, sai da lista e a próxima alteração registra outro
+    for _, func, *_ in connection.run_on_commit:
+        if isinstance(func, PendingGenerations) and not func.done:
+            return func
+    return None
+
+
+def invalidate_generations(*names, using=None):
+    """
+    Invalida as respostas dos modelos `names` agora e de novo após o commit da transação atual: uma leitura
+    feita entre as duas, que ainda não enxerga a alteração, fica guardada numa geração já descartada.
+
+    As chamadas são agrupadas por transação: cada modelo é incrementado na primeira alteração e uma vez
+    no commit, com um único `on_commit`, por mais linhas que a transação grave. Fora de uma transação,
+    a alteração já foi confirmada e basta um incremento.
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        bump_generations(*names)
+        return
+    pending = _pending_generations(connection)
+    if pending is None:
+        pending = PendingGenerations()
+        transaction.on_commit(pending, using=using)
+    new_names = [name for name in names if name not in pending.names]
+    if new_names:
+        pending.names.update(new_names)
+        bump_generations(*new_names)
+
+
+def response_cache_key(request, generations):
+    # A URL absoluta entra na chave porque as respostas trazem links absolutos (paginação, car_models_url)
+    params = sorted((key, request.query_params.getlist(key)) for key in request.query_params)
+    raw = json.dumps([request.build_absolute_uri(request.path), params, generations])
+    return f"catalog:response:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+
+def cache_stats():
+    """
+    Acertos e falhas de cada camada do cache neste processo.
+    """
+    return {
+        'pid': os.getpid(),
+        'local': dict(local_responses.stats(), generations=local_generations.stats(), ttl=settings.CATALOG_LOCAL_CACHE_TTL),
+        'redis': redis_responses.stats(),
+        'invalidation': invalidation_listener.stats(),
+    }
+
+
+def detached(data):
+    """
+    Cópia de `data` só com dicionários, listas e valores simples. O `ReturnDict`/`ReturnList` do DRF
+    mantém o serializer (e com ele a requisição, o usuário e as instâncias), que não devem ficar presos
+    na memória do processo. As entradas locais são compartilhadas entre threads e apenas lidas.
+    """
+    if isinstance(data, Mapping):
+        return {key: detached(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [detached(value) for value in data]
+    return data
+
+
+def response_etag(cache_key, request):
+    # Forte: a mesma URL, as mesmas gerações e o mesmo formato (JSON ou API navegável) produzem o mesmo conteúdo
+    raw = f"{cache_key}:{request.accepted_media_type}"
+    return quote_etag(hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32])
+
+
+class CachedResponseMixin:
+    """
+    Guarda no cache os dados das respostas 200 de `list` e `retrieve` por `CATALOG_CACHE_TIMEOUT` segundos.
+
+    A chave combina a URL normalizada (caminho e parâmetros em ordem) com as gerações dos modelos de
+    `get_cache_generations()`. Os dados são guardados antes da renderização, então o mesmo cache atende
+    JSON e a API navegável. As permissões são verificadas antes da consulta ao cache.
+
+    As respostas trazem `ETag` e `Last-Modified` derivados das gerações. Um `If-None-Match` (ou
+    `If-Modified-Since`) que ainda confere retorna 304 sem consultar o banco nem serializar nada.
+
+    As ações de `local_cache_actions` usam também a camada em memória do processo, na frente do Redis.
+    """
+    cache_generations = CATALOG_GENERATIONS
+    local_cache_actions = ()
+
+    def get_cache_generations(self):
+        return self.cache_generations
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        local = self.action in self.local_cache_actions and settings.CATALOG_LOCAL_CACHE_TTL > 0
+        generations, modified = get_generation_state(self.get_cache_generations(), local=local)
+        key = response_cache_key(request, generations)
+        etag = response_etag(key, request)
+        last_modified = int(modified) if modified is not None else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return self._with_validators(response, etag, last_modified)
+
+        timeout = settings.CATALOG_CACHE_TIMEOUT
+        data = self._cached_data(key, timeout, local) if timeout else None
+        if data is not None:
+            return self._with_validators(Response(data), etag, last_modified)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            if timeout:
+                cache.set(key, response.data, timeout)
+                if local:
+                    local_responses.set(key, detached(response.data), timeout)
+            self._with_validators(response, etag, last_modified)
+        return response
+
+    def _cached_data(self, key, timeout, local):
+        if local:
+            data = local_responses.get(key)
+            if data is not None:
+                return data
+        data = cache.get(key)
+        redis_responses.record(data is not None)
+        if data is not None and local:
+            local_responses.set(key, data, timeout)
+        return data
+
+    def _with_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
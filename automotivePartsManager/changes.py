@@ -0,0 +1,156 @@
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import CarModel, Part, PartCarModel, Tombstone
+
+# Cada fonte do feed é lida em ordem de (coluna de tempo, id), usando o índice composto da tabela.
+# A posição na lista desempata registros de fontes diferentes com o mesmo instante.
+ChangeSource = namedtuple('ChangeSource', ['entity', 'model', 'time_field', 'fields'])
+
+CHANGE_SOURCES = (
+    ChangeSource('part', Part, 'updated_at', ('id', 'part_number', 'name', 'details', 'price', 'quantity', 'created_at', 'updated_at')),
+    ChangeSource('car_model', CarModel, 'updated_at', ('id', 'name', 'manufacturer', 'year', 'created_at', 'updated_at')),
+    ChangeSource('fitment', PartCarModel, 'created_at', ('id', 'part_id', 'car_model_id', 'created_at')),
+    ChangeSource('tombstone', Tombstone, 'deleted_at', ('id', 'entity', 'object_id', 'data', 'deleted_at')),
+)
+
+CHANGES_DEFAULT_LIMIT = 500
+CHANGES_MAX_LIMIT = 1000
+
+
+class ExpiredCursor(Exception):
+    """O cursor é mais antigo que a retenção dos tombstones; o cliente deve refazer a carga completa."""
+
+
+def encode_cursor(timestamp, rank, object_id):
+    payload = json.dumps({'t': timestamp.isoformat(), 'r': rank, 'i': object_id})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Decodifica o cursor opaco do feed em `(instante, fonte, id)`. Lança `ValueError` se for inválido.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        timestamp = parse_datetime(payload['t'])
+        rank, object_id = int(payload['r']), int(payload['i'])
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        raise ValueError("Cursor inválido.") from None
+    if timestamp is None or not 0 <= rank < len(CHANGE_SOURCES):
+        raise ValueError("Cursor inválido.")
+    return timestamp, rank, object_id
+
+
+def _after(source, rank, position):
+    # Registros estritamente depois do cursor na ordem (instante, fonte, id)
+    if position is None:
+        return Q()
+    timestamp, cursor_rank, object_id = position
+    field = source.time_field
+    if rank > cursor_rank:
+        return Q(**{f'{field}__gte': timestamp})
+    if rank < cursor_rank:
+        return Q(**{f'{field}__gt': timestamp})
+    return Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'id__gt': object_id})
+
+
+def oldest_open_transaction_start():
+    """
+    Início da transação aberta mais antiga de outra conexão da aplicação ao banco, ou None se não houver
+    nenhuma (ou se o banco não for o PostgreSQL).
+
+    Registros gravados por uma transação ainda aberta (um lote de COPY/upsert, por exemplo) recebem
+    um instante igual ou posterior ao início dela, mas só ficam visíveis no commit. Inclui transações
+    que ainda não gravaram nada, já que o `now()` delas é o instante do início.
+
+    Só contam conexões de clientes com o mesmo usuário do banco da aplicação: processos internos
+    (autovacuum, walsender) e sessões de outros usuários (um `psql` de manutenção ou um backup com
+    `pg_dump`) não gravam no catálogo e não devem segurar o feed.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT min(xact_start) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND usename = current_user AND backend_type = 'client backend' "
+            "AND pid <> pg_backend_pid() AND xact_start IS NOT NULL"
+        )
+        return cursor.fetchone()[0]
+
+
+def _change(source, row, since):
+    if source.entity == 'tombstone':
+        return {'entity': row['entity'], 'action': 'deleted', 'id': row['object_id'],
+                'changed_at': row['deleted_at'], 'data': row['data']}
+    changed_at = row[source.time_field]
+    created = since is None or row['created_at'] > since
+    return {'entity': source.entity, 'action': 'created' if created else 'updated', 'id': row['id'],
+            'changed_at': changed_at, 'data': row}
+
+
+def changes_since(cursor=None, limit=CHANGES_DEFAULT_LIMIT):
+    """
+    Retorna as peças, modelos de carro e associações criados, alterados ou removidos depois do cursor.
+
+    Cada fonte é consultada com uma busca por faixa no índice `(tempo, id)`, limitada a `limit + 1`
+    linhas, então um feed sem alterações custa uma sondagem de índice por tabela. Os registros são
+    intercalados na ordem (instante, fonte, id), que também define o próximo cursor.
+
+    Transações em andamento gravam com um instante anterior ao do commit: um lote grande de importação
+    pode confirmar linhas com o instante do seu início muito depois dele. O feed só entrega alterações
+    anteriores ao início da transação aberta mais antiga (`oldest_open_transaction_start`), então o
+    cursor nunca avança além de linhas que ainda vão aparecer, qualquer que seja a duração da transação.
+    `CHANGES_FEED_LAG_SECONDS` é uma margem adicional para a diferença entre os relógios dos servidores
+    da aplicação e do banco, e o único limite em outros bancos.
+
+    Retorna `(alterações, próximo cursor, há mais alterações, limite)`, em que `limite` é o instante até
+    o qual o feed está completo: alterações posteriores só são entregues nas próximas consultas.
+    Lança `ExpiredCursor` quando o cursor é mais antigo que `CHANGES_TOMBSTONE_RETENTION_DAYS`.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    since = position[0] if position else None
+    now = timezone.now()
+    if since and since < now - timedelta(days=settings.CHANGES_TOMBSTONE_RETENTION_DAYS):
+        raise ExpiredCursor()
+    until = now - timedelta(seconds=settings.CHANGES_FEED_LAG_SECONDS)
+    oldest = oldest_open_transaction_start()
+    if oldest is not None:
+        until = min(until, oldest - timedelta(microseconds=1))
+
+    candidates = []
+    for rank, source in enumerate(CHANGE_SOURCES):
+        field = source.time_field
+        rows = (
+            source.model.objects.filter(_after(source, rank, position), **{f'{field}__lte': until})
+            .order_by(field, 'id')
+            .values(*source.fields)[:limit + 1]
+        )
+        candidates.extend((row[field], rank, row['id'], source, row) for row in rows)
+    candidates.sort(key=lambda candidate: candidate[:3])
+
+    page = candidates[:limit]
+    changes = [_change(source, row, since) for _, _, _, source, row in page]
+    if page:
+        timestamp, rank, object_id = page[-1][:3]
+        next_cursor = encode_cursor(timestamp, rank, object_id)
+    else:
+        next_cursor = cursor
+    return changes, next_cursor, len(candidates) > limit, until
+
+
+def purge_tombstones(retention_days=None):
+    """
+    Remove os tombstones mais antigos que `CHANGES_TOMBSTONE_RETENTION_DAYS`. Retorna a quantidade removida.
+    """
+    retention_days = retention_days if retention_days is not None else settings.CHANGES_TOMBSTONE_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    removed, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return removed
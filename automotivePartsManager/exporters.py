@@ -0,0 +1,199 @@
+import csv
+import hashlib
+import io
+import json
+import tempfile
+import zipfile
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter
+from rest_framework.request import Request
+from .importers import CAR_MODEL_COLUMNS, FITMENT_COLUMNS, PART_COLUMNS, iter_batches
+from .models import CarModel, ExportJob, Part, PartCarModel
+
+EXPORT_FORMAT_CSV = 'csv'
+EXPORT_FORMAT_NDJSON = 'ndjson'
+EXPORT_FORMATS = (EXPORT_FORMAT_CSV, EXPORT_FORMAT_NDJSON)
+
+EXPORT_CONTENT_TYPES = {
+    EXPORT_FORMAT_CSV: 'text/csv',
+    EXPORT_FORMAT_NDJSON: 'application/x-ndjson',
+}
+
+# As colunas de peças seguem o formato do CSV de importação, então o arquivo exportado pode ser reimportado
+PART_EXPORT_COLUMNS = ('id',) + PART_COLUMNS
+CAR_MODEL_EXPORT_COLUMNS = ('id',) + CAR_MODEL_COLUMNS
+# Compatibilidades pelas chaves naturais, no formato do CSV de importação `fitments`
+FITMENT_EXPORT_FIELDS = ('part__part_number', 'car_model__manufacturer', 'car_model__name', 'car_model__year')
+
+# Linhas lidas do cursor e escritas na resposta a cada bloco
+EXPORT_CHUNK_ROWS = 2000
+
+
+def iter_export(queryset, columns, export_format, chunk_size=EXPORT_CHUNK_ROWS, fields=None):
+    """
+    Gera o conteúdo da exportação de um queryset em blocos de bytes, em CSV (com cabeçalho) ou NDJSON.
+
+    As linhas são lidas com `QuerySet.iterator()` como tuplas, sem instanciar models. No PostgreSQL
+    isso usa um cursor no servidor, então a memória usada depende apenas de `chunk_size`,
+    e não da quantidade de linhas exportadas.
+
+    `fields` permite ler campos relacionados (`part__part_number`) exportados com os nomes de `columns`.
+    """
+    rows = queryset.values_list(*(fields or columns)).iterator(chunk_size=chunk_size)
+    if export_format == EXPORT_FORMAT_CSV:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(columns)
+        for batch in iter_batches(rows, chunk_size):
+            writer.writerows(batch)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    else:
+        for batch in iter_batches(rows, chunk_size):
+            yield ''.join(
+                json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+                for row in batch
+            ).encode('utf-8')
+
+
+def part_export_params():
+    from .views import PartViewSet
+    return set(PartViewSet.filterset_fields) | {'search', 'ordering'}
+
+
+def normalize_export_filters(filters):
+    """
+    Valida os filtros de uma exportação e os normaliza para comparação entre pedidos.
+
+    Lança `ValueError` quando há parâmetros que a listagem de peças não aceita ou valores que ela
+    rejeitaria (como `price=abc` ou uma ordenação por campo não permitido), para que o erro seja
+    informado no pedido, e não apenas quando o worker gerar o arquivo.
+    """
+    if not isinstance(filters, dict):
+        raise ValueError("Os filtros devem ser um objeto.")
+    unknown = sorted(set(filters) - part_export_params())
+    if unknown:
+        raise ValueError(f"Filtros inválidos: {', '.join(unknown)}.")
+    normalized = {key: str(value) for key, value in sorted(filters.items()) if value not in (None, '')}
+
+    view = _part_list_view(normalized)
+    queryset = Part.objects.all()
+    filterset = DjangoFilterBackend().get_filterset(view.request, queryset, view)
+    if filterset is not None and not filterset.is_valid():
+        errors = '; '.join(f"{field}: {' '.join(messages)}" for field, messages in filterset.errors.items())
+        raise ValueError(f"Valores de filtro inválidos ({errors}).")
+    ordering_filter = OrderingFilter()
+    terms = [term.strip() for term in normalized.get(ordering_filter.ordering_param, '').split(',') if term.strip()]
+    valid = ordering_filter.remove_invalid_fields(queryset, terms, view, view.request)
+    invalid = [term for term in terms if term not in valid]
+    if invalid:
+        raise ValueError(f"Ordenação inválida: {', '.join(invalid)}.")
+    return normalized
+
+
+def export_filters_hash(export_format, filters):
+    payload = json.dumps({'format': export_format, 'filters': filters}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def find_fresh_export(filters_hash):
+    """
+    Retorna a exportação mais recente com o mesmo formato e filtros criada dentro de
+    `EXPORT_FRESHNESS_SECONDS` que concluiu ou ainda está em andamento.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.EXPORT_FRESHNESS_SECONDS)
+    return (
+        ExportJob.objects.filter(
+            filters_hash=filters_hash, created_at__gte=cutoff, status__in=['pending', 'running', 'done']
+        )
+        .order_by('-created_at')
+        .first()
+    )
+
+
+def filter_parts(filters):
+    """
+    Aplica às peças os mesmos filtros, busca e ordenação de `GET /parts/`, fora de uma requisição HTTP.
+    """
+    return _part_list_view(filters).filter_queryset(Part.objects.all())
+
+
+def _part_list_view(filters):
+    # `PartViewSet` da listagem com `filters` como parâmetros da requisição
+    from .views import PartViewSet
+
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(mutable=True)
+    http_request.GET.update(filters)
+    return PartViewSet(request=Request(http_request), action='list', format_kwarg=None)
+
+
+def _write_entry(archive, name, chunks):
+    with archive.open(name, 'w', force_zip64=True) as entry:
+        for chunk in chunks:
+            entry.write(chunk)
+
+
+def write_catalog_snapshot(job):
+    """
+    Gera o arquivo `.zip` de uma `ExportJob` com as peças filtradas, todos os modelos de carro
+    e as compatibilidades das peças exportadas, um arquivo por tabela.
+
+    O conteúdo é gravado em streaming num arquivo temporário do worker, compactado com deflate,
+    e então salvo em `exports/<id>/catalog.zip`. Retorna o caminho no storage.
+
+    As três tabelas são lidas numa única transação. No PostgreSQL, ela é `REPEATABLE READ, READ ONLY`:
+    todas as consultas enxergam o mesmo snapshot, então as compatibilidades exportadas sempre
+    referenciam peças e modelos de carro presentes no arquivo, mesmo com gravações durante a exportação.
+    """
+    parts = filter_parts(job.filters)
+    fitments = PartCarModel.objects.filter(part__in=parts.order_by().values('id')).order_by('part_id', 'car_model_id')
+    extension = job.export_format
+    connection = connections[parts.db]
+    with tempfile.TemporaryFile() as snapshot:
+        # O nível de isolamento só pode ser definido antes da primeira consulta de uma transação nova
+        isolated = connection.vendor == 'postgresql' and not connection.in_atomic_block
+        with transaction.atomic(using=parts.db), zipfile.ZipFile(snapshot, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            if isolated:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            _write_entry(archive, f"parts.{extension}", iter_export(parts, PART_EXPORT_COLUMNS, job.export_format))
+            _write_entry(
+                archive, f"car_models.{extension}",
+                iter_export(CarModel.objects.all(), CAR_MODEL_EXPORT_COLUMNS, job.export_format),
+            )
+            _write_entry(
+                archive, f"fitments.{extension}",
+                iter_export(fitments, FITMENT_COLUMNS, job.export_format, fields=FITMENT_EXPORT_FIELDS),
+            )
+        snapshot.seek(0)
+        return default_storage.save(f"exports/{job.id}/catalog.zip", File(snapshot))
+
+
+def purge_stale_exports(retention_days=None):
+    """
+    Remove do storage os arquivos de exportações criadas há mais de `UPLOAD_RETENTION_DAYS`.
+
+    Os registros das exportações são mantidos, sem arquivo. Retorna a quantidade de arquivos removidos.
+    """
+    retention_days = retention_days if retention_days is not None else settings.UPLOAD_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    removed = 0
+    for job in ExportJob.objects.filter(created_at__lt=cutoff).exclude(file_path='').iterator():
+        if default_storage.exists(job.file_path):
+            default_storage.delete(job.file_path)
+            removed += 1
+        ExportJob.objects.filter(pk=job.pk).update(file_path='')
+    return removed
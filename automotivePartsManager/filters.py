@@ -0,0 +1,40 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import DecimalField, F
+from django.db.models.functions import Cast
+from rest_framework import filters
+
+# Configuração da busca textual do PostgreSQL correspondente a LANGUAGE_CODE = 'pt-br'
+SEARCH_CONFIG = 'portuguese'
+
+# Tipo da relevância anotada em `search_rank` (ver FullTextSearchFilter)
+SEARCH_RANK_FIELD = DecimalField(max_digits=20, decimal_places=10)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Atende `?search=` com a busca textual do PostgreSQL sobre o `search_vector` da view, indexado com GIN,
+    em vez de `ILIKE '%termo%'` em cada coluna. Os termos aceitam a sintaxe de `websearch_to_tsquery`
+    (aspas para frases, `-` para excluir) e os resultados vêm ordenados pela relevância (`search_rank`),
+    a menos que `?ordering=` seja informado.
+
+    A relevância é convertida de `real` para `numeric`: na paginação por cursor, o valor volta do cursor
+    em JSON e precisa ser comparado por igualdade com o calculado no banco, o que um `real` não garante.
+
+    Em outros bancos, usa a busca por substring do `SearchFilter` em `search_fields`.
+    """
+    search_vector_field = 'search_vector'
+
+    def filter_queryset(self, request, queryset, view):
+        if connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        terms = request.query_params.get(self.search_param, '').replace('\x00', '').strip()
+        if not terms:
+            return queryset
+        query = SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+        return (
+            queryset.filter(**{self.search_vector_field: query})
+            .annotate(search_rank=Cast(SearchRank(F(self.search_vector_field), query), SEARCH_RANK_FIELD))
+            .order_by('-search_rank', 'id')
+        )
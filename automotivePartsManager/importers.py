@@ -0,0 +1,900 @@
+import bz2
+import csv
+import gzip
+import hashlib
+import io
+import lzma
+import os
+import shutil
+import tempfile
+import uuid
+import zipfile
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from collections import deque, namedtuple
+from itertools import islice
+import billiard
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import MD5
+from django.utils import timezone
+from .caching import GENERATION_CAR_MODEL, GENERATION_FITMENT, GENERATION_PART, bump_generations
+from .models import CarModel, ImportJob, ImportShard, Part, PartCarModel, UploadSession
+
+IMPORT_MODE_INSERT = 'insert'
+IMPORT_MODE_UPSERT = 'upsert'
+IMPORT_MODES = (IMPORT_MODE_INSERT, IMPORT_MODE_UPSERT)
+
+IMPORT_KIND_PARTS = 'parts'
+IMPORT_KIND_CAR_MODELS = 'car_models'
+IMPORT_KIND_FITMENTS = 'fitments'
+IMPORT_KINDS = (IMPORT_KIND_PARTS, IMPORT_KIND_CAR_MODELS, IMPORT_KIND_FITMENTS)
+
+# Colunas de cada tipo de CSV, na ordem das tuplas repassadas aos loaders
+PART_COLUMNS = ('part_number', 'name', 'details', 'price', 'quantity')
+CAR_MODEL_COLUMNS = ('name', 'manufacturer', 'year')
+FITMENT_COLUMNS = ('part_number', 'manufacturer', 'name', 'year')
+
+# Formatos compactados aceitos, descompactados em streaming durante a leitura
+DECOMPRESSORS = {
+    '.gz': lambda raw: gzip.GzipFile(fileobj=raw, mode='rb'),
+    '.bz2': bz2.BZ2File,
+    '.xz': lzma.LZMAFile,
+}
+ZIP_SUFFIX = '.zip'
+
+# Limites das colunas, validados antes da gravação para que uma linha inválida não derrube o lote
+PRICE_LIMIT = Decimal(10) ** (Part._meta.get_field('price').max_digits - Part._meta.get_field('price').decimal_places)
+INTEGER_LIMIT = 2 ** 31 - 1
+
+# Campos atualizados quando uma peça com o mesmo part_number já existe (modo upsert)
+UPSERT_UPDATE_FIELDS = ['price', 'quantity', 'details', 'updated_at']
+
+# Quantidade máxima de alterações guardadas como amostra por shard numa simulação (dry_run)
+PREVIEW_SAMPLE_SIZE = 100
+
+# Resultado da gravação de um lote: linhas rejeitadas pelo loader (`{índice: erro}`) e quantidades de linhas
+# inseridas e atualizadas. As demais linhas válidas foram mantidas: já cadastradas (ignoradas pelo
+# `ON CONFLICT DO NOTHING`), idênticas às cadastradas no upsert ou repetidas no lote.
+BatchResult = namedtuple('BatchResult', ['failures', 'inserted', 'updated'])
+
+
+def iter_batches(iterable, size):
+    """
+    Agrupa os itens de um iterável em listas de no máximo `size` elementos.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _suffix(file_path):
+    return os.path.splitext(file_path)[1].lower()
+
+
+def is_compressed(file_path):
+    return _suffix(file_path) in DECOMPRESSORS or _suffix(file_path) == ZIP_SUFFIX
+
+
+def _single_zip_entry(archive):
+    entries = [info for info in archive.infolist() if not info.is_dir()]
+    if len(entries) != 1:
+        raise ValueError("O arquivo .zip deve conter um único arquivo CSV.")
+    return entries[0]
+
+
+def validate_upload(file):
+    """
+    Valida um arquivo enviado antes de salvá-lo. Lança `ValueError` quando o formato não é suportado.
+    """
+    if _suffix(file.name) == ZIP_SUFFIX:
+        try:
+            with zipfile.ZipFile(file) as archive:
+                _single_zip_entry(archive)
+        except zipfile.BadZipFile:
+            raise ValueError("Arquivo .zip inválido.") from None
+        finally:
+            file.seek(0)
+
+
+def store_upload(file):
+    """
+    Salva o arquivo enviado no storage endereçado pelo conteúdo: `uploads/<sha[:2]>/<sha><extensão>`.
+
+    Um arquivo idêntico a outro já armazenado não é gravado de novo.
+    Retorna o par `(file_path, file_hash)`.
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    file_hash = digest.hexdigest()
+
+    file_path = f"uploads/{file_hash[:2]}/{file_hash}{_suffix(file.name)}"
+    if not default_storage.exists(file_path):
+        file_path = default_storage.save(file_path, file)
+    return file_path, file_hash
+
+
+def chunk_path(session, number):
+    return f"{session.chunks_dir}/{number:06d}"
+
+
+def store_chunk(session, number, data):
+    """
+    Salva uma parte de uma sessão de upload no storage. Reenviar a mesma parte substitui a anterior.
+    """
+    file_path = chunk_path(session, number)
+    if default_storage.exists(file_path):
+        default_storage.delete(file_path)
+    default_storage.save(file_path, ContentFile(data))
+
+
+def received_chunks(session):
+    """
+    Retorna os números das partes já recebidas numa sessão de upload, em ordem crescente.
+    """
+    try:
+        _, files = default_storage.listdir(session.chunks_dir)
+    except FileNotFoundError:
+        return []
+    return sorted(int(name) for name in files if name.isdigit())
+
+
+def delete_chunks(session):
+    for number in received_chunks(session):
+        default_storage.delete(chunk_path(session, number))
+
+
+def assemble_upload(session):
+    """
+    Concatena as partes de uma sessão de upload num arquivo temporário do worker e o salva
+    no storage endereçado pelo conteúdo com `store_upload`. Retorna `(file_path, file_hash)`.
+
+    As partes são lidas em streaming, então a memória usada não depende do tamanho do arquivo.
+    Lança `ValueError` quando o arquivo montado não é um formato suportado.
+    """
+    with tempfile.TemporaryFile() as assembled:
+        for number in range(session.total_chunks):
+            with default_storage.open(chunk_path(session, number), 'rb') as chunk:
+                shutil.copyfileobj(chunk, assembled, 1024 * 1024)
+        assembled.seek(0)
+        upload = File(assembled, name=session.filename)
+        validate_upload(upload)
+        return store_upload(upload)
+
+
+def find_duplicate_job(file_hash, kind, mode):
+    """
+    Retorna a importação mais recente do mesmo arquivo, do mesmo tipo e no mesmo modo,
+    que concluiu ou ainda está em andamento. Simulações (dry_run) não contam como importação.
+    """
+    return (
+        ImportJob.objects.filter(
+            file_hash=file_hash, kind=kind, mode=mode, dry_run=False, status__in=['pending', 'running', 'done']
+        )
+        .order_by('-created_at')
+        .first()
+    )
+
+
+def purge_stale_uploads(retention_days=None):
+    """
+    Remove do storage os arquivos enviados cujas importações terminaram há mais de `UPLOAD_RETENTION_DAYS`.
+
+    Um arquivo só é removido se nenhuma importação recente ou em andamento o referenciar.
+    Os registros das importações são mantidos. Retorna a quantidade de arquivos removidos.
+    """
+    retention_days = retention_days if retention_days is not None else settings.UPLOAD_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    in_use = ImportJob.objects.filter(Q(created_at__gte=cutoff) | Q(status__in=['pending', 'running'])).values('file_path')
+    stale_paths = (
+        ImportJob.objects.filter(created_at__lt=cutoff)
+        .exclude(file_path__in=in_use)
+        .order_by()
+        .values_list('file_path', flat=True)
+        .distinct()
+    )
+    removed = 0
+    for file_path in stale_paths.iterator():
+        if default_storage.exists(file_path):
+            default_storage.delete(file_path)
+            removed += 1
+    return removed
+
+
+def purge_stale_upload_sessions(retention_days=None):
+    """
+    Remove as sessões de upload abertas há mais de `UPLOAD_RETENTION_DAYS` e as partes já enviadas.
+
+    Retorna a quantidade de sessões removidas.
+    """
+    retention_days = retention_days if retention_days is not None else settings.UPLOAD_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    removed = 0
+    for session in UploadSession.objects.filter(status='open', created_at__lt=cutoff).iterator():
+        delete_chunks(session)
+        session.delete()
+        removed += 1
+    return removed
+
+
+@contextmanager
+def open_csv_stream(file_path):
+    """
+    Abre o CSV do storage em modo binário, descompactando `.gz`, `.bz2`, `.xz` e `.zip`
+    em streaming, sem expandir o arquivo em disco ou em memória.
+    """
+    suffix = _suffix(file_path)
+    with default_storage.open(file_path, 'rb') as raw:
+        if suffix == ZIP_SUFFIX:
+            with zipfile.ZipFile(raw) as archive, archive.open(_single_zip_entry(archive)) as stream:
+                yield stream
+        elif suffix in DECOMPRESSORS:
+            with DECOMPRESSORS[suffix](raw) as stream:
+                yield stream
+        else:
+            yield raw
+
+
+def iter_csv_records(file_path, start=0, end=None):
+    """
+    Lê o CSV diretamente do storage, linha a linha, sem carregar o arquivo inteiro em memória.
+
+    Gera pares `(linha, offset)`, em que `offset` é a posição em bytes logo após a linha,
+    usada como checkpoint para retomar a importação.
+
+    Com `start`/`end`, lê apenas os registros que começam no intervalo de bytes [start, end),
+    permitindo que vários workers processem partes do mesmo arquivo: um registro com quebras de
+    linha dentro de aspas é lido até o fim, mesmo que ultrapasse `end`. `start` deve ser o início
+    de um registro (como os limites de `record_starts`). O cabeçalho é sempre lido do início do
+    arquivo. Em arquivos compactados, os offsets se referem ao conteúdo descompactado.
+    """
+    with open_csv_stream(file_path) as raw:
+        header = next(csv.reader([raw.readline().decode('utf-8-sig')]), [])
+        if start > 0:
+            # Volta um byte e descarta o resto da linha: se `start` já for início de linha,
+            # só o '\n' anterior é descartado; caso contrário, a linha pertence ao shard anterior.
+            raw.seek(start - 1)
+            raw.readline()
+        position = raw.tell()
+
+        def lines():
+            nonlocal position
+            # Com um número ímpar de aspas lidas, o registro atual continua na próxima linha
+            in_quotes = False
+            while end is None or position < end or in_quotes:
+                line = raw.readline()
+                if not line:
+                    return
+                position += len(line)
+                if line.count(b'"') % 2:
+                    in_quotes = not in_quotes
+                yield line.decode('utf-8')
+
+        # O csv.reader só consome as linhas de que precisa, então `position` aponta
+        # exatamente para o fim do registro recém-lido.
+        for values in csv.reader(lines()):
+            if values:
+                yield dict(zip(header, values)), position
+
+
+def iter_csv_rows(file_path, start=0, end=None):
+    for row, _ in iter_csv_records(file_path, start, end):
+        yield row
+
+
+def record_starts(file_path, start, end, step, block_size=1024 * 1024):
+    """
+    Posições em que começam registros do CSV, para dividir o intervalo [start, end) em partes de
+    cerca de `step` bytes: `start` e, para cada múltiplo de `step`, o primeiro início de registro a
+    partir dele. `start` deve ser o início de um registro.
+
+    Uma quebra de linha só encerra um registro fora de aspas, então o arquivo é lido em blocos desde
+    `start`, acompanhando a paridade das aspas (as escapadas como `""` não a alteram).
+    """
+    starts = [start]
+    target = start + step
+    in_quotes = False
+    with default_storage.open(file_path, 'rb') as raw:
+        raw.seek(start)
+        position = start
+        while target < end:
+            block = raw.read(block_size)
+            if not block:
+                break
+            index = 0
+            while index < len(block) and target < end:
+                # Antes do alvo basta contar as aspas; a busca por um limite começa no byte anterior a ele
+                search_from = target - 1 - position
+                if search_from > index:
+                    stop = min(search_from, len(block))
+                    if block.count(b'"', index, stop) % 2:
+                        in_quotes = not in_quotes
+                    index = stop
+                    continue
+                quote = block.find(b'"', index)
+                newline = block.find(b'\n', index)
+                if newline == -1 and quote == -1:
+                    break
+                if quote != -1 and (newline == -1 or quote < newline):
+                    in_quotes = not in_quotes
+                    index = quote + 1
+                    continue
+                index = newline + 1
+                if not in_quotes:
+                    boundary = position + index
+                    if boundary < end:
+                        starts.append(boundary)
+                    while target <= boundary:
+                        target += step
+            position += len(block)
+    return starts
+
+
+def active_shards(job):
+    """
+    Shards não concluídos de `job` reivindicados por uma tarefa que gravou um lote (ou foi enviada)
+    há menos de `CSV_SHARD_CLAIM_TIMEOUT` segundos.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.CSV_SHARD_CLAIM_TIMEOUT)
+    return job.shards.filter(done=False, claimed_at__gte=cutoff)
+
+
+def plan_shards(file_path, shard_size=None):
+    """
+    Divide o arquivo em intervalos de bytes de cerca de `CSV_SHARD_SIZE` para processamento paralelo.
+
+    Cada intervalo começa num início de registro (ver `record_starts`), então registros com
+    quebras de linha dentro de campos entre aspas nunca são divididos entre dois shards.
+    """
+    # Arquivos compactados não permitem acesso aleatório: são processados num único shard, sem limite final
+    if is_compressed(file_path):
+        return [(0, None)]
+    shard_size = shard_size or settings.CSV_SHARD_SIZE
+    size = default_storage.size(file_path)
+    starts = record_starts(file_path, 0, size, shard_size)
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def _require_columns(row, columns):
+    missing = [column for column in columns if row.get(column) is None]
+    if missing:
+        raise ValueError(f"Colunas ausentes: {', '.join(missing)}.")
+
+
+def _require_text(row, column, model):
+    if not row[column].strip():
+        raise ValueError(f"O campo '{column}' é obrigatório.")
+    max_length = model._meta.get_field(column).max_length
+    if len(row[column]) > max_length:
+        raise ValueError(f"O campo '{column}' deve ter no máximo {max_length} caracteres.")
+    return row[column]
+
+
+def _parse_integer(value, invalid_message, limit_message):
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(invalid_message) from None
+    if abs(number) > INTEGER_LIMIT:
+        raise ValueError(limit_message)
+    return number
+
+
+def parse_part_row(row):
+    """
+    Valida uma linha do CSV de peças e a converte numa tupla tipada na ordem de `PART_COLUMNS`.
+
+    Lança `ValueError` com a descrição do problema quando a linha é inválida.
+    """
+    _require_columns(row, PART_COLUMNS)
+    part_number = _require_text(row, 'part_number', Part)
+    name = _require_text(row, 'name', Part)
+
+    try:
+        price = Decimal(row['price'])
+    except InvalidOperation:
+        raise ValueError("Preço inválido.") from None
+    if not price.is_finite():
+        raise ValueError("Preço inválido.")
+    if price >= PRICE_LIMIT:
+        raise ValueError("O preço excede o valor máximo permitido.")
+    price = price.quantize(Decimal('0.01'))
+    if price <= 0:
+        raise ValueError("O preço deve ser maior que zero.")
+
+    quantity = _parse_integer(
+        row['quantity'], "Quantidade inválida.", "A quantidade excede o valor máximo permitido."
+    )
+    if quantity < 0:
+        raise ValueError("A quantidade não pode ser negativa.")
+
+    return (part_number, name, row['details'], price, quantity)
+
+
+def parse_car_model_row(row):
+    """
+    Valida uma linha do CSV de modelos de carro e a converte numa tupla na ordem de `CAR_MODEL_COLUMNS`.
+    """
+    _require_columns(row, CAR_MODEL_COLUMNS)
+    return (
+        _require_text(row, 'name', CarModel),
+        _require_text(row, 'manufacturer', CarModel),
+        _parse_integer(row['year'], "Ano inválido.", "O ano excede o valor máximo permitido."),
+    )
+
+
+def parse_fitment_row(row):
+    """
+    Valida uma linha do CSV de compatibilidade e a converte numa tupla na ordem de `FITMENT_COLUMNS`.
+    """
+    _require_columns(row, FITMENT_COLUMNS)
+    return (
+        _require_text(row, 'part_number', Part),
+        _require_text(row, 'manufacturer', CarModel),
+        _require_text(row, 'name', CarModel),
+        _parse_integer(row['year'], "Ano inválido.", "O ano excede o valor máximo permitido."),
+    )
+
+
+def save_rejected_rows(job, name, rejected):
+    """
+    Grava as linhas rejeitadas de um lote em `imports/<id>/rejected/<name>.csv`, sem cabeçalho.
+
+    Os arquivos são concatenados, em ordem de nome, no download do relatório de rejeições.
+    Um arquivo de mesmo nome (de uma tentativa anterior do lote) é substituído.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    columns = IMPORTERS[job.kind].columns
+    for row, error in rejected:
+        writer.writerow(['' if row.get(column) is None else row[column] for column in columns] + [error])
+    file_path = f"{job.rejected_rows_dir}/{name}.csv"
+    if default_storage.exists(file_path):
+        default_storage.delete(file_path)
+    return default_storage.save(file_path, ContentFile(buffer.getvalue().encode('utf-8')))
+
+
+def rejected_columns(kind):
+    """
+    Cabeçalho do relatório de linhas rejeitadas de um tipo de importação.
+    """
+    return IMPORTERS[kind].columns + ('error',)
+
+
+def iter_rejected_rows_files(job):
+    """
+    Lista os arquivos de linhas rejeitadas de uma importação, na ordem do arquivo original.
+    """
+    if not default_storage.exists(job.rejected_rows_dir):
+        return []
+    _, files = default_storage.listdir(job.rejected_rows_dir)
+    return [f"{job.rejected_rows_dir}/{name}" for name in sorted(files)]
+
+
+def uses_copy():
+    """
+    Indica se o banco configurado suporta o caminho rápido via `COPY` (PostgreSQL).
+    """
+    return connection.vendor == 'postgresql'
+
+
+def get_batch_size():
+    if uses_copy():
+        return settings.CSV_COPY_BATCH_SIZE
+    return settings.CSV_IMPORT_BATCH_SIZE
+
+
+def _deduplicate(rows):
+    # Um mesmo part_number repetido no lote faria o ON CONFLICT afetar a mesma linha duas vezes,
+    # então prevalece a última ocorrência, como aconteceria numa importação linha a linha.
+    # A ordenação por part_number mantém a mesma ordem de bloqueio entre shards concorrentes.
+    return sorted({row[0]: row for row in rows}.values(), key=lambda row: row[0])
+
+
+def _changed_part_rows(rows):
+    # Linhas de peças novas ou com algum dos campos atualizados pelo upsert diferente do cadastrado,
+    # e quantas delas são de peças novas
+    compared = [field for field in UPSERT_UPDATE_FIELDS if field != 'updated_at']
+    indexes = [PART_COLUMNS.index(field) for field in compared]
+    existing = {
+        values[0]: tuple(values[1:])
+        for values in Part.objects.filter(part_number__in=[row[0] for row in rows]).order_by().values_list(
+            'part_number', *compared
+        )
+    }
+    changed = [row for row in rows if existing.get(row[0]) != tuple(row[index] for index in indexes)]
+    return changed, sum(1 for row in changed if row[0] not in existing)
+
+
+def load_parts_orm(rows, mode=IMPORT_MODE_INSERT):
+    """
+    Grava um lote de peças com `bulk_create`, um único comando por lote.
+
+    - `insert`: insere apenas peças novas; part_numbers já existentes são ignorados.
+    - `upsert`: insere peças novas e atualiza preço, quantidade e detalhes das existentes
+      via `INSERT ... ON CONFLICT (part_number) DO UPDATE`, sem SELECT por linha.
+
+    Como no caminho via `COPY`, peças idênticas às cadastradas não são regravadas, então o `updated_at`
+    (e o feed de alterações) só muda para peças que de fato mudaram. Como o `ON CONFLICT DO UPDATE` do ORM
+    não aceita `WHERE`, elas são descartadas antes, com uma consulta por lote. No modo `insert`, a mesma
+    consulta separa as peças já cadastradas.
+
+    Retorna `(inseridas, atualizadas)`; as demais linhas do lote foram mantidas.
+    """
+    rows = _deduplicate(rows)
+    if mode == IMPORT_MODE_UPSERT:
+        rows, inserted = _changed_part_rows(rows)
+        Part.objects.bulk_create(
+            [Part(**dict(zip(PART_COLUMNS, row))) for row in rows],
+            update_conflicts=True,
+            unique_fields=['part_number'],
+            update_fields=UPSERT_UPDATE_FIELDS,
+        )
+        return inserted, len(rows) - inserted
+    existing = set(
+        Part.objects.filter(part_number__in=[row[0] for row in rows]).order_by().values_list('part_number', flat=True)
+    )
+    parts = [Part(**dict(zip(PART_COLUMNS, row))) for row in rows if row[0] not in existing]
+    # O ON CONFLICT continua necessário para peças gravadas por outro shard depois da consulta
+    Part.objects.bulk_create(parts, ignore_conflicts=True)
+    return len(parts), 0
+
+
+def load_parts_copy(rows, mode=IMPORT_MODE_INSERT):
+    """
+    Grava um lote de peças via `COPY ... FROM STDIN` numa tabela de staging UNLOGGED,
+    seguida de um único `INSERT ... SELECT ... ON CONFLICT` para a tabela de peças.
+
+    A tabela de staging é criada e removida na mesma transação do lote, então uma falha
+    no meio da importação não deixa tabelas órfãs nem lotes gravados pela metade.
+
+    Retorna `(inseridas, atualizadas)`, contadas pelo `RETURNING` do próprio `INSERT`: linhas
+    ignoradas pelo `ON CONFLICT` (peças já cadastradas, ou idênticas no upsert) não são retornadas.
+    """
+    rows = _deduplicate(rows)
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(rows)
+    buffer.seek(0)
+
+    quote_name = connection.ops.quote_name
+    staging = quote_name(f'part_import_staging_{uuid.uuid4().hex}')
+    target = quote_name(Part._meta.db_table)
+    columns = ', '.join(PART_COLUMNS)
+    if mode == IMPORT_MODE_UPSERT:
+        # Linhas idênticas às cadastradas não são regravadas, então o updated_at (e o feed de alterações)
+        # só muda para peças que de fato mudaram
+        compared = [field for field in UPSERT_UPDATE_FIELDS if field != 'updated_at']
+        on_conflict = (
+            'DO UPDATE SET ' + ', '.join(f'{field} = EXCLUDED.{field}' for field in UPSERT_UPDATE_FIELDS)
+            + f' WHERE ({", ".join(f"{target}.{field}" for field in compared)})'
+            + f' IS DISTINCT FROM ({", ".join(f"EXCLUDED.{field}" for field in compared)})'
+        )
+    else:
+        on_conflict = 'DO NOTHING'
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE UNLOGGED TABLE {staging} ('
+            'part_number varchar(50), name varchar(100), details text, '
+            'price numeric(10, 2), quantity integer)'
+        )
+        # FORCE_NOT_NULL faz campos vazios virarem '' em vez de NULL, como no caminho ORM
+        cursor.copy_expert(
+            f'COPY {staging} ({columns}) FROM STDIN '
+            'WITH (FORMAT csv, FORCE_NOT_NULL (part_number, name, details))',
+            buffer,
+        )
+        # xmax = 0 só nas linhas inseridas; nas atualizadas pelo ON CONFLICT, é a transação atual
+        cursor.execute(
+            f'WITH written AS ('
+            f'INSERT INTO {target} ({columns}, created_at, updated_at) '
+            f'SELECT {columns}, now(), now() FROM {staging} '
+            f'ON CONFLICT (part_number) {on_conflict} '
+            f'RETURNING (xmax = 0) AS inserted'
+            f') SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM written'
+        )
+        inserted, updated = cursor.fetchone()
+        cursor.execute(f'DROP TABLE {staging}')
+    return inserted, updated
+
+
+def load_parts(rows, mode=IMPORT_MODE_INSERT):
+    """
+    Grava um lote de tuplas de peças usando `COPY` no PostgreSQL e `bulk_create` nos demais bancos.
+    Retorna `(inseridas, atualizadas)`.
+    """
+    if uses_copy():
+        return load_parts_copy(rows, mode)
+    return load_parts_orm(rows, mode)
+
+
+def load_part_batch(rows, mode):
+    return BatchResult({}, *load_parts(rows, mode))
+
+
+def load_car_models(rows, mode=IMPORT_MODE_INSERT):
+    """
+    Grava um lote de modelos de carro com um único `INSERT ... ON CONFLICT DO NOTHING`.
+
+    Modelos já cadastrados (mesmo fabricante, nome e ano) são ignorados em ambos os modos,
+    já que não há outros campos para atualizar. Eles são separados antes, com uma consulta por lote,
+    para que só os modelos novos sejam contados como inseridos.
+    """
+    car_models = {
+        (manufacturer, name, year): CarModel(name=name, manufacturer=manufacturer, year=year)
+        for name, manufacturer, year in rows
+    }
+    existing = set(
+        CarModel.objects.filter(
+            manufacturer__in={key[0] for key in car_models},
+            name__in={key[1] for key in car_models},
+            year__in={key[2] for key in car_models},
+        ).order_by().values_list('manufacturer', 'name', 'year')
+    )
+    new = [car_models[key] for key in sorted(car_models) if key not in existing]
+    # O ON CONFLICT continua necessário para modelos gravados por outro shard depois da consulta
+    CarModel.objects.bulk_create(new, ignore_conflicts=True)
+    return BatchResult({}, len(new), 0)
+
+
+class FitmentLoader:
+    """
+    Grava lotes de compatibilidade peça/modelo de carro a partir das chaves naturais.
+
+    Os modelos de carro são carregados uma única vez num mapa em memória
+    `(manufacturer, name, year) -> id`; as peças de cada lote são resolvidas com uma
+    única consulta por lote. Pares já existentes são separados com outra consulta por lote e
+    ignorados; as associações novas são inseridas com `ON CONFLICT DO NOTHING`.
+    """
+
+    def __init__(self):
+        self.car_model_ids = None
+
+    def __call__(self, rows, mode=IMPORT_MODE_INSERT):
+        if self.car_model_ids is None:
+            self.car_model_ids = {
+                (manufacturer, name, year): car_model_id
+                for car_model_id, manufacturer, name, year in CarModel.objects.order_by().values_list(
+                    'id', 'manufacturer', 'name', 'year'
+                ).iterator()
+            }
+        part_ids = dict(
+            Part.objects.filter(part_number__in={row[0] for row in rows}).order_by().values_list('part_number', 'id')
+        )
+
+        failures = {}
+        associations = set()
+        for index, (part_number, manufacturer, name, year) in enumerate(rows):
+            part_id = part_ids.get(part_number)
+            car_model_id = self.car_model_ids.get((manufacturer, name, year))
+            if part_id is None:
+                failures[index] = "Peça não encontrada."
+            elif car_model_id is None:
+                failures[index] = "Modelo de carro não encontrado."
+            else:
+                associations.add((part_id, car_model_id))
+
+        associations -= set(
+            PartCarModel.objects.filter(part_id__in={part_id for part_id, _ in associations}).order_by().values_list(
+                'part_id', 'car_model_id'
+            )
+        )
+        PartCarModel.objects.bulk_create(
+            [PartCarModel(part_id=part_id, car_model_id=car_model_id) for part_id, car_model_id in sorted(associations)],
+            ignore_conflicts=True,
+        )
+        return BatchResult(failures, len(associations), 0)
+
+
+def _details_hash(details):
+    return hashlib.md5(details.encode('utf-8')).hexdigest()
+
+
+class PartPreviewLoader:
+    """
+    Simula a gravação de lotes de peças (dry_run) sem alterar a tabela de peças.
+
+    Cada lote é comparado com as peças cadastradas numa única consulta por `part_number`.
+    A comparação usa uma impressão digital da linha (preço, quantidade e hash MD5 dos detalhes,
+    calculado pelo próprio banco), então o texto dos detalhes das peças existentes não trafega.
+    Só entram na comparação os campos que o modo `upsert` atualizaria.
+
+    Os totais de peças que seriam inseridas e atualizadas são devolvidos como na gravação real, e as
+    primeiras `PREVIEW_SAMPLE_SIZE` alterações de cada shard ficam em `preview_changes`.
+    No modo `insert`, peças já existentes seriam ignoradas e contam como mantidas.
+    """
+
+    def __init__(self, job, shard):
+        self.job = job
+        self.shard = shard
+
+    def __call__(self, rows, mode=IMPORT_MODE_INSERT):
+        rows = _deduplicate(rows)
+        existing = {
+            part_number: (price, quantity, details_hash)
+            for part_number, price, quantity, details_hash in Part.objects.filter(
+                part_number__in=[row[0] for row in rows]
+            ).order_by().annotate(details_hash=MD5('details')).values_list(
+                'part_number', 'price', 'quantity', 'details_hash'
+            )
+        }
+
+        inserted = updated = 0
+        changes = []
+        for part_number, _, details, price, quantity in rows:
+            current = existing.get(part_number)
+            if current is None:
+                inserted += 1
+                changes.append(self._change(part_number, 'insert', None, None, price, quantity))
+            elif mode == IMPORT_MODE_UPSERT and current != (price, quantity, _details_hash(details)):
+                updated += 1
+                changes.append(self._change(part_number, 'update', current[0], current[1], price, quantity))
+
+        room = PREVIEW_SAMPLE_SIZE - len(self.shard.preview_changes)
+        if changes and room > 0:
+            self.shard.preview_changes = self.shard.preview_changes + changes[:room]
+            self.shard.save(update_fields=['preview_changes'])
+        return BatchResult({}, inserted, updated)
+
+    @staticmethod
+    def _change(part_number, action, price_before, quantity_before, price_after, quantity_after):
+        return {
+            'part_number': part_number,
+            'action': action,
+            'price_before': None if price_before is None else str(price_before),
+            'price_after': str(price_after),
+            'price_delta': None if price_before is None else str(price_after - price_before),
+            'quantity_before': quantity_before,
+            'quantity_after': quantity_after,
+        }
+
+
+Importer = namedtuple('Importer', ['columns', 'parse_row', 'make_loader', 'batch_size', 'cache_generation'])
+
+# Para cada tipo: colunas do CSV, validação de linha, fábrica do loader de lotes e tamanho do lote.
+# Os loaders recebem tuplas já validadas e retornam {índice no lote: erro} das linhas que não puderam ser gravadas.
+IMPORTERS = {
+    IMPORT_KIND_PARTS: Importer(
+        PART_COLUMNS, parse_part_row, lambda: load_part_batch, get_batch_size, GENERATION_PART
+    ),
+    IMPORT_KIND_CAR_MODELS: Importer(
+        CAR_MODEL_COLUMNS, parse_car_model_row, lambda: load_car_models, lambda: settings.CSV_IMPORT_BATCH_SIZE,
+        GENERATION_CAR_MODEL,
+    ),
+    IMPORT_KIND_FITMENTS: Importer(
+        FITMENT_COLUMNS, parse_fitment_row, FitmentLoader, lambda: settings.CSV_IMPORT_BATCH_SIZE, GENERATION_FITMENT
+    ),
+}
+
+
+def _parse_record(parse_row, row, offset):
+    # A linha original só acompanha as rejeitadas: as válidas seguem apenas como tupla tipada
+    try:
+        return None, parse_row(row), None, offset
+    except ValueError as exc:
+        return row, None, str(exc), offset
+
+
+def _row_from_parsed(columns, parsed):
+    """
+    Reconstrói a linha (dicionário por coluna) de uma tupla tipada, para o relatório de rejeições.
+    """
+    return dict(zip(columns, parsed))
+
+
+def _parse_range(kind, file_path, start, end):
+    # Executada nos processos de validação: lê e valida um bloco do arquivo alinhado a registros completos
+    parse_row = IMPORTERS[kind].parse_row
+    return [_parse_record(parse_row, row, offset) for row, offset in iter_csv_records(file_path, start, end)]
+
+
+def plan_parse_ranges(file_path, start, end, chunk_size=None):
+    """
+    Divide o intervalo de bytes [start, end) em blocos de cerca de `CSV_PARSE_CHUNK_SIZE`,
+    cada um começando num início de registro (ver `record_starts`).
+    """
+    chunk_size = chunk_size or settings.CSV_PARSE_CHUNK_SIZE
+    starts = record_starts(file_path, start, end, chunk_size)
+    return list(zip(starts, starts[1:] + [end])) if start < end else []
+
+
+def iter_parsed_records(job, shard, processes=None):
+    """
+    Lê e valida as linhas de um shard a partir do seu `committed_offset`, na ordem do arquivo.
+
+    Gera tuplas `(linha, tupla_tipada, erro, offset)`, em que apenas um de `tupla_tipada`
+    e `erro` é preenchido. A `linha` original só é preenchida nas linhas rejeitadas.
+
+    Com `CSV_PARSE_PROCESSES` > 1, o shard é dividido em blocos alinhados a registros completos,
+    lidos e validados em paralelo por um pool de processos. Apenas as tuplas já tipadas voltam
+    ao processo da tarefa, que fica livre para gravar os lotes no banco. No máximo dois blocos
+    por processo ficam em andamento, então a memória não depende do tamanho do shard.
+    O pool do `billiard` (usado pelo Celery) é necessário porque os processos do worker são
+    daemons e não podem criar filhos com `multiprocessing`.
+
+    Arquivos compactados não permitem acesso aleatório e são sempre validados no próprio processo.
+    """
+    processes = processes or settings.CSV_PARSE_PROCESSES
+    parse_row = IMPORTERS[job.kind].parse_row
+    if processes <= 1 or is_compressed(job.file_path):
+        for row, offset in iter_csv_records(job.file_path, shard.committed_offset, shard.end):
+            yield _parse_record(parse_row, row, offset)
+        return
+
+    end = shard.end if shard.end is not None else default_storage.size(job.file_path)
+    with billiard.Pool(processes) as pool:
+        pending = deque()
+        for start, chunk_end in plan_parse_ranges(job.file_path, shard.committed_offset, end):
+            pending.append(pool.apply_async(_parse_range, (job.kind, job.file_path, start, chunk_end)))
+            if len(pending) >= processes * 2:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+def import_rows(job, shard, batch_size=None):
+    """
+    Importa as linhas de um shard do CSV de uma `ImportJob` em lotes de tamanho fixo,
+    usando o importador do tipo da importação (peças, modelos de carro ou compatibilidade).
+
+    O consumo de memória depende apenas do tamanho do lote, e não do tamanho do arquivo.
+    A leitura e a validação das linhas ficam em `iter_parsed_records`, que pode usar vários processos.
+    Linhas inválidas são separadas no relatório de rejeições sem impedir a gravação das válidas.
+
+    Cada lote é gravado na mesma transação que atualiza os contadores da importação e o
+    `committed_offset` do shard, então uma nova execução (retry do Celery ou retomada manual)
+    continua do último lote confirmado, sem duplicar nem reprocessar linhas.
+
+    Em simulações (`dry_run`), os lotes são apenas comparados com as peças cadastradas
+    por `PartPreviewLoader`, sem gravar nada na tabela de peças.
+
+    `rows_processed` soma as linhas inseridas ou atualizadas (`rows_inserted` e `rows_updated`), e
+    `rows_unchanged` as mantidas, como as já cadastradas no modo `insert`. Em simulações, as que seriam.
+
+    Cada lote gravado incrementa a geração do modelo importado no cache, invalidando as respostas em cache.
+    Retorna o número de linhas gravadas (ou que seriam gravadas) nesta execução.
+    """
+    importer = IMPORTERS[job.kind]
+    load = PartPreviewLoader(job, shard) if job.dry_run else importer.make_loader()
+    batch_size = batch_size or importer.batch_size()
+    total = 0
+    for batch in iter_batches(iter_parsed_records(job, shard), batch_size):
+        valid = [parsed for _, parsed, error, _ in batch if error is None]
+        rejected = [(row, error) for row, _, error, _ in batch if error is not None]
+
+        with transaction.atomic():
+            failures, inserted, updated = load(valid, job.mode) if valid else BatchResult({}, 0, 0)
+            rejected.extend(
+                (_row_from_parsed(importer.columns, valid[index]), error) for index, error in failures.items()
+            )
+            loaded = inserted + updated
+            if rejected:
+                save_rejected_rows(job, f"{shard.committed_offset:015d}", rejected)
+            ImportJob.objects.filter(pk=job.pk).update(
+                rows_processed=F('rows_processed') + loaded,
+                rows_rejected=F('rows_rejected') + len(rejected),
+                rows_inserted=F('rows_inserted') + inserted,
+                rows_updated=F('rows_updated') + updated,
+                rows_unchanged=F('rows_unchanged') + len(valid) - len(failures) - loaded,
+            )
+            shard.committed_offset = batch[-1][3]
+            # Cada lote renova a reivindicação do shard (ver `ImportShard.claimed_at`)
+            shard.claimed_at = timezone.now()
+            shard.save(update_fields=['committed_offset', 'claimed_at'])
+        # O lote já foi confirmado: as respostas em cache do catálogo passam a refletir as linhas gravadas
+        if loaded and not job.dry_run:
+            bump_generations(importer.cache_generation)
+        total += loaded
+
+    shard.done = True
+    shard.save(update_fields=['done'])
+    return total
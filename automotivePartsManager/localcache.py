@@ -0,0 +1,156 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Canal do Redis em que as gravações anunciam os modelos alterados para os demais processos
+INVALIDATION_CHANNEL = 'catalog:invalidate'
+
+
+class LocalCache:
+    """
+    Cache em memória do processo, com expiração por entrada e descarte do item menos usado recentemente
+    acima de `CATALOG_LOCAL_CACHE_MAX_ENTRIES` entradas. Pode ser usado por várias threads.
+
+    `epoch` muda a cada remoção: quem leu o valor de outra camada antes de uma invalidação passa o `epoch`
+    lido antes da leitura para `set`, que então descarta o valor possivelmente desatualizado.
+    """
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_entries(self):
+        return settings.CATALOG_LOCAL_CACHE_MAX_ENTRIES
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, timeout, epoch=None):
+        with self._lock:
+            if epoch is not None and epoch != self.epoch:
+                return
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            self.epoch += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.epoch += 1
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._data),
+                'max_entries': self.max_entries,
+            }
+
+
+class TierCounters:
+    """
+    Acertos e falhas de uma camada sem armazenamento próprio no processo (o Redis).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+def redis_client(cache):
+    """
+    Cliente do redis-py por trás do cache `cache`, ou None se o backend não for o Redis (como nos testes).
+    """
+    get_client = getattr(getattr(cache, '_cache', None), 'get_client', None)
+    return get_client(write=True) if get_client else None
+
+
+class InvalidationListener:
+    """
+    Thread do processo inscrita em `INVALIDATION_CHANNEL`. Cada mensagem traz nomes separados por vírgula,
+    repassados a `on_message`; a cada (re)conexão, mensagens podem ter sido perdidas e `on_reset` é chamado.
+
+    A thread é iniciada na primeira chamada de `start` em cada processo (também depois de um fork do gunicorn).
+    Enquanto ela estiver desconectada, os dados locais continuam limitados pela expiração das entradas.
+    """
+    reconnect_delay = 1
+
+    def __init__(self, on_message, on_reset):
+        self.on_message = on_message
+        self.on_reset = on_reset
+        self.subscribed = False
+        self.messages = 0
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self, client):
+        if client is None or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.subscribed = False
+            threading.Thread(target=self._run, args=(client,), name='catalog-invalidation', daemon=True).start()
+
+    def _run(self, client):
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                self.on_reset()
+                self.subscribed = True
+                for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    data = message['data']
+                    if isinstance(data, bytes):
+                        data = data.decode('utf-8')
+                    self.messages += 1
+                    self.on_message(data.split(','))
+            except Exception:
+                logger.warning("Conexão de invalidação do cache local perdida; reconectando.", exc_info=True)
+            self.subscribed = False
+            time.sleep(self.reconnect_delay)
+
+    def stats(self):
+        return {'subscribed': self.subscribed, 'messages': self.messages}
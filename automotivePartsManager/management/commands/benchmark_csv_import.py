@@ -0,0 +1,45 @@
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from automotivePartsManager.importers import (
+    IMPORT_MODES, IMPORT_MODE_INSERT, iter_batches, load_parts_copy, load_parts_orm, uses_copy,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a vazão (linhas/s) da importação de peças via COPY e via bulk_create. "
+        "Todas as linhas gravadas são descartadas ao final (rollback)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Quantidade de linhas por caminho.')
+        parser.add_argument('--orm-batch-size', type=int, default=5000, help='Tamanho do lote do caminho ORM.')
+        parser.add_argument('--copy-batch-size', type=int, default=50000, help='Tamanho do lote do caminho COPY.')
+        parser.add_argument('--mode', choices=IMPORT_MODES, default=IMPORT_MODE_INSERT)
+
+    def handle(self, *args, **options):
+        paths = [('orm', load_parts_orm, options['orm_batch_size'])]
+        if uses_copy():
+            paths.append(('copy', load_parts_copy, options['copy_batch_size']))
+        else:
+            self.stdout.write(self.style.WARNING("Banco não é PostgreSQL: caminho COPY ignorado."))
+
+        for label, loader, batch_size in paths:
+            elapsed = self.run_path(label, loader, batch_size, options['rows'], options['mode'])
+            rate = options['rows'] / elapsed if elapsed else 0
+            self.stdout.write(f"{label:>4}: {options['rows']} linhas em {elapsed:.2f}s ({rate:,.0f} linhas/s)")
+
+    def run_path(self, label, loader, batch_size, total_rows, mode):
+        rows = (
+            (f"BENCH-{label}-{i}", f"Peça {i}", f"Detalhes da peça {i}", Decimal('19.90'), i % 500)
+            for i in range(total_rows)
+        )
+        with transaction.atomic():
+            start = time.perf_counter()
+            for batch in iter_batches(rows, batch_size):
+                loader(batch, mode)
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed
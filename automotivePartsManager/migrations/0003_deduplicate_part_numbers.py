@@ -0,0 +1,45 @@
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def deduplicate_part_numbers(apps, schema_editor):
+    """
+    Mantém apenas a peça mais recente de cada part_number antes de criar o índice único.
+
+    As associações com modelos de carro das peças removidas são transferidas para a peça mantida.
+    """
+    Part = apps.get_model('automotivePartsManager', 'Part')
+    PartCarModel = apps.get_model('automotivePartsManager', 'PartCarModel')
+
+    duplicates = (
+        Part.objects.values('part_number')
+        .annotate(total=Count('id'), keep_id=Max('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        removed_ids = list(
+            Part.objects.filter(part_number=duplicate['part_number'])
+            .exclude(id=duplicate['keep_id'])
+            .values_list('id', flat=True)
+        )
+        kept_car_model_ids = set(
+            PartCarModel.objects.filter(part_id=duplicate['keep_id']).values_list('car_model_id', flat=True)
+        )
+        for association in PartCarModel.objects.filter(part_id__in=removed_ids):
+            if association.car_model_id in kept_car_model_ids:
+                continue
+            association.part_id = duplicate['keep_id']
+            association.save(update_fields=['part'])
+            kept_car_model_ids.add(association.car_model_id)
+        Part.objects.filter(id__in=removed_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0002_alter_carmodel_options_alter_part_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_part_numbers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0003_deduplicate_part_numbers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='part',
+            name='part_number',
+            field=models.CharField(max_length=50, unique=True),
+        ),
+    ]
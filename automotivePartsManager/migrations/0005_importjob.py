@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0004_part_part_number_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_path', models.CharField(max_length=255)),
+                ('mode', models.CharField(choices=[('insert', 'Inserir'), ('upsert', 'Inserir ou atualizar')], default='insert', max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('running', 'Em processamento'), ('done', 'Concluída'), ('failed', 'Falhou')], default='pending', max_length=10)),
+                ('total_shards', models.IntegerField(default=1)),
+                ('rows_processed', models.BigIntegerField(default=0)),
+                ('rows_rejected', models.BigIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0005_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.BigIntegerField()),
+                ('end', models.BigIntegerField()),
+                ('committed_offset', models.BigIntegerField()),
+                ('done', models.BooleanField(default=False)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='automotivePartsManager.importjob')),
+            ],
+            options={
+                'ordering': ['job', 'start'],
+            },
+        ),
+    ]
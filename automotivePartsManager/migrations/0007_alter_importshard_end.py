@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0006_importshard'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importshard',
+            name='end',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0007_alter_importshard_end'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='file_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
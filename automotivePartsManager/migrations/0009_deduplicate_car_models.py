@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def deduplicate_car_models(apps, schema_editor):
+    """
+    Mantém apenas o modelo de carro mais recente de cada (manufacturer, name, year) antes de criar a restrição única.
+
+    As associações com peças dos modelos removidos são transferidas para o modelo mantido.
+    """
+    CarModel = apps.get_model('automotivePartsManager', 'CarModel')
+    PartCarModel = apps.get_model('automotivePartsManager', 'PartCarModel')
+
+    duplicates = (
+        CarModel.objects.values('manufacturer', 'name', 'year')
+        .annotate(total=Count('id'), keep_id=Max('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        removed_ids = list(
+            CarModel.objects.filter(
+                manufacturer=duplicate['manufacturer'], name=duplicate['name'], year=duplicate['year']
+            )
+            .exclude(id=duplicate['keep_id'])
+            .values_list('id', flat=True)
+        )
+        kept_part_ids = set(
+            PartCarModel.objects.filter(car_model_id=duplicate['keep_id']).values_list('part_id', flat=True)
+        )
+        for association in PartCarModel.objects.filter(car_model_id__in=removed_ids):
+            if association.part_id in kept_part_ids:
+                continue
+            association.car_model_id = duplicate['keep_id']
+            association.save(update_fields=['car_model'])
+            kept_part_ids.add(association.part_id)
+        CarModel.objects.filter(id__in=removed_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0008_importjob_file_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_car_models, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0009_deduplicate_car_models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='kind',
+            field=models.CharField(choices=[('parts', 'Peças'), ('car_models', 'Modelos de carro'), ('fitments', 'Compatibilidade peça/modelo de carro')], default='parts', max_length=10),
+        ),
+        migrations.AddConstraint(
+            model_name='carmodel',
+            constraint=models.UniqueConstraint(fields=('manufacturer', 'name', 'year'), name='unique_car_model_natural_key'),
+        ),
+    ]
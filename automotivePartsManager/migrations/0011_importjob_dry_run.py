@@ -0,0 +1,38 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0010_carmodel_unique_natural_key_importjob_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='dry_run',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_inserted',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_unchanged',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_updated',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importshard',
+            name='preview_changes',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
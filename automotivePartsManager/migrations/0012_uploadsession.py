@@ -0,0 +1,33 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0011_importjob_dry_run'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=255)),
+                ('kind', models.CharField(choices=[('parts', 'Peças'), ('car_models', 'Modelos de carro'), ('fitments', 'Compatibilidade peça/modelo de carro')], default='parts', max_length=10)),
+                ('mode', models.CharField(choices=[('insert', 'Inserir'), ('upsert', 'Inserir ou atualizar')], default='insert', max_length=10)),
+                ('dry_run', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('open', 'Recebendo partes'), ('finalized', 'Finalizada')], default='open', max_length=10)),
+                ('total_chunks', models.IntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('job', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_session', to='automotivePartsManager.importjob')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:47
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0013_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('part', 'Peça'), ('car_model', 'Modelo de carro'), ('fitment', 'Compatibilidade peça/modelo de carro')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('data', models.JSONField(default=dict)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['deleted_at', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='carmodel',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='carmodel',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='part',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='partcarmodel',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='carmodel',
+            index=models.Index(fields=['updated_at', 'id'], name='carmodel_updated_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='part',
+            index=models.Index(fields=['updated_at', 'id'], name='part_updated_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='partcarmodel',
+            index=models.Index(fields=['created_at', 'id'], name='partcarmodel_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_at_id_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:03
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# part_number sem stemming ('simple'); nome e detalhes com a configuração em português (LANGUAGE_CODE = 'pt-br').
+# O peso A faz o part_number e o nome pesarem mais que os detalhes no ranking.
+CREATE_SEARCH_TRIGGER = """
+CREATE FUNCTION part_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.part_number, '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce(NEW.details, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER part_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF part_number, name, details, search_vector ON {table}
+    FOR EACH ROW EXECUTE FUNCTION part_search_vector_update();
+
+UPDATE {table} SET search_vector = NULL;
+
+CREATE INDEX part_search_vector_idx ON {table} USING gin (search_vector);
+"""
+
+DROP_SEARCH_TRIGGER = """
+DROP INDEX IF EXISTS part_search_vector_idx;
+DROP TRIGGER IF EXISTS part_search_vector_trigger ON {table};
+DROP FUNCTION IF EXISTS part_search_vector_update();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    """
+    Cria o trigger que mantém `search_vector` em qualquer escrita (ORM, COPY ou upsert da importação),
+    preenche as peças existentes e cria o índice GIN. Apenas no PostgreSQL.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Part = apps.get_model('automotivePartsManager', 'Part')
+    schema_editor.execute(CREATE_SEARCH_TRIGGER.format(table=schema_editor.quote_name(Part._meta.db_table)))
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Part = apps.get_model('automotivePartsManager', 'Part')
+    schema_editor.execute(DROP_SEARCH_TRIGGER.format(table=schema_editor.quote_name(Part._meta.db_table)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0014_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='part',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
@@ -0,0 +1,43 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# As expressões devem ser idênticas às usadas em suggestions.suggest_parts
+CREATE_TRIGRAM_INDEXES = """
+CREATE INDEX part_number_normalized_trgm_idx ON {table}
+    USING gin ((UPPER(REGEXP_REPLACE(part_number, '[^[:alnum:]]', '', 'g'))) gin_trgm_ops);
+CREATE INDEX part_name_lower_trgm_idx ON {table} USING gin ((LOWER(name)) gin_trgm_ops);
+"""
+
+DROP_TRIGRAM_INDEXES = """
+DROP INDEX IF EXISTS part_number_normalized_trgm_idx;
+DROP INDEX IF EXISTS part_name_lower_trgm_idx;
+"""
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Cria os índices GIN de trigramas do `part_number` normalizado e do nome em minúsculas. Apenas no PostgreSQL.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Part = apps.get_model('automotivePartsManager', 'Part')
+    schema_editor.execute(CREATE_TRIGRAM_INDEXES.format(table=schema_editor.quote_name(Part._meta.db_table)))
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_TRIGRAM_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0015_part_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
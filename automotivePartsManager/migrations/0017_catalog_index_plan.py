@@ -0,0 +1,49 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0016_part_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='partcarmodel',
+            options={'ordering': ['part_id', 'car_model_id']},
+        ),
+        migrations.AddIndex(
+            model_name='carmodel',
+            index=models.Index(fields=['name'], name='carmodel_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carmodel',
+            index=models.Index(fields=['year'], name='carmodel_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='part',
+            index=models.Index(fields=['name', 'id'], name='part_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='part',
+            index=models.Index(fields=['price', 'id'], name='part_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='partcarmodel',
+            index=models.Index(fields=['car_model', 'part'], name='fitment_car_model_part_idx'),
+        ),
+        # Os índices simples das chaves estrangeiras só são removidos depois de criado o índice composto
+        migrations.AlterField(
+            model_name='partcarmodel',
+            name='car_model',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='automotivePartsManager.carmodel'),
+        ),
+        migrations.AlterField(
+            model_name='partcarmodel',
+            name='part',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='automotivePartsManager.part'),
+        ),
+    ]
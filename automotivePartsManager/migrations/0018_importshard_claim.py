@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automotivePartsManager', '0017_catalog_index_plan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importshard',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importshard',
+            name='claimed_by',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
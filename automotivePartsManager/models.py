@@ -1,5 +1,9 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, router, transaction
+from django.db.models.deletion import Collector
+from django.utils import timezone
+from .caching import GENERATION_CAR_MODEL, GENERATION_FITMENT, GENERATION_PART, invalidate_generations
 
 class UserManager(BaseUserManager):
     def create_user(self, email, username, password=None, role='user'):
@@ -35,38 +39,352 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.role})"
 
-class Part(models.Model):
-    part_number = models.CharField(max_length=50, blank=False)
+class TombstoneCollector(Collector):
+    """
+    Coletor de remoções dos modelos do catálogo. Registra de uma vez, com um único INSERT, um tombstone
+    para cada peça, modelo de carro ou associação removida (inclusive em cascata), para o feed de
+    alterações (`GET /changes/`), e invalida uma vez as respostas em cache de cada modelo afetado.
+
+    Sem sinais de remoção, as associações removidas em cascata continuam sendo apagadas com um único
+    DELETE (fast delete); seus tombstones vêm de uma consulta antes dele.
+    """
+
+    def delete(self):
+        tombstones = []
+        for model, instances in self.data.items():
+            if issubclass(model, CatalogModel):
+                fields = model.TOMBSTONE_FIELDS
+                tombstones += [
+                    model.tombstone(instance.pk, {field: getattr(instance, field) for field in fields})
+                    for instance in instances
+                ]
+        for queryset in self.fast_deletes:
+            model = queryset.model
+            if issubclass(model, CatalogModel):
+                fields = model.TOMBSTONE_FIELDS
+                tombstones += [
+                    model.tombstone(values[0], dict(zip(fields, values[1:])))
+                    for values in queryset.values_list('pk', *fields)
+                ]
+        with transaction.atomic(using=self.using, savepoint=False):
+            result = super().delete()
+            Tombstone.objects.using(self.using).bulk_create(tombstones)
+        generations = {
+            model.CACHE_GENERATION
+            for model in [*self.data, *(queryset.model for queryset in self.fast_deletes)]
+            if issubclass(model, CatalogModel)
+        }
+        if generations:
+            invalidate_generations(*sorted(generations))
+        return result
+
+
+class CatalogQuerySet(models.QuerySet):
+    def delete(self):
+        # Mesmo fluxo de QuerySet.delete, com o TombstoneCollector no lugar do Collector
+        self._not_support_combined_queries('delete')
+        if self.query.is_sliced:
+            raise TypeError("Cannot use 'limit' or 'offset' with delete().")
+        if self.query.distinct or self.query.distinct_fields:
+            raise TypeError("Cannot call delete() after .distinct().")
+        if self._fields is not None:
+            raise TypeError("Cannot call delete() after .values() or .values_list()")
+
+        del_query = self._chain()
+        del_query._for_write = True
+        del_query.query.select_for_update = False
+        del_query.query.select_related = False
+        del_query.query.clear_ordering(force=True)
+
+        collector = TombstoneCollector(using=del_query.db, origin=self)
+        collector.collect(del_query)
+        deleted, rows_count = collector.delete()
+        self._result_cache = None
+        return deleted, rows_count
+
+    delete.alters_data = True
+
+
+class CatalogModel(models.Model):
+    """
+    Base dos modelos do catálogo, cujas remoções (`delete()` da instância ou do QuerySet) passam pelo
+    `TombstoneCollector`. `TOMBSTONE_FIELDS` formam a chave natural guardada no tombstone.
+    """
+    TOMBSTONE_ENTITY = None
+    TOMBSTONE_FIELDS = ()
+    CACHE_GENERATION = None
+
+    objects = CatalogQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def tombstone(cls, pk, data):
+        return Tombstone(entity=cls.TOMBSTONE_ENTITY, object_id=pk, data=data)
+
+    def delete(self, using=None, keep_parents=False):
+        if self.pk is None:
+            raise ValueError(f"{self._meta.object_name} não pode ser removido sem {self._meta.pk.attname}.")
+        using = using or router.db_for_write(self.__class__, instance=self)
+        collector = TombstoneCollector(using=using, origin=self)
+        collector.collect([self], keep_parents=keep_parents)
+        return collector.delete()
+
+    delete.alters_data = True
+
+class Part(CatalogModel):
+    TOMBSTONE_ENTITY = 'part'
+    TOMBSTONE_FIELDS = ('part_number',)
+    CACHE_GENERATION = GENERATION_PART
+
+
+    part_number = models.CharField(max_length=50, blank=False, unique=True)
     name = models.CharField(max_length=100, blank=False)
     details = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2, blank=False)
     quantity = models.IntegerField(blank=False, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Documento da busca textual (part_number, nome e detalhes), preenchido por trigger no PostgreSQL
+    # e indexado com GIN pela migração 0015_part_search_vector
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Ordenação padrão, paginação por cursor (name, id), filtro por nome e exportação
+            models.Index(fields=['name', 'id'], name='part_name_id_idx'),
+            # Ordenação e filtro por preço
+            models.Index(fields=['price', 'id'], name='part_price_id_idx'),
+            # Feed de alterações: busca por (updated_at, id) a partir do cursor
+            models.Index(fields=['updated_at', 'id'], name='part_updated_at_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.part_number})"
     
-class CarModel(models.Model):
+class CarModel(CatalogModel):
+    TOMBSTONE_ENTITY = 'car_model'
+    TOMBSTONE_FIELDS = ('manufacturer', 'name', 'year')
+    CACHE_GENERATION = GENERATION_CAR_MODEL
+
     name = models.CharField(max_length=255, blank=False)
     manufacturer = models.CharField(max_length=255, blank=False)
     year = models.IntegerField(blank=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['manufacturer', 'name', 'year']
+        constraints = [
+            models.UniqueConstraint(fields=['manufacturer', 'name', 'year'], name='unique_car_model_natural_key'),
+        ]
+        # A restrição única (manufacturer, name, year) atende a ordenação padrão e o filtro por fabricante
+        indexes = [
+            models.Index(fields=['name'], name='carmodel_name_idx'),
+            models.Index(fields=['year'], name='carmodel_year_idx'),
+            models.Index(fields=['updated_at', 'id'], name='carmodel_updated_at_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.manufacturer} {self.name} ({self.year})"
     
-class PartCarModel(models.Model):
-    part = models.ForeignKey(Part, on_delete=models.CASCADE)
-    car_model = models.ForeignKey(CarModel, on_delete=models.CASCADE)
+class PartCarModel(CatalogModel):
+    TOMBSTONE_ENTITY = 'fitment'
+    TOMBSTONE_FIELDS = ('part_id', 'car_model_id')
+    CACHE_GENERATION = GENERATION_FITMENT
+
+    # Os índices compostos abaixo começam por cada chave estrangeira, então os índices simples não são criados
+    part = models.ForeignKey(Part, on_delete=models.CASCADE, db_index=False)
+    car_model = models.ForeignKey(CarModel, on_delete=models.CASCADE, db_index=False)
+    # Associações não são editadas, apenas criadas ou removidas
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        # O índice único (part, car_model) atende a listagem e os modelos de carro de uma peça
         unique_together = ("part", "car_model")
-        ordering = ['part', 'car_model']
+        # Pelos ids, e não pela ordenação de Part e CarModel, que exigiria JOIN e ordenação em memória
+        ordering = ['part_id', 'car_model_id']
+        indexes = [
+            # Peças de um modelo de carro, já na ordem de part_id
+            models.Index(fields=['car_model', 'part'], name='fitment_car_model_part_idx'),
+            models.Index(fields=['created_at', 'id'], name='partcarmodel_created_at_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.part.name} - {self.car_model.name}"
+
+
+class Tombstone(models.Model):
+    """
+    Registro de uma peça, modelo de carro ou associação removida, exposto no feed de alterações.
+    """
+    ENTITY_CHOICES = (
+        ('part', 'Peça'),
+        ('car_model', 'Modelo de carro'),
+        ('fitment', 'Compatibilidade peça/modelo de carro'),
+    )
+
+    entity = models.CharField(max_length=10, choices=ENTITY_CHOICES)
+    object_id = models.BigIntegerField()
+    # Chave natural do registro removido (part_number; fabricante, nome e ano; ids da associação)
+    data = models.JSONField(default=dict)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_at_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity} {self.object_id} removido em {self.deleted_at}"
+
+class ImportJob(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pendente'),
+        ('running', 'Em processamento'),
+        ('done', 'Concluída'),
+        ('failed', 'Falhou'),
+    )
+    MODE_CHOICES = (
+        ('insert', 'Inserir'),
+        ('upsert', 'Inserir ou atualizar'),
+    )
+    KIND_CHOICES = (
+        ('parts', 'Peças'),
+        ('car_models', 'Modelos de carro'),
+        ('fitments', 'Compatibilidade peça/modelo de carro'),
+    )
+
+    file_path = models.CharField(max_length=255)
+    # SHA-256 do arquivo enviado; identifica reenvios de arquivos idênticos
+    file_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='parts')
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='insert')
+    # Simulação: compara o arquivo com as peças cadastradas sem gravar nada
+    dry_run = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total_shards = models.IntegerField(default=1)
+    # Linhas inseridas ou atualizadas (rows_inserted + rows_updated)
+    rows_processed = models.BigIntegerField(default=0)
+    rows_rejected = models.BigIntegerField(default=0)
+    # Linhas inseridas, atualizadas ou mantidas (já cadastradas ou sem alterações); na simulação (dry_run), as que seriam
+    rows_inserted = models.BigIntegerField(default=0)
+    rows_updated = models.BigIntegerField(default=0)
+    rows_unchanged = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(CustomUser, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Importação {self.id} ({self.status})"
+
+    @property
+    def elapsed_seconds(self):
+        if not self.started_at:
+            return 0
+        return ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+
+    @property
+    def rows_per_second(self):
+        elapsed = self.elapsed_seconds
+        if not elapsed:
+            return 0
+        return (self.rows_processed + self.rows_unchanged + self.rows_rejected) / elapsed
+
+    @property
+    def rejected_rows_dir(self):
+        return f"imports/{self.id}/rejected"
+
+    def preview_sample(self, limit):
+        """
+        Amostra das alterações encontradas pela simulação, na ordem do arquivo.
+        """
+        sample = []
+        for changes in self.shards.values_list('preview_changes', flat=True):
+            sample.extend(changes[:limit - len(sample)])
+            if len(sample) >= limit:
+                break
+        return sample
+
+class ImportShard(models.Model):
+    job = models.ForeignKey(ImportJob, related_name='shards', on_delete=models.CASCADE)
+    start = models.BigIntegerField()
+    # Nulo em arquivos compactados, lidos até o fim num único shard
+    end = models.BigIntegerField(null=True, blank=True)
+    # Posição (em bytes) logo após o último lote gravado; a importação é retomada a partir daqui
+    committed_offset = models.BigIntegerField()
+    done = models.BooleanField(default=False)
+    # Tarefa do Celery que processa o shard e o instante do seu último lote gravado. Um shard reivindicado
+    # há menos de `CSV_SHARD_CLAIM_TIMEOUT` segundos não é enviado de novo por outra execução de `process_csv`
+    claimed_by = models.CharField(max_length=255, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # Amostra das alterações encontradas neste shard numa simulação (dry_run)
+    preview_changes = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        ordering = ['job', 'start']
+
+    def __str__(self):
+        return f"Shard {self.start}-{self.end} da importação {self.job_id}"
+
+class UploadSession(models.Model):
+    STATUS_CHOICES = (
+        ('open', 'Recebendo partes'),
+        ('finalized', 'Finalizada'),
+    )
+
+    # Nome original do arquivo; a extensão define a descompactação (.gz, .bz2, .xz, .zip)
+    filename = models.CharField(max_length=255)
+    kind = models.CharField(max_length=10, choices=ImportJob.KIND_CHOICES, default='parts')
+    mode = models.CharField(max_length=10, choices=ImportJob.MODE_CHOICES, default='insert')
+    dry_run = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    # Informado na finalização; as partes são numeradas de 0 a total_chunks - 1
+    total_chunks = models.IntegerField(null=True, blank=True)
+    job = models.OneToOneField(ImportJob, null=True, blank=True, related_name='upload_session', on_delete=models.SET_NULL)
+    created_by = models.ForeignKey(CustomUser, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Sessão de upload {self.id} ({self.status})"
+
+    @property
+    def chunks_dir(self):
+        return f"uploads/sessions/{self.id}"
+
+class ExportJob(models.Model):
+    STATUS_CHOICES = ImportJob.STATUS_CHOICES
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    )
+
+    export_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv')
+    # Filtros, busca e ordenação aplicados às peças, no formato dos parâmetros de `GET /parts/`
+    filters = models.JSONField(default=dict, blank=True)
+    # SHA-256 do formato e dos filtros normalizados; identifica pedidos idênticos
+    filters_hash = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file_path = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(CustomUser, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.part.name} - {self.car_model.name}"
\ No newline at end of file
+        return f"Exportação {self.id} ({self.status})"
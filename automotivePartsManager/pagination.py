@@ -0,0 +1,289 @@
+import base64
+import binascii
+import json
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Estimativa do planejador do PostgreSQL para a quantidade de linhas do queryset, sem percorrê-las:
+    `pg_class.reltuples` para a tabela inteira ou, com filtros, as linhas previstas pelo `EXPLAIN`.
+    Retorna `None` em outros bancos.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+            # -1: tabela ainda não analisada pelo ANALYZE/autovacuum; usa o EXPLAIN
+            if row and row[0] >= 0:
+                return row[0]
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedPage(Page):
+    def has_next(self):
+        return self.has_more
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginador que usa a estimativa do planejador (`estimate_count`) como total quando ela passa de
+    `COUNT_ESTIMATE_THRESHOLD`, e o `COUNT(*)` exato abaixo disso. `count_is_exact` indica qual foi usado.
+
+    Como a estimativa pode errar para mais ou para menos, com total estimado a existência da próxima
+    página é conferida buscando uma linha a mais, e não pelo total.
+    """
+    count_is_exact = True
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < settings.COUNT_ESTIMATE_THRESHOLD:
+            return super().count
+        self.count_is_exact = False
+        return estimate
+
+    def validate_number(self, number):
+        self.count  # Define count_is_exact
+        if self.count_is_exact:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("O número da página não é um inteiro.")
+        if number < 1:
+            raise EmptyPage("O número da página é menor que 1.")
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.count_is_exact:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage("Esta página não contém resultados.")
+        page = EstimatedPage(object_list[:self.per_page], number, self)
+        page.has_more = len(object_list) > self.per_page
+        return page
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por cursor (keyset): cada página é uma busca por faixa a partir da última linha
+    da página anterior, `WHERE (name, id) > (...) ORDER BY name, id LIMIT n`, sem `COUNT(*)` e sem
+    `OFFSET`. O custo de uma página não depende da sua profundidade.
+
+    A ordenação vem de `?ordering=` (com o id como desempate) ou, sem ele, do atributo
+    `keyset_ordering` da view, que deve identificar cada linha de forma única.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+
+        position, self.reverse = self.decode_cursor(request)
+        if self.reverse:
+            queryset = queryset.order_by(*[self._order_expression(field, not desc) for field, desc in self.ordering])
+        else:
+            queryset = queryset.order_by(*[self._order_expression(field, desc) for field, desc in self.ordering])
+        if position is not None:
+            queryset = queryset.filter(self._after(position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+        self.position = position
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, settings.PAGINATION_MAX_PAGE_SIZE)
+
+    def get_ordering(self, queryset, view):
+        # Ordenação escolhida pelo OrderingFilter, completada com o id para desempatar
+        requested = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if requested:
+            ordering = [(field.lstrip('-'), field.startswith('-')) for field in requested]
+            if not any(field in ('id', 'pk') for field, _ in ordering):
+                ordering.append(('id', False))
+            return ordering
+        return [(field, False) for field in getattr(view, 'keyset_ordering', ('id',))]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param, 'required': False, 'in': 'query',
+                'description': 'Cursor da página (links `next` e `previous`).', 'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param, 'required': False, 'in': 'query',
+                'description': f'Itens por página (máximo: {settings.PAGINATION_MAX_PAGE_SIZE}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._position(self.page[-1]) if self.page else self.position
+        return self.encode_cursor(position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._position(self.page[0]) if self.page else self.position
+        return self.encode_cursor(position, reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps(
+            {'o': [f"{'-' if desc else ''}{field}" for field, desc in self.ordering], 'p': position, 'r': reverse},
+            cls=DjangoJSONEncoder,
+        )
+        cursor = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """
+        Decodifica o cursor em `(valores da última linha, sentido inverso)`. Lança `ParseError` se for inválido
+        ou se a ordenação mudou desde a página anterior.
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            ordering, position, reverse = payload['o'], payload['p'], bool(payload['r'])
+        except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+            raise ParseError("Cursor inválido.") from None
+        expected = [f"{'-' if desc else ''}{field}" for field, desc in self.ordering]
+        if ordering != expected or not isinstance(position, list) or len(position) != len(expected):
+            raise ParseError("Cursor inválido.")
+        return position, reverse
+
+    def _order_expression(self, field, desc):
+        return f"-{field}" if desc else field
+
+    def _position(self, obj):
+        values = []
+        for field, _ in self.ordering:
+            value = obj
+            for attr in field.split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+        return values
+
+    def _after(self, position):
+        # Comparação lexicográfica (a, b, c) > (x, y, z) expandida em
+        # a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z).
+        # O limite a >= x na primeira coluna permite a busca por faixa no índice.
+        condition = Q()
+        equal = Q()
+        for (field, desc), value in zip(self.ordering, position):
+            forward = desc == self.reverse
+            condition |= equal & Q(**{f"{field}__{'gt' if forward else 'lt'}": value})
+            equal &= Q(**{field: value})
+        field, desc = self.ordering[0]
+        bound = Q(**{f"{field}__{'gte' if desc == self.reverse else 'lte'}": position[0]})
+        return bound & condition
+
+
+class CatalogPagination(PageNumberPagination):
+    """
+    Paginação das listagens do catálogo: por número de página (padrão, com `count`) ou, com
+    `?pagination=cursor` ou `?cursor=`, por cursor (`KeysetPagination`), de custo constante em
+    qualquer profundidade.
+
+    Em views com `estimated_count = True`, o `count` da paginação por número de página vem de
+    `EstimatedCountPaginator` e a resposta inclui `count_is_exact`.
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if request.query_params.get('pagination') == 'cursor' or self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.estimated_count = getattr(view, 'estimated_count', False)
+        if self.estimated_count:
+            self.django_paginator_class = EstimatedCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        if not self.estimated_count:
+            return super().get_paginated_response(data)
+        return Response({
+            'count': self.page.paginator.count,
+            'count_is_exact': self.page.paginator.count_is_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_exact'] = {'type': 'boolean'}
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append({
+            'name': 'pagination', 'required': False, 'in': 'query',
+            'description': '`cursor` para paginar por cursor, sem `count`.', 'schema': {'type': 'string'},
+        })
+        return parameters + self.keyset_class().get_schema_operation_parameters(view)
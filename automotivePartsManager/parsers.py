@@ -0,0 +1,10 @@
+from rest_framework.parsers import BaseParser
+
+class RawChunkParser(BaseParser):
+    """
+    Entrega o corpo da requisição sem processamento, para o envio de partes de arquivos.
+    """
+    media_type = 'application/octet-stream'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream
@@ -1,5 +1,7 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import CustomUser, Part, CarModel, PartCarModel
+from .importers import IMPORT_KIND_PARTS, PREVIEW_SAMPLE_SIZE, received_chunks
+from .models import CustomUser, Part, CarModel, PartCarModel, ImportJob, UploadSession, ExportJob
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -24,7 +26,15 @@ class UserSerializer(serializers.ModelSerializer):
 class PartListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Part
-        fields = ('name', 'details', 'price', 'quantity')
+        fields = ('part_number', 'name', 'details', 'price', 'quantity')
+
+    def get_extra_kwargs(self):
+        # part_number é obrigatório e único: ausente, vazio ou duplicado retorna 400. Numa atualização (PUT)
+        # pode ser omitido, mantendo o atual da peça
+        extra_kwargs = super().get_extra_kwargs()
+        if self.instance is not None:
+            extra_kwargs['part_number'] = dict(extra_kwargs.get('part_number', {}), required=False)
+        return extra_kwargs
     
     def validate_price(self, value):
         if value <= 0:
@@ -41,12 +51,47 @@ class CarModelSerializer(serializers.ModelSerializer):
         model = CarModel
         fields = '__all__'
 
-class PartDetailSerializer(serializers.ModelSerializer):
-    car_models = CarModelSerializer(source='partcarmodel_set.car_model', many=True, read_only=True)
+# Quantidade máxima de modelos de carro embutidos na peça; a lista completa fica em `car_models_url`
+CAR_MODELS_EMBED_LIMIT = 20
+
+class EmbeddedCarModelsMixin(serializers.Serializer):
+    """
+    Embute na peça os seus primeiros `CAR_MODELS_EMBED_LIMIT` modelos de carro compatíveis,
+    a quantidade total e o link para a lista paginada completa.
+
+    Usa o prefetch `embedded_fitments` e a anotação `car_models_total` montados por
+    `PartViewSet.get_queryset`; sem eles, consulta o banco para a peça.
+    """
+    car_models = serializers.SerializerMethodField()
+    car_models_count = serializers.SerializerMethodField()
+    car_models_url = serializers.SerializerMethodField()
+
+    def get_car_models(self, obj):
+        fitments = getattr(obj, 'embedded_fitments', None)
+        if fitments is None:
+            fitments = (
+                obj.partcarmodel_set.select_related('car_model')
+                .order_by('car_model__manufacturer', 'car_model__name', 'car_model__year')[:CAR_MODELS_EMBED_LIMIT]
+            )
+        return CarModelSerializer([fitment.car_model for fitment in fitments], many=True).data
+
+    def get_car_models_count(self, obj):
+        total = getattr(obj, 'car_models_total', None)
+        return total if total is not None else obj.partcarmodel_set.count()
+
+    def get_car_models_url(self, obj):
+        url = f"{reverse('get-car-models-by-part')}?part_id={obj.id}"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
 
+class PartDetailSerializer(EmbeddedCarModelsMixin, serializers.ModelSerializer):
     class Meta:
         model = Part
-        fields = '__all__'
+        exclude = ('search_vector',)
+
+class PartListWithCarModelsSerializer(EmbeddedCarModelsMixin, PartListSerializer):
+    class Meta(PartListSerializer.Meta):
+        fields = PartListSerializer.Meta.fields + ('car_models', 'car_models_count', 'car_models_url')
 
 class PartCarModelSerializer(serializers.ModelSerializer):
     part = PartListSerializer(read_only=True)
@@ -59,3 +104,74 @@ class PartCarModelSerializer(serializers.ModelSerializer):
         if PartCarModel.objects.filter(part=data['part'], car_model=data['car_model']).exists():
             raise serializers.ValidationError("Essa peça já está associada a esse modelo de carro.")
         return data
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    elapsed_seconds = serializers.FloatField(read_only=True)
+    rows_per_second = serializers.FloatField(read_only=True)
+    rejected_rows_url = serializers.SerializerMethodField()
+    preview = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = (
+            'id', 'status', 'kind', 'mode', 'total_shards', 'rows_processed', 'rows_rejected',
+            'rows_inserted', 'rows_updated', 'rows_unchanged', 'elapsed_seconds', 'rows_per_second', 'error', 'created_at', 'started_at',
+            'finished_at', 'rejected_rows_url', 'dry_run', 'preview',
+        )
+        read_only_fields = fields
+
+    def get_rejected_rows_url(self, obj):
+        if not obj.rows_rejected:
+            return None
+        url = reverse('importjob-rejected-rows', args=[obj.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_preview(self, obj):
+        if not obj.dry_run:
+            return None
+        return {
+            'inserted': obj.rows_inserted,
+            'updated': obj.rows_updated,
+            'unchanged': obj.rows_unchanged,
+            'sample': obj.preview_sample(PREVIEW_SAMPLE_SIZE),
+        }
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    received_chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = (
+            'id', 'filename', 'kind', 'mode', 'dry_run', 'status', 'total_chunks',
+            'received_chunks', 'job', 'created_at',
+        )
+        read_only_fields = ('status', 'total_chunks', 'job', 'created_at')
+
+    def get_received_chunks(self, obj):
+        if obj.status != 'open':
+            return []
+        return received_chunks(obj)
+
+    def validate(self, data):
+        if data.get('dry_run') and data.get('kind', IMPORT_KIND_PARTS) != IMPORT_KIND_PARTS:
+            raise serializers.ValidationError("A simulação está disponível apenas para importações de peças.")
+        return data
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = (
+            'id', 'status', 'export_format', 'filters', 'error', 'created_at', 'started_at',
+            'finished_at', 'download_url',
+        )
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != 'done' or not obj.file_path:
+            return None
+        url = reverse('exportjob-download', args=[obj.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
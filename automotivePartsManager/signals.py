@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .caching import GENERATION_CAR_MODEL, GENERATION_FITMENT, GENERATION_PART, invalidate_generations
+from .models import CarModel, Part, PartCarModel
+
+# Gravações invalidam as respostas em cache do modelo (ver caching.py). Remoções registram tombstones
+# e invalidam o cache no `TombstoneCollector` (ver models.py), sem sinais que impeçam o fast delete.
+# Importações em massa, que não disparam sinais, invalidam a cada lote em `import_rows`.
+
+@receiver(post_save, sender=Part)
+def part_changed(sender, **kwargs):
+    invalidate_generations(GENERATION_PART)
+
+@receiver(post_save, sender=CarModel)
+def car_model_changed(sender, **kwargs):
+    invalidate_generations(GENERATION_CAR_MODEL)
+
+@receiver(post_save, sender=PartCarModel)
+def fitment_changed(sender, **kwargs):
+    invalidate_generations(GENERATION_FITMENT)
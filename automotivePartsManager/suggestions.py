@@ -0,0 +1,56 @@
+import re
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import CharField, Func, Q
+from django.db.models.functions import Greatest, Lower
+from .models import Part
+
+SUGGEST_DEFAULT_LIMIT = 10
+SUGGEST_MAX_LIMIT = 50
+SUGGEST_MIN_LENGTH = 2
+
+
+class NormalizedPartNumber(Func):
+    """
+    `part_number` sem separadores e em maiúsculas ("abc-123" -> "ABC123"). O SQL é o mesmo da expressão
+    do índice de trigramas `part_number_normalized_trgm_idx`, para que o PostgreSQL possa usá-lo.
+    """
+    template = "UPPER(REGEXP_REPLACE(%(expressions)s, '[^[:alnum:]]', '', 'g'))"
+    output_field = CharField()
+
+
+def normalize_part_number(value):
+    return re.sub(r'[\W_]', '', value).upper()
+
+
+def suggest_parts(term, limit=SUGGEST_DEFAULT_LIMIT):
+    """
+    Sugestões de peças para o termo digitado, da mais para a menos parecida.
+
+    No PostgreSQL, compara o termo por similaridade de trigramas (`word_similarity`, operador `%>`) com o
+    `part_number` normalizado e com o nome em minúsculas, usando os índices GIN da migração
+    `0016_part_trigram_indexes`; "ABC-123", "abc123" e "ABC 12" encontram a peça "ABC123".
+    Em outros bancos, busca o termo como substring, sem `similarity`.
+    """
+    part_number = normalize_part_number(term)
+    queryset = Part.objects.alias(part_number_normalized=NormalizedPartNumber('part_number'), name_lower=Lower('name'))
+    if connections[queryset.db].vendor != 'postgresql':
+        rows = (
+            queryset.filter(Q(part_number__icontains=term) | Q(name__icontains=term))
+            .order_by('name', 'id')
+            .values('id', 'part_number', 'name')[:limit]
+        )
+        return [dict(row, similarity=None) for row in rows]
+
+    condition = Q(name_lower__trigram_word_similar=term.lower())
+    similarity = TrigramWordSimilarity(term.lower(), 'name_lower')
+    if part_number:
+        condition |= Q(part_number_normalized__trigram_word_similar=part_number)
+        similarity = Greatest(TrigramWordSimilarity(part_number, 'part_number_normalized'), similarity)
+    rows = (
+        queryset.filter(condition)
+        .annotate(similarity=similarity)
+        .order_by('-similarity', 'name', 'id')
+        .values('id', 'part_number', 'name', 'similarity')[:limit]
+    )
+    return [dict(row, similarity=round(row['similarity'], 3)) for row in rows]
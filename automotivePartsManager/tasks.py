@@ -1,29 +1,185 @@
-import csv
-import io
-from celery import shared_task
-from django.core.cache import cache
-from .models import Part
+from celery import chord, shared_task, uuid
+from celery.utils.log import get_task_logger
+from django.db import transaction
+from django.utils import timezone
+from .importers import (
+    active_shards, assemble_upload, delete_chunks, import_rows, plan_shards, purge_stale_upload_sessions,
+    purge_stale_uploads,
+)
+from .changes import purge_tombstones
+from .exporters import purge_stale_exports, write_catalog_snapshot
+from .models import ExportJob, ImportJob, ImportShard, UploadSession
+
+logger = get_task_logger(__name__)
+
+def _mark_failed(job_id, exc):
+    ImportJob.objects.filter(pk=job_id).update(status='failed', error=str(exc), finished_at=timezone.now())
+
+def _release_shard(shard_id):
+    ImportShard.objects.filter(pk=shard_id).update(claimed_by='', claimed_at=None)
+
+# acks_late + reject_on_worker_lost: se o worker morrer no meio da tarefa (deploy, OOM),
+# a mensagem volta para a fila e a nova execução continua do último checkpoint.
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_csv(self, job_id):
+    """
+    Tarefa assíncrona que processa o arquivo CSV de uma `ImportJob` e grava peças, modelos de carro
+    ou compatibilidades peça/modelo de carro, conforme o tipo (`kind`) da importação.
+
+    Recebe apenas o id da importação: as linhas são lidas do storage em streaming
+    e inseridas em lotes de `CSV_IMPORT_BATCH_SIZE`. No modo `upsert`, peças já existentes
+    (mesmo `part_number`) têm preço, quantidade e detalhes atualizados.
+
+    Arquivos maiores que `CSV_SHARD_SIZE` são divididos em intervalos de bytes processados
+    em paralelo por `process_csv_shard` (um chord do Celery), finalizado por `finalize_csv_import`.
+
+    Pode ser executada novamente para a mesma importação: apenas os shards não concluídos
+    são processados, cada um a partir do seu último lote confirmado. Cada shard é reivindicado
+    (com a importação bloqueada) pela tarefa que vai processá-lo antes do envio: shards ainda em
+    processamento por outra tarefa não são enviados de novo, então uma reentrega desta tarefa não
+    duplica lotes nem contadores. Uma reentrega retoma os shards que ela mesma processava.
+    """
+    return _run_import(job_id, self.request.id or uuid())
+
+def _run_import(job_id, task_id):
+    try:
+        with transaction.atomic():
+            job = ImportJob.objects.select_for_update().get(pk=job_id)
+            if not job.shards.exists():
+                ImportShard.objects.bulk_create(
+                    ImportShard(job=job, start=start, end=end, committed_offset=start)
+                    for start, end in plan_shards(job.file_path)
+                )
+            busy = active_shards(job).exclude(claimed_by=task_id)
+            shards = list(job.shards.filter(done=False).exclude(pk__in=busy.values('pk')))
+            running = busy.count()
+            # Um único shard é processado por esta própria tarefa; mais de um, pelo chord
+            for shard in shards:
+                shard.claimed_by = task_id if len(shards) == 1 and not running else uuid()
+                shard.claimed_at = timezone.now()
+            ImportShard.objects.bulk_update(shards, ['claimed_by', 'claimed_at'])
+
+            job.status = 'running'
+            job.error = ''
+            job.started_at = job.started_at or timezone.now()
+            job.finished_at = None
+            job.total_shards = job.shards.count()
+            job.save(update_fields=['status', 'error', 'started_at', 'finished_at', 'total_shards'])
+
+        if running and not shards:
+            logger.info("Importação %s: %d shard(s) já em processamento, nada a enviar", job_id, running)
+            return None
+        if not running and len(shards) <= 1:
+            totals = []
+            for shard in shards:
+                try:
+                    totals.append(import_rows(job, shard))
+                except Exception:
+                    _release_shard(shard.id)
+                    raise
+            return finalize_csv_import(totals, job_id)
+    except Exception as exc:
+        _mark_failed(job_id, exc)
+        raise
+
+    logger.info("Importação %s: %d shard(s) pendente(s), %d em processamento", job_id, len(shards), running)
+    chord(
+        process_csv_shard.s(job_id, shard.id).set(task_id=shard.claimed_by) for shard in shards
+    )(finalize_csv_import.s(job_id))
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def assemble_upload_session(self, session_id):
+    """
+    Monta o arquivo de uma sessão de upload em partes já finalizada e inicia a sua importação.
+
+    A montagem roda no worker, então os workers web ficam ocupados apenas durante o envio
+    de cada parte. As partes só são removidas depois que o arquivo montado está salvo na
+    importação, então uma reentrega da tarefa não perde dados.
+    """
+    session = UploadSession.objects.select_related('job').get(pk=session_id)
+    job = session.job
+    if not job.file_path:
+        try:
+            job.file_path, job.file_hash = assemble_upload(session)
+        except Exception as exc:
+            _mark_failed(job.id, exc)
+            raise
+        job.save(update_fields=['file_path', 'file_hash'])
+    delete_chunks(session)
+    # Com o id desta tarefa, uma reentrega retoma o shard que ela mesma processava
+    return _run_import(job.id, self.request.id or uuid())
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_csv_shard(self, job_id, shard_id):
+    """
+    Importa as linhas de um shard do arquivo CSV, a partir do seu último checkpoint.
+
+    Só processa o shard se ele ainda estiver reivindicado por esta tarefa (ver `process_csv`): uma
+    mensagem antiga, cujo shard foi abandonado e reenviado a outra tarefa, não grava nada.
+    """
+    job = ImportJob.objects.get(pk=job_id)
+    shard = ImportShard.objects.get(pk=shard_id, job=job)
+    if shard.done or (self.request.id and shard.claimed_by != self.request.id):
+        logger.info("Shard %s da importação %s não pertence a esta tarefa; ignorado", shard_id, job_id)
+        return 0
+    try:
+        return import_rows(job, shard)
+    except Exception as exc:
+        _release_shard(shard_id)
+        _mark_failed(job_id, exc)
+        raise
 
 @shared_task
-def process_csv(file_data):
+def finalize_csv_import(totals, job_id):
     """
-    Tarefa assíncrona que processa um arquivo CSV e adiciona peças ao banco de dados.
+    Callback executado após todos os shards: conclui a importação.
+
+    O cache das respostas do catálogo já é invalidado a cada lote gravado, em `import_rows`.
+    A importação só é concluída se não restar shard pendente (de outra execução ainda em andamento).
     """
-    decoded_file = file_data.decode('utf-8')
-    reader = csv.DictReader(io.StringIO(decoded_file))
+    if ImportShard.objects.filter(job_id=job_id, done=False).exists():
+        logger.info("Importação %s: shards de outra execução ainda pendentes", job_id)
+        return sum(totals)
+    ImportJob.objects.filter(pk=job_id).update(status='done', finished_at=timezone.now())
+    logger.info("Importação %s concluída: %d linhas gravadas nesta execução", job_id, sum(totals))
+    return sum(totals)
 
-    parts = []
-    for row in reader:
-        part = Part(
-            part_number=row['part_number'],
-            name=row['name'],
-            details=row['details'],
-            price=float(row['price']),
-            quantity=int(row['quantity'])
-        )
-        parts.append(part)
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def export_catalog(job_id):
+    """
+    Tarefa assíncrona que gera o arquivo compactado de uma `ExportJob` com peças,
+    modelos de carro e compatibilidades, disponível em `GET /exports/{id}/download/`.
+    """
+    ExportJob.objects.filter(pk=job_id).update(status='running', error='', started_at=timezone.now())
+    job = ExportJob.objects.get(pk=job_id)
+    try:
+        file_path = write_catalog_snapshot(job)
+    except Exception as exc:
+        ExportJob.objects.filter(pk=job_id).update(status='failed', error=str(exc), finished_at=timezone.now())
+        raise
+    ExportJob.objects.filter(pk=job_id).update(status='done', file_path=file_path, finished_at=timezone.now())
+    logger.info("Exportação %s concluída: %s", job_id, file_path)
+    return file_path
 
-    Part.objects.bulk_create(parts)
+@shared_task
+def purge_upload_blobs():
+    """
+    Tarefa periódica (Celery Beat) que remove do storage os arquivos de importações antigas
+    e as partes de sessões de upload abandonadas, além dos arquivos de exportações antigas.
+    """
+    removed = purge_stale_uploads()
+    logger.info("%d arquivo(s) de upload removido(s) pela retenção", removed)
+    sessions = purge_stale_upload_sessions()
+    logger.info("%d sessão(ões) de upload abandonada(s) removida(s) pela retenção", sessions)
+    exports = purge_stale_exports()
+    logger.info("%d arquivo(s) de exportação removido(s) pela retenção", exports)
+    return removed
 
-    # Limpar cache após inserção
-    cache.delete('parts_list')
+@shared_task
+def purge_change_tombstones():
+    """
+    Tarefa periódica (Celery Beat) que remove os tombstones mais antigos que a retenção do feed de alterações.
+    """
+    removed = purge_tombstones()
+    logger.info("%d tombstone(s) removido(s) pela retenção", removed)
+    return removed
@@ -1,6 +1,11 @@
-from rest_framework import viewsets, filters
-from .models import CustomUser, Part, CarModel, PartCarModel
-from .serializers import PartListSerializer, PartDetailSerializer, CarModelSerializer, PartCarModelSerializer
+import csv
+import hashlib
+import io
+from rest_framework import viewsets, filters, mixins
+from .models import CustomUser, Part, CarModel, PartCarModel, ImportJob, UploadSession, ExportJob
+from .serializers import PartListSerializer, PartDetailSerializer, CarModelSerializer, PartCarModelSerializer, ImportJobSerializer
+from .serializers import CAR_MODELS_EMBED_LIMIT, PartListWithCarModelsSerializer
+from .serializers import UploadSessionSerializer, ExportJobSerializer
 from .serializers import UserSerializer
 from rest_framework.permissions import AllowAny
 from rest_framework.permissions import IsAuthenticated
@@ -11,10 +16,30 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework import generics
 from rest_framework.views import APIView
-from rest_framework.parsers import MultiPartParser
+from rest_framework.parsers import JSONParser, MultiPartParser
+from .caching import CATALOG_GENERATIONS, GENERATION_CAR_MODEL, GENERATION_PART, CachedResponseMixin, cache_stats
+from .filters import FullTextSearchFilter
+from .pagination import CatalogPagination
+from .parsers import RawChunkParser
+from .suggestions import SUGGEST_DEFAULT_LIMIT, SUGGEST_MAX_LIMIT, SUGGEST_MIN_LENGTH, suggest_parts
 from rest_framework import status
+from django.conf import settings
 from django.core.files.storage import default_storage
-from .tasks import process_csv
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from .tasks import assemble_upload_session, export_catalog, process_csv
+from .changes import CHANGES_DEFAULT_LIMIT, CHANGES_MAX_LIMIT, ExpiredCursor, changes_since
+from .exporters import (
+    EXPORT_CONTENT_TYPES, EXPORT_FORMATS, EXPORT_FORMAT_CSV, PART_EXPORT_COLUMNS, export_filters_hash,
+    find_fresh_export, iter_export, normalize_export_filters,
+)
+from .importers import (
+    IMPORT_KINDS, IMPORT_KIND_PARTS, IMPORT_MODES, IMPORT_MODE_INSERT, active_shards, find_duplicate_job,
+    iter_rejected_rows_files, received_chunks, rejected_columns, store_chunk, store_upload, validate_upload,
+)
 
 class RegisterUserView(generics.CreateAPIView):
     '''
@@ -114,7 +139,7 @@ class UserManagementViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
 
-class PartViewSet(viewsets.ModelViewSet):
+class PartViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     '''
     API para Gerenciamento de Peças
 
@@ -130,6 +155,8 @@ class PartViewSet(viewsets.ModelViewSet):
     - `GET /parts/{id}/` - Detalhar uma peça.
     - `PUT /parts/{id}/` - Atualizar uma peça.
     - `DELETE /parts/{id}/` - Deletar uma peça.
+    - `GET /parts/export/` - Exportar o catálogo de peças em CSV ou NDJSON.
+    - `GET /parts/suggest/?q=abc-123` - Sugestões de peças por `part_number` ou nome aproximado.
 
     ### Parâmetros (POST/PUT)
     | Nome        | Tipo   | Obrigatório | Descrição               | Exemplo         |
@@ -141,7 +168,8 @@ class PartViewSet(viewsets.ModelViewSet):
     | quantity    | int    | Sim         | Quantidade em estoque.  | 100             |
 
     ### Respostas
-    - **200 (OK)**: Retorna os dados da peça.
+    - **200 (OK)**: Retorna os dados da peça. O detalhe inclui os primeiros 20 modelos de carro
+      compatíveis, o total e o link para a lista paginada completa.
         ```json
         {
             "id": 1,
@@ -149,7 +177,17 @@ class PartViewSet(viewsets.ModelViewSet):
             "name": "Parafuso",
             "details": "Parafuso 10mm",
             "price": 15.99,
-            "quantity": 100
+            "quantity": 100,
+            "car_models": [
+                {
+                    "id": 2,
+                    "name": "Civic",
+                    "manufacturer": "Honda",
+                    "year": 2022
+                }
+            ],
+            "car_models_count": 1,
+            "car_models_url": "http://localhost:8000/part-carmodel/car-models-by-part/?part_id=1"
         }
         ```
     - **400 (Bad Request)**: Erro de validação dos dados.
@@ -172,23 +210,166 @@ class PartViewSet(viewsets.ModelViewSet):
     - `name`: Ordenar por nome.
 
     ### Busca
-    - `name`: Buscar por nome.
-    - `details`: Buscar por detalhes.
+    - `search`: Busca textual em `part_number`, `name` e `details`, com stemming em português
+      (`GET /parts/?search=filtros de óleo` encontra "Filtro de Óleo"). Aceita frases entre aspas e
+      `-termo` para excluir. Sem `ordering`, os resultados vêm do mais para o menos relevante.
+
+    ### Modelos de carro na listagem
+    - `GET /parts/?include=car_models` inclui em cada peça os campos `car_models`,
+      `car_models_count` e `car_models_url` do detalhe.
+
+    ### Paginação por cursor
+    - `GET /parts/?pagination=cursor&page_size=50` pagina por cursor, na ordem de `name` (e `id` para
+      desempatar) ou de `ordering`: a resposta traz apenas `next`, `previous` e `results`, sem `count`,
+      e cada página custa o mesmo em qualquer profundidade.
+    - `page_size` é limitado a `PAGINATION_MAX_PAGE_SIZE` (padrão: 100).
+
+    ### Total da listagem
+    - Acima de `COUNT_ESTIMATE_THRESHOLD` linhas (padrão: 100000), `count` é a estimativa do PostgreSQL
+      e `count_is_exact` é `false`; abaixo disso, `count` é exato e `count_is_exact` é `true`.
     '''
-    queryset = Part.objects.all()
+    # O documento da busca textual só é usado no WHERE, então não é carregado com as peças
+    queryset = Part.objects.defer('search_vector')
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
+    pagination_class = CatalogPagination
+    # Ordem da paginação por cursor: o nome não é único, então o id desempata
+    keyset_ordering = ('name', 'id')
+    # O COUNT(*) exato domina a listagem em tabelas grandes; acima do limite, usa a estimativa do planejador
+    estimated_count = True
+    # O detalhe das peças mais acessadas é atendido da memória do processo, sem ida ao Redis
+    local_cache_actions = ('retrieve',)
+
+    def embeds_car_models(self):
+        if self.action == 'retrieve':
+            return True
+        return self.action == 'list' and self.request.query_params.get('include') == 'car_models'
+
+    def get_cache_generations(self):
+        # Os modelos de carro embutidos dependem também das associações e dos modelos de carro
+        if self.embeds_car_models():
+            return CATALOG_GENERATIONS
+        return (GENERATION_PART,)
 
     def get_serializer_class(self):
         if self.action == 'retrieve':  # GET by ID (detalhe)
             return PartDetailSerializer
+        if self.embeds_car_models():
+            return PartListWithCarModelsSerializer
         return PartListSerializer  # GET (listar todas as peças)
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.embeds_car_models():
+            return queryset
+        # Um único prefetch (fatiado por peça com ROW_NUMBER) traz os primeiros modelos de carro
+        # de todas as peças da página, e uma subconsulta conta o total, sem consultas por associação
+        fitments = (
+            PartCarModel.objects.select_related('car_model')
+            .order_by('car_model__manufacturer', 'car_model__name', 'car_model__year')[:CAR_MODELS_EMBED_LIMIT]
+        )
+        total = (
+            PartCarModel.objects.filter(part=OuterRef('pk')).order_by().values('part')
+            .annotate(total=Count('id')).values('total')
+        )
+        return queryset.annotate(car_models_total=Coalesce(Subquery(total), 0)).prefetch_related(
+            Prefetch('partcarmodel_set', queryset=fitments, to_attr='embedded_fitments')
+        )
+
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['part_number', 'name', 'price']
-    search_fields = ['name', 'details']
+    # Na busca por substring, usada apenas fora do PostgreSQL
+    search_fields = ['part_number', 'name', 'details']
     ordering_fields = ['price', 'name']
 
-class CarModelViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        '''
+        Exportar Catálogo de Peças
+
+        ### Descrição
+        - Retorna todas as peças num único download, sem paginação, em CSV (padrão) ou NDJSON.
+        - Aceita os mesmos filtros, busca (`search`) e ordenação (`ordering`) da listagem.
+        - As linhas são lidas de um cursor no servidor e enviadas em streaming, com memória constante.
+        - O CSV segue o formato da importação (`id`, `part_number`, `name`, `details`, `price`, `quantity`).
+        - Para exportações muito grandes, com modelos de carro e compatibilidades, use `POST /exports/`.
+
+        ### Parâmetros (GET)
+        | Nome   | Tipo   | Obrigatório | Descrição                          | Exemplo  |
+        |--------|--------|-------------|------------------------------------|----------|
+        | output | string | Não         | Formato: `csv` (padrão) ou `ndjson`. | "ndjson" |
+
+        ### Respostas
+        - **200 (OK)**: Conteúdo da exportação.
+        - **400 (Bad Request)**: Formato inválido.
+            ```json
+            {
+                "error": "Formato de exportação inválido. Use 'csv' ou 'ndjson'."
+            }
+            ```
+        '''
+        export_format = request.query_params.get('output', EXPORT_FORMAT_CSV)
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": "Formato de exportação inválido. Use 'csv' ou 'ndjson'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            iter_export(queryset, PART_EXPORT_COLUMNS, export_format), content_type=EXPORT_CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="parts.{export_format}"'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='suggest')
+    def suggest(self, request):
+        '''
+        Sugestões de Peças
+
+        ### Descrição
+        - Retorna as peças com `part_number` ou nome mais parecidos com o termo digitado, para o
+          preenchimento automático no balcão.
+        - O `part_number` é comparado sem separadores e sem diferenciar maiúsculas ("abc-123" encontra
+          "ABC123"), e termos com erros de digitação ainda encontram a peça.
+
+        ### Parâmetros (GET)
+        | Nome  | Tipo   | Obrigatório | Descrição                                        | Exemplo   |
+        |-------|--------|-------------|--------------------------------------------------|-----------|
+        | q     | string | Sim         | Termo digitado (mínimo de 2 caracteres).         | "abc-123" |
+        | limit | int    | Não         | Quantidade de sugestões (padrão: 10, máximo: 50). | 5         |
+
+        ### Respostas
+        - **200 (OK)**: Sugestões da mais para a menos parecida.
+            ```json
+            {
+                "results": [
+                    {
+                        "id": 1,
+                        "part_number": "ABC123",
+                        "name": "Parafuso",
+                        "similarity": 1.0
+                    }
+                ]
+            }
+            ```
+        - **400 (Bad Request)**: Termo ausente ou limite inválido.
+            ```json
+            {
+                "error": "Informe ao menos 2 caracteres em q."
+            }
+            ```
+        '''
+        term = request.query_params.get('q', '').replace('\x00', '').strip()
+        if len(term) < SUGGEST_MIN_LENGTH:
+            return Response({"error": f"Informe ao menos {SUGGEST_MIN_LENGTH} caracteres em q."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = int(request.query_params.get('limit', SUGGEST_DEFAULT_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= SUGGEST_MAX_LIMIT:
+            return Response({"error": f"O limite deve estar entre 1 e {SUGGEST_MAX_LIMIT}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"results": suggest_parts(term, limit)})
+
+class CarModelViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     '''
     API para Gerenciamento de Modelos de Carro
 
@@ -245,20 +426,39 @@ class CarModelViewSet(viewsets.ModelViewSet):
     ### Busca
     - `name`: Buscar por nome.
     - `manufacturer`: Buscar por fabricante.
+
+    ### Paginação por cursor
+    - `GET /car-models/?pagination=cursor&page_size=50` pagina por cursor, na ordem de `manufacturer`,
+      `name` e `year`, sem `count`. `page_size` é limitado a `PAGINATION_MAX_PAGE_SIZE`.
+
+    ### Total da listagem
+    - Acima de `COUNT_ESTIMATE_THRESHOLD` linhas, `count` é a estimativa do PostgreSQL e
+      `count_is_exact` é `false`.
     '''
     queryset = CarModel.objects.all()
     serializer_class = CarModelSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
+    pagination_class = CatalogPagination
+    # Chave natural única (unique_car_model_natural_key), então dispensa o id como desempate
+    keyset_ordering = ('manufacturer', 'name', 'year')
+    estimated_count = True
+    cache_generations = (GENERATION_CAR_MODEL,)
+    # Poucos e muito lidos: listagens e detalhes cabem na memória de cada processo
+    local_cache_actions = ('list', 'retrieve')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['name', 'manufacturer', 'year']
     search_fields = ['name', 'manufacturer']
     ordering_fields = ['name', 'manufacturer', 'year']
 
-class PartCarModelViewSet(viewsets.ModelViewSet):
-    queryset = PartCarModel.objects.all()
+class PartCarModelViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    # O serializer aninha a peça e o modelo de carro: o select_related os carrega no mesmo JOIN,
+    # então cada página custa uma consulta, e não uma por associação
+    queryset = PartCarModel.objects.select_related('part', 'car_model')
     serializer_class = PartCarModelSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
-    serializer_class = PartCarModelSerializer
+    # Com ?pagination=cursor, pagina pelos ids da associação única (part, car_model), sem COUNT
+    pagination_class = CatalogPagination
+    keyset_ordering = ('part_id', 'car_model_id')
 
     @action(detail=False, methods=['post'], url_path='associate')
     def associate_parts_to_car_models(self, request):
@@ -352,18 +552,30 @@ class PartCarModelViewSet(viewsets.ModelViewSet):
         - `/part-carmodel/parts-by-car-model/?car_model_id=2`
 
         ### Respostas
-        - **200 (OK)**: Lista de peças associadas ao modelo de carro.
+        - **200 (OK)**: Lista paginada de peças associadas ao modelo de carro.
             ```json
-            [
-                {
-                "id": 3,
-                "part": {
-                    "name": "Correia dentada",
-                    "details": "Correia reforçada para motores de alto desempenho.",
-                    "price": "80.90",
-                    "quantity": 20
-                }
-            ]
+            {
+                "count": 1,
+                "next": null,
+                "previous": null,
+                "results": [
+                    {
+                        "id": 3,
+                        "part": {
+                            "name": "Correia dentada",
+                            "details": "Correia reforçada para motores de alto desempenho.",
+                            "price": "80.90",
+                            "quantity": 20
+                        },
+                        "car_model": {
+                            "id": 2,
+                            "name": "Civic",
+                            "manufacturer": "Honda",
+                            "year": 2022
+                        }
+                    }
+                ]
+            }
             ```
         - **400 (Bad Request)**: `car_model_id` não fornecido.
             ```json
@@ -384,17 +596,12 @@ class PartCarModelViewSet(viewsets.ModelViewSet):
             return Response({"error": "car_model_id é obrigatório"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            car_model_exists_in_association = PartCarModel.objects.filter(car_model_id=car_model_id).exists()
-            if not car_model_exists_in_association:
-                return Response({"error": "Nenhuma peça associada a este modelo de carro"}, status=status.HTTP_404_NOT_FOUND)
-
-            associations = PartCarModel.objects.filter(car_model_id=car_model_id)
-            serializer = self.get_serializer(associations, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-
+            associations = self.get_queryset().filter(car_model_id=car_model_id)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+        return self._paginated_associations(associations, "Nenhuma peça associada a este modelo de carro")
+
     @action(detail=False, methods=['get'], url_path='car-models-by-part')
     def get_car_models_by_part(self, request):
         '''
@@ -411,25 +618,30 @@ class PartCarModelViewSet(viewsets.ModelViewSet):
         - `/part-carmodel/car-models-by-part/?part_id=3`
 
         ### Respostas
-        - **200 (OK)**: Lista de modelos de carro associados à peça.
+        - **200 (OK)**: Lista paginada de modelos de carro associados à peça.
             ```json
-            [
-                {
-                    "id": 4,
-                    "part": {
-                        "name": "Filtro de água premium",
-                        "details": "Filtro de óleo compatível com motores 1.6 a 2.0.",
-                        "price": "25.50",
-                        "quantity": 100
-                    },
-                    "car_model": {
-                        "id": 2,
-                        "name": "Civic",
-                        "manufacturer": "Honda",
-                        "year": 2022
+            {
+                "count": 1,
+                "next": null,
+                "previous": null,
+                "results": [
+                    {
+                        "id": 4,
+                        "part": {
+                            "name": "Filtro de água premium",
+                            "details": "Filtro de óleo compatível com motores 1.6 a 2.0.",
+                            "price": "25.50",
+                            "quantity": 100
+                        },
+                        "car_model": {
+                            "id": 2,
+                            "name": "Civic",
+                            "manufacturer": "Honda",
+                            "year": 2022
+                        }
                     }
-                }
-            ]
+                ]
+            }
             ```
         - **400 (Bad Request)**: `part_id` não fornecido.
             ```json
@@ -449,23 +661,30 @@ class PartCarModelViewSet(viewsets.ModelViewSet):
             return Response({"error": "part_id é obrigatório"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            part_exists_in_association = PartCarModel.objects.filter(part_id=part_id).exists()
-            if not part_exists_in_association:
-                return Response({"error": "Nenhum modelo de carro associado a esta peça"}, status=status.HTTP_404_NOT_FOUND)
-
-            associations = PartCarModel.objects.filter(part_id=part_id)
-            serializer = self.get_serializer(associations, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-
+            associations = self.get_queryset().filter(part_id=part_id)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return self._paginated_associations(associations, "Nenhum modelo de carro associado a esta peça")
+
+    def _paginated_associations(self, associations, not_found_message):
+        return self.cached_response(self.request, lambda request: self._paginate_associations(associations, not_found_message))
+
+    def _paginate_associations(self, associations, not_found_message):
+        # A própria página indica se há associações, sem um .exists() separado
+        page = self.paginate_queryset(associations)
+        if not page:
+            return Response({"error": not_found_message}, status=status.HTTP_404_NOT_FOUND)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
         
 class CSVUploadView(APIView):
     '''
-    API para Upload de Arquivo CSV para cadastro de peças
+    API para Upload de Arquivo CSV para cadastro de peças, modelos de carro e compatibilidades
 
     ### Descrição
-    - Esta API permite o envio de um arquivo CSV para cadastro de peças.
+    - Esta API permite o envio de um arquivo CSV para cadastro em massa de peças, modelos de carro
+      ou associações entre peças e modelos de carro.
     - **Permissões**:
         - Apenas administradores.
         
@@ -475,12 +694,39 @@ class CSVUploadView(APIView):
     ### Parâmetros (POST)
     | Nome | Tipo | Obrigatório | Descrição   | Exemplo     |
     |------|------|-------------|-------------|-------------|
-    | file | file | Sim         | Arquivo CSV | "peças.csv" |
+    | file | file | Sim         | Arquivo CSV, opcionalmente compactado | "peças.csv.gz" |
+    | kind | string | Não       | Tipo de importação: `parts` (padrão), `car_models` ou `fitments`. | "fitments" |
+    | mode | string | Não       | Modo de importação: `insert` (padrão) ou `upsert`. | "upsert" |
+    | force | bool | Não       | Reimporta mesmo que o arquivo já tenha sido importado. | true |
+    | dry_run | bool | Não     | Apenas simula a importação de peças, sem gravar nada. | true |
+
+    - **Modos de importação**:
+        - `insert`: cadastra apenas peças novas; `part_number` já existentes são ignorados.
+        - `upsert`: cadastra peças novas e atualiza `price`, `quantity` e `details` das peças
+          já existentes com o mesmo `part_number`.
+
+    - **Simulação (`dry_run`)**: compara o CSV de peças com as peças cadastradas pelo `part_number`
+      e informa, em `GET /imports/{job_id}/`, quantas seriam inseridas, atualizadas (com a variação
+      de preço) ou mantidas no modo escolhido, sem alterar a tabela de peças.
+
+    - **Formatos aceitos**: `.csv`, `.csv.gz`, `.csv.bz2`, `.csv.xz` e `.zip` com um único arquivo CSV.
+      Arquivos compactados são descompactados em streaming durante a importação.
 
-    ### O CSV deverá seguir o seguinte formato:
+    ### O CSV de peças (`kind=parts`) deverá seguir o seguinte formato:
     | part_number | name          | details           | price | quantity |
     |-------------|---------------|-------------------|-------|----------|
 
+    ### O CSV de modelos de carro (`kind=car_models`) deverá seguir o seguinte formato:
+    | name | manufacturer | year |
+    |------|--------------|------|
+    - Modelos já cadastrados (mesmo fabricante, nome e ano) são ignorados.
+
+    ### O CSV de compatibilidade (`kind=fitments`) deverá seguir o seguinte formato:
+    | part_number | manufacturer | name | year |
+    |-------------|--------------|------|------|
+    - Cada linha associa a peça de `part_number` ao modelo de carro de `manufacturer`, `name` e `year`.
+    - Associações já existentes são ignoradas; linhas com peça ou modelo de carro inexistente são rejeitadas.
+
     ### Tipos de Dados
     | Nome        | Tipo   | Obrigatório | Descrição               | Exemplo         |
     |-------------|--------|-------------|-------------------------|-----------------|
@@ -494,7 +740,17 @@ class CSVUploadView(APIView):
     - **202 (Accepted)**: Arquivo enviado e processamento iniciado.
         ```json
         {
-            "message": "Arquivo enviado e processamento iniciado"
+            "message": "Arquivo enviado e processamento iniciado",
+            "job_id": 1,
+            "status_url": "http://localhost:8000/imports/1/"
+        }
+        ```
+    - **200 (OK)**: Arquivo idêntico já importado (ou em importação) no mesmo modo; retorna a importação existente.
+        ```json
+        {
+            "message": "Arquivo já importado",
+            "job_id": 1,
+            "status_url": "http://localhost:8000/imports/1/"
         }
         ```
     - **400 (Bad Request)**: Arquivo não fornecido.
@@ -503,9 +759,40 @@ class CSVUploadView(APIView):
             "error": "Arquivo não fornecido"
         }
         ```
+    - **400 (Bad Request)**: Arquivo compactado inválido.
+        ```json
+        {
+            "error": "O arquivo .zip deve conter um único arquivo CSV."
+        }
+        ```
+    - **400 (Bad Request)**: Modo de importação inválido.
+        ```json
+        {
+            "error": "Modo de importação inválido. Use 'insert' ou 'upsert'."
+        }
+        ```
+    - **400 (Bad Request)**: Tipo de importação inválido.
+        ```json
+        {
+            "error": "Tipo de importação inválido. Use 'parts', 'car_models' ou 'fitments'."
+        }
+        ```
+    - **400 (Bad Request)**: Simulação solicitada para um tipo diferente de `parts`.
+        ```json
+        {
+            "error": "A simulação está disponível apenas para importações de peças."
+        }
+        ```
 
     ### Observações
     - O processamento do arquivo é feito de forma assíncrona via Celery.
+    - Apenas o caminho do arquivo salvo é enviado ao Celery; as linhas são lidas em streaming
+      e inseridas em lotes de `CSV_IMPORT_BATCH_SIZE`.
+    - O andamento da importação pode ser acompanhado em `GET /imports/{job_id}/`. Linhas inválidas
+      não impedem a gravação das válidas e ficam disponíveis em `GET /imports/{job_id}/rejected-rows/`.
+    - Os arquivos são armazenados pelo hash SHA-256 do conteúdo e removidos após `UPLOAD_RETENTION_DAYS`.
+    - Para arquivos grandes, prefira o envio em partes em `/upload-sessions/`, que pode ser retomado
+      em caso de falha na conexão.
     '''
     parser_classes = [MultiPartParser]
     permission_classes = [IsAuthenticated, IsAdmin]
@@ -518,9 +805,556 @@ class CSVUploadView(APIView):
         if not file:
             return Response({"error": "Arquivo não fornecido"}, status=status.HTTP_400_BAD_REQUEST)
 
-        file_path = default_storage.save(f"uploads/{file.name}", file)
-        with default_storage.open(file_path, 'rb') as f:
-            file_data = f.read()
-            process_csv.delay(file_data)
+        mode = request.data.get('mode', IMPORT_MODE_INSERT)
+        if mode not in IMPORT_MODES:
+            return Response({"error": "Modo de importação inválido. Use 'insert' ou 'upsert'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        kind = request.data.get('kind', IMPORT_KIND_PARTS)
+        if kind not in IMPORT_KINDS:
+            return Response({"error": "Tipo de importação inválido. Use 'parts', 'car_models' ou 'fitments'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+        if dry_run and kind != IMPORT_KIND_PARTS:
+            return Response({"error": "A simulação está disponível apenas para importações de peças."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            validate_upload(file)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_path, file_hash = store_upload(file)
+        force = str(request.data.get('force', '')).lower() in ('1', 'true')
+        # Simulações sempre refletem o estado atual da tabela de peças, então não são reaproveitadas
+        duplicate = None if force or dry_run else find_duplicate_job(file_hash, kind, mode)
+        if duplicate:
+            return Response({
+                "message": "Arquivo já importado",
+                "job_id": duplicate.id,
+                "status_url": request.build_absolute_uri(reverse('importjob-detail', args=[duplicate.id])),
+            }, status=status.HTTP_200_OK)
+
+        job = ImportJob.objects.create(
+            file_path=file_path, file_hash=file_hash, kind=kind, mode=mode, dry_run=dry_run,
+            created_by=request.user,
+        )
+        process_csv.delay(job.id)
+
+        return Response({
+            "message": "Arquivo enviado e processamento iniciado",
+            "job_id": job.id,
+            "status_url": request.build_absolute_uri(reverse('importjob-detail', args=[job.id])),
+        }, status=status.HTTP_202_ACCEPTED)
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    '''
+    API para Acompanhamento das Importações de CSV
+
+    ### Descrição
+    - Esta API permite acompanhar o andamento das importações iniciadas em `POST /upload-csv/`.
+    - **Permissões**:
+        - Apenas administradores.
+
+    ### Endpoints
+    - `GET /imports/` - Listar as importações.
+    - `GET /imports/{id}/` - Detalhar uma importação.
+    - `GET /imports/{id}/rejected-rows/` - Baixar o CSV com as linhas rejeitadas.
+    - `POST /imports/{id}/resume/` - Retomar uma importação que falhou a partir do último lote gravado.
+
+    ### Respostas
+    - **200 (OK)**: Retorna os dados da importação.
+        ```json
+        {
+            "id": 1,
+            "status": "done",
+            "kind": "parts",
+            "mode": "upsert",
+            "total_shards": 1,
+            "rows_processed": 99998,
+            "rows_rejected": 2,
+            "rows_inserted": 1200,
+            "rows_updated": 98798,
+            "rows_unchanged": 0,
+            "elapsed_seconds": 4.2,
+            "rows_per_second": 23809.5,
+            "error": "",
+            "created_at": "2025-02-11T16:20:00-03:00",
+            "started_at": "2025-02-11T16:20:01-03:00",
+            "finished_at": "2025-02-11T16:20:05-03:00",
+            "rejected_rows_url": "http://localhost:8000/imports/1/rejected-rows/",
+            "dry_run": false,
+            "preview": null
+        }
+        ```
+    - Em simulações (`dry_run: true`), o campo `preview` traz o resultado da comparação:
+        ```json
+        {
+            "inserted": 1200,
+            "updated": 350,
+            "unchanged": 98448,
+            "sample": [
+                {
+                    "part_number": "ABC123",
+                    "action": "update",
+                    "price_before": "15.99",
+                    "price_after": "17.49",
+                    "price_delta": "1.50",
+                    "quantity_before": 100,
+                    "quantity_after": 80
+                }
+            ]
+        }
+        ```
+    - **401 (Unauthorized)**: Usuário não autenticado.
+    - **403 (Forbidden)**: Usuário não é administrador.
+    - **404 (Not Found)**: Importação não encontrada.
+
+    ### Status
+    - `pending`: Aguardando o worker.
+    - `running`: Em processamento.
+    - `done`: Concluída.
+    - `failed`: Interrompida por erro (ver campo `error`).
+
+    ### Observações
+    - `rows_processed` é a soma de `rows_inserted` e `rows_updated`. `rows_unchanged` conta as linhas
+      válidas que não foram gravadas: já cadastradas no modo `insert`, idênticas às cadastradas no
+      modo `upsert` ou repetidas no arquivo.
+    - Cada lote gravado registra um checkpoint: se o worker for reiniciado, a tarefa é reentregue
+      e continua do último lote confirmado, sem duplicar linhas.
+    '''
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    @action(detail=True, methods=['get'], url_path='rejected-rows')
+    def rejected_rows(self, request, pk=None):
+        '''
+        Baixar Linhas Rejeitadas
+
+        ### Descrição
+        - Retorna um CSV com as linhas rejeitadas na validação e o motivo de cada rejeição (coluna `error`).
+        '''
+        job = self.get_object()
+        response = StreamingHttpResponse(self._stream_rejected_rows(job), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="import-{job.id}-rejected.csv"'
+        return response
+
+    @action(detail=True, methods=['post'], url_path='resume')
+    def resume(self, request, pk=None):
+        '''
+        Retomar Importação
+
+        ### Descrição
+        - Reenvia ao Celery uma importação com falha. Apenas os shards não concluídos são processados,
+          cada um a partir do seu último lote gravado.
+
+        ### Respostas
+        - **202 (Accepted)**: Importação retomada.
+        - **400 (Bad Request)**: A importação não está com falha.
+            ```json
+            {
+                "error": "Apenas importações com falha podem ser retomadas."
+            }
+            ```
+        - **409 (Conflict)**: Outros shards da importação ainda estão em processamento; aguarde a sua conclusão.
+            ```json
+            {
+                "error": "A importação ainda tem shards em processamento."
+            }
+            ```
+        '''
+        job = self.get_object()
+        if job.status != 'failed':
+            return Response({"error": "Apenas importações com falha podem ser retomadas."}, status=status.HTTP_400_BAD_REQUEST)
+        if active_shards(job).exists():
+            return Response({"error": "A importação ainda tem shards em processamento."}, status=status.HTTP_409_CONFLICT)
+
+        process_csv.delay(job.id)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    def _stream_rejected_rows(self, job):
+        header = io.StringIO()
+        csv.writer(header, lineterminator='\n').writerow(rejected_columns(job.kind))
+        yield header.getvalue().encode('utf-8')
+        for file_path in iter_rejected_rows_files(job):
+            with default_storage.open(file_path, 'rb') as f:
+                yield from f.chunks()
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    '''
+    API para Upload de Arquivos CSV em Partes
+
+    ### Descrição
+    - Esta API permite enviar arquivos CSV grandes em partes numeradas, retomando o envio
+      em caso de falha na conexão sem recomeçar do zero.
+    - Cada parte é gravada diretamente no storage; a montagem do arquivo e a importação
+      rodam no Celery após a finalização.
+    - **Permissões**:
+        - Apenas administradores.
+
+    ### Endpoints
+    - `POST /upload-sessions/` - Abrir uma sessão de upload.
+    - `GET /upload-sessions/{id}/` - Consultar a sessão e as partes já recebidas.
+    - `PUT /upload-sessions/{id}/chunks/{number}/` - Enviar a parte `number` (a partir de 0).
+    - `POST /upload-sessions/{id}/finalize/` - Finalizar o envio e iniciar a importação.
+
+    ### Parâmetros (POST /upload-sessions/)
+    | Nome     | Tipo   | Obrigatório | Descrição                                   | Exemplo        |
+    |----------|--------|-------------|---------------------------------------------|----------------|
+    | filename | string | Sim         | Nome do arquivo, usado para identificar a compactação. | "peças.csv.gz" |
+    | kind     | string | Não         | `parts` (padrão), `car_models` ou `fitments`. | "parts"        |
+    | mode     | string | Não         | `insert` (padrão) ou `upsert`.              | "upsert"       |
+    | dry_run  | bool   | Não         | Apenas simula a importação de peças.        | false          |
+
+    ### Envio das partes
+    - O corpo da requisição `PUT` é o conteúdo binário da parte (`Content-Type: application/octet-stream`),
+      com no máximo `UPLOAD_CHUNK_MAX_SIZE` bytes.
+    - O cabeçalho opcional `X-Chunk-SHA256` confere a integridade da parte recebida.
+    - Reenviar uma parte substitui a anterior; para retomar um envio, consulte `received_chunks`
+      e envie apenas as partes ausentes.
+
+    ### Parâmetros (POST /upload-sessions/{id}/finalize/)
+    | Nome         | Tipo | Obrigatório | Descrição                  | Exemplo |
+    |--------------|------|-------------|----------------------------|---------|
+    | total_chunks | int  | Sim         | Quantidade total de partes. | 120     |
+
+    ### Respostas
+    - **201 (Created)**: Sessão aberta.
+        ```json
+        {
+            "id": 1,
+            "filename": "peças.csv.gz",
+            "kind": "parts",
+            "mode": "upsert",
+            "dry_run": false,
+            "status": "open",
+            "total_chunks": null,
+            "received_chunks": [],
+            "job": null,
+            "created_at": "2025-02-11T16:20:00-03:00"
+        }
+        ```
+    - **200 (OK)**: Parte recebida; retorna a sessão com `received_chunks` atualizado.
+    - **202 (Accepted)**: Sessão finalizada e importação iniciada.
+        ```json
+        {
+            "message": "Arquivo enviado e processamento iniciado",
+            "job_id": 1,
+            "status_url": "http://localhost:8000/imports/1/"
+        }
+        ```
+    - **400 (Bad Request)**: Sessão já finalizada, parte vazia, checksum divergente ou partes ausentes.
+        ```json
+        {
+            "error": "Partes ausentes: [3, 7]"
+        }
+        ```
+    - **413 (Request Entity Too Large)**: Parte maior que `UPLOAD_CHUNK_MAX_SIZE`.
+    '''
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated, IsAdmin]
+    parser_classes = [JSONParser, MultiPartParser]
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<number>[0-9]+)', parser_classes=[RawChunkParser])
+    def chunk(self, request, pk=None, number=None):
+        '''
+        Enviar Parte
+
+        ### Descrição
+        - Grava no storage a parte `number` da sessão. O corpo da requisição é o conteúdo binário da parte.
+        '''
+        session = self.get_object()
+        if session.status != 'open':
+            return Response({"error": "A sessão de upload já foi finalizada."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if int(request.META.get('CONTENT_LENGTH') or 0) > settings.UPLOAD_CHUNK_MAX_SIZE:
+            return Response(
+                {"error": f"A parte excede o tamanho máximo de {settings.UPLOAD_CHUNK_MAX_SIZE} bytes."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        data = request.data.read(settings.UPLOAD_CHUNK_MAX_SIZE + 1) if hasattr(request.data, 'read') else b''
+        if not data:
+            return Response({"error": "Parte vazia."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(data) > settings.UPLOAD_CHUNK_MAX_SIZE:
+            return Response(
+                {"error": f"A parte excede o tamanho máximo de {settings.UPLOAD_CHUNK_MAX_SIZE} bytes."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        checksum = request.headers.get('X-Chunk-SHA256')
+        if checksum and checksum.lower() != hashlib.sha256(data).hexdigest():
+            return Response({"error": "O checksum da parte não confere."}, status=status.HTTP_400_BAD_REQUEST)
+
+        store_chunk(session, int(number), data)
+        return Response(self.get_serializer(session).data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='finalize')
+    def finalize(self, request, pk=None):
+        '''
+        Finalizar Upload
+
+        ### Descrição
+        - Confere se todas as partes de 0 a `total_chunks - 1` foram recebidas, cria a importação
+          e envia ao Celery a montagem do arquivo e o seu processamento.
+        - A finalização da sessão e a criação da importação são gravadas juntas: se algo falhar,
+          a sessão continua aberta e a finalização pode ser repetida.
+        '''
+        session = self.get_object()
+        if session.status != 'open':
+            return Response({"error": "A sessão de upload já foi finalizada."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            total_chunks = int(request.data.get('total_chunks'))
+        except (TypeError, ValueError):
+            total_chunks = 0
+        if total_chunks <= 0:
+            return Response({"error": "Informe a quantidade total de partes (total_chunks)."}, status=status.HTTP_400_BAD_REQUEST)
+
+        received = set(received_chunks(session))
+        missing = [number for number in range(total_chunks) if number not in received]
+        if missing:
+            return Response({"error": f"Partes ausentes: {missing[:100]}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # A atualização condicional impede que duas finalizações simultâneas criem duas importações
+            if not UploadSession.objects.filter(pk=session.pk, status='open').update(status='finalized', total_chunks=total_chunks):
+                return Response({"error": "A sessão de upload já foi finalizada."}, status=status.HTTP_400_BAD_REQUEST)
+            session.job = ImportJob.objects.create(
+                kind=session.kind, mode=session.mode, dry_run=session.dry_run, created_by=request.user
+            )
+            session.save(update_fields=['job'])
+            # O worker só recebe a sessão depois que a importação está gravada
+            transaction.on_commit(lambda: assemble_upload_session.delay(session.id))
+
+        return Response({
+            "message": "Arquivo enviado e processamento iniciado",
+            "job_id": session.job.id,
+            "status_url": request.build_absolute_uri(reverse('importjob-detail', args=[session.job.id])),
+        }, status=status.HTTP_202_ACCEPTED)
+
+class ExportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    '''
+    API para Exportação Assíncrona do Catálogo
+
+    ### Descrição
+    - Esta API gera, via Celery, um arquivo `.zip` com as peças, os modelos de carro e as
+      compatibilidades peça/modelo de carro, para exportações grandes demais para uma única resposta.
+    - Pedidos com o mesmo formato e os mesmos filtros dentro de `EXPORT_FRESHNESS_SECONDS`
+      reutilizam a exportação existente em vez de gerar outro arquivo.
+    - **Permissões**:
+        - Qualquer usuário autenticado.
+
+    ### Endpoints
+    - `POST /exports/` - Solicitar uma exportação.
+    - `GET /exports/` - Listar as exportações.
+    - `GET /exports/{id}/` - Consultar o andamento de uma exportação.
+    - `GET /exports/{id}/download/` - Baixar o arquivo gerado.
+
+    ### Parâmetros (POST)
+    | Nome    | Tipo   | Obrigatório | Descrição                                   | Exemplo                 |
+    |---------|--------|-------------|---------------------------------------------|-------------------------|
+    | output  | string | Não         | Formato dos arquivos: `csv` (padrão) ou `ndjson`. | "ndjson"          |
+    | filters | object | Não         | Filtros de peças aceitos por `GET /parts/` (`part_number`, `name`, `price`, `search`, `ordering`). | {"search": "filtro"} |
+
+    ### Conteúdo do arquivo
+    - `parts.csv`: peças filtradas, no formato da importação de peças.
+    - `car_models.csv`: todos os modelos de carro.
+    - `fitments.csv`: compatibilidades das peças exportadas, no formato da importação `fitments`.
+
+    ### Respostas
+    - **202 (Accepted)**: Exportação criada e enviada ao Celery.
+    - **200 (OK)**: Exportação recente com os mesmos filtros reutilizada.
+        ```json
+        {
+            "id": 1,
+            "status": "done",
+            "export_format": "csv",
+            "filters": {"search": "filtro"},
+            "error": "",
+            "created_at": "2025-02-11T16:20:00-03:00",
+            "started_at": "2025-02-11T16:20:01-03:00",
+            "finished_at": "2025-02-11T16:20:09-03:00",
+            "download_url": "http://localhost:8000/exports/1/download/"
+        }
+        ```
+    - **400 (Bad Request)**: Formato, filtros ou valores de filtro inválidos (validados como em `GET /parts/`).
+        ```json
+        {
+            "error": "Filtros inválidos: quantity."
+        }
+        ```
+    - **404 (Not Found)**: Exportação não encontrada ou arquivo não disponível.
+    '''
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def create(self, request, *args, **kwargs):
+        export_format = request.data.get('output', EXPORT_FORMAT_CSV)
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": "Formato de exportação inválido. Use 'csv' ou 'ndjson'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            filters = normalize_export_filters(request.data.get('filters') or {})
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        filters_hash = export_filters_hash(export_format, filters)
+        fresh = find_fresh_export(filters_hash)
+        if fresh:
+            return Response(self.get_serializer(fresh).data, status=status.HTTP_200_OK)
+
+        job = ExportJob.objects.create(
+            export_format=export_format, filters=filters, filters_hash=filters_hash, created_by=request.user
+        )
+        export_catalog.delay(job.id)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'], url_path='download')
+    def download(self, request, pk=None):
+        '''
+        Baixar Exportação
+
+        ### Descrição
+        - Retorna o arquivo `.zip` gerado pela exportação.
+        '''
+        job = self.get_object()
+        if job.status != 'done' or not job.file_path or not default_storage.exists(job.file_path):
+            return Response({"error": "O arquivo da exportação não está disponível."}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            default_storage.open(job.file_path, 'rb'), as_attachment=True,
+            filename=f"catalog-{job.id}.zip", content_type='application/zip',
+        )
+
+class ChangeFeedView(APIView):
+    '''
+    API de Alterações do Catálogo
+
+    ### Descrição
+    - Esta API retorna as peças, modelos de carro e associações peça/modelo de carro criados,
+      alterados ou removidos desde um cursor, para sincronização incremental.
+    - **Permissões**:
+        - Qualquer usuário autenticado.
+
+    ### Endpoints
+    - `GET /changes/` - Listar as alterações desde o cursor.
+
+    ### Parâmetros (GET)
+    | Nome   | Tipo   | Obrigatório | Descrição                                           | Exemplo |
+    |--------|--------|-------------|-----------------------------------------------------|---------|
+    | cursor | string | Não         | `next_cursor` da resposta anterior. Sem cursor, retorna todo o catálogo. | "eyJ0Ijo..." |
+    | limit  | int    | Não         | Quantidade máxima de alterações (padrão: 500, máximo: 1000). | 1000 |
+
+    ### Respostas
+    - **200 (OK)**: Alterações em ordem cronológica.
+        ```json
+        {
+            "results": [
+                {
+                    "entity": "part",
+                    "action": "updated",
+                    "id": 1,
+                    "changed_at": "2025-02-11T16:20:00-03:00",
+                    "data": {"id": 1, "part_number": "ABC123", "name": "Parafuso", "details": "Parafuso 10mm",
+                             "price": "15.99", "quantity": 100, "created_at": "...", "updated_at": "..."}
+                },
+                {
+                    "entity": "fitment",
+                    "action": "deleted",
+                    "id": 7,
+                    "changed_at": "2025-02-11T16:21:00-03:00",
+                    "data": {"part_id": 1, "car_model_id": 3}
+                }
+            ],
+            "next_cursor": "eyJ0IjogIjIwMjUtMDItMTFUMTY6MjE6MDAtMDM6MDAiLCAiciI6IDMsICJpIjogN30=",
+            "has_more": false,
+            "complete_until": "2025-02-11T16:21:30-03:00"
+        }
+        ```
+    - **400 (Bad Request)**: Cursor ou limite inválido.
+    - **410 (Gone)**: Cursor mais antigo que a retenção das remoções; refaça a carga completa sem cursor.
+        ```json
+        {
+            "error": "Cursor expirado. Refaça a sincronização completa."
+        }
+        ```
+
+    ### Observações
+    - `entity`: `part`, `car_model` ou `fitment`. `action`: `created`, `updated` ou `deleted`.
+    - Repita a requisição com `next_cursor` enquanto `has_more` for `true`; guarde o último
+      `next_cursor` para a próxima sincronização.
+    - Alterações dos últimos `CHANGES_FEED_LAG_SECONDS` segundos só aparecem na próxima consulta.
+    - `complete_until`: instante até o qual o feed está completo. No PostgreSQL, fica antes do início
+      da transação aberta mais antiga da aplicação; alterações posteriores aparecem nas próximas consultas.
+    '''
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.query_params.get('limit', CHANGES_DEFAULT_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= CHANGES_MAX_LIMIT:
+            return Response({"error": f"O limite deve estar entre 1 e {CHANGES_MAX_LIMIT}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            changes, next_cursor, has_more, complete_until = changes_since(request.query_params.get('cursor'), limit)
+        except ExpiredCursor:
+            return Response({"error": "Cursor expirado. Refaça a sincronização completa."}, status=status.HTTP_410_GONE)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "results": changes,
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+            "complete_until": complete_until,
+        })
+
+class CacheStatsView(APIView):
+    '''
+    API de Estatísticas do Cache do Catálogo
+
+    ### Descrição
+    - Esta API retorna os acertos e falhas de cada camada do cache das leituras do catálogo: a memória
+      do processo (`local`) e o Redis (`redis`).
+    - Os contadores são do processo que atendeu a requisição (`pid`), desde o seu início.
+    - **Permissões**:
+        - Apenas administradores.
+
+    ### Endpoints
+    - `GET /cache/stats/` - Estatísticas do cache deste processo.
+
+    ### Respostas
+    - **200 (OK)**: Estatísticas por camada.
+        ```json
+        {
+            "pid": 4242,
+            "local": {
+                "hits": 1520,
+                "misses": 87,
+                "entries": 85,
+                "max_entries": 5000,
+                "generations": {"hits": 3210, "misses": 42, "entries": 3, "max_entries": 5000},
+                "ttl": 5.0
+            },
+            "redis": {"hits": 60, "misses": 27},
+            "invalidation": {"subscribed": true, "messages": 39}
+        }
+        ```
+    - **401 (Unauthorized)**: Usuário não autenticado.
+    - **403 (Forbidden)**: Usuário não é administrador.
+
+    ### Observações
+    - `local.generations` conta as leituras das gerações dos modelos feitas na memória do processo.
+    - `redis` conta apenas as consultas que não foram atendidas pela camada local.
+    - `invalidation.subscribed` indica se o processo recebe as invalidações via Redis pub/sub; sem elas,
+      os dados locais ficam desatualizados por no máximo `CATALOG_LOCAL_CACHE_TTL` segundos.
+    '''
+    permission_classes = [IsAuthenticated, IsAdmin]
 
-        return Response({"message": "Arquivo enviado e processamento iniciado"}, status=status.HTTP_202_ACCEPTED)
\ No newline at end of file
+    def get(self, request, *args, **kwargs):
+        return Response(cache_stats())
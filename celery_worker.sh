@@ -1,4 +1,4 @@
 #!/bin/sh
 
 echo "Iniciando o Celery..."
-celery -A setup worker --loglevel=info
+celery -A setup worker --loglevel=info --concurrency=${CELERY_CONCURRENCY:-4}
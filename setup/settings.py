@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
 # Carregar variáveis do .env
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'automotivePartsManager',
     'rest_framework_simplejwt',
     'rest_framework',
@@ -186,8 +188,55 @@ SIMPLE_JWT = {
 
 # Configuração do Celery
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+# Tarefas periódicas executadas pelo Celery Beat
+CELERY_BEAT_SCHEDULE = {
+    'purge-upload-blobs': {
+        'task': 'automotivePartsManager.tasks.purge_upload_blobs',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'purge-tombstones': {
+        'task': 'automotivePartsManager.tasks.purge_change_tombstones',
+        'schedule': crontab(hour=3, minute=30),
+    },
+}
+# Backend de resultados necessário para o chord que agrega os shards da importação de CSV
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+# Configuração da importação de CSV
+CSV_IMPORT_BATCH_SIZE = int(os.getenv('CSV_IMPORT_BATCH_SIZE', 5000))
+# Tamanho do lote no caminho rápido via COPY (PostgreSQL)
+CSV_COPY_BATCH_SIZE = int(os.getenv('CSV_COPY_BATCH_SIZE', 50000))
+# Dias que os arquivos enviados ficam no storage após a importação
+UPLOAD_RETENTION_DAYS = int(os.getenv('UPLOAD_RETENTION_DAYS', 30))
+# Arquivos maiores que este tamanho (em bytes) são divididos em shards processados em paralelo
+CSV_SHARD_SIZE = int(os.getenv('CSV_SHARD_SIZE', 64 * 1024 * 1024))
+# Segundos sem gravar um lote após os quais um shard em processamento é considerado abandonado e pode ser reenviado
+CSV_SHARD_CLAIM_TIMEOUT = int(os.getenv('CSV_SHARD_CLAIM_TIMEOUT', 900))
+# Processos usados para validar as linhas do CSV dentro de cada tarefa de importação (1 = no próprio processo)
+CSV_PARSE_PROCESSES = int(os.getenv('CSV_PARSE_PROCESSES', 1))
+# Tamanho (em bytes) dos blocos do arquivo entregues a cada processo de validação
+CSV_PARSE_CHUNK_SIZE = int(os.getenv('CSV_PARSE_CHUNK_SIZE', 4 * 1024 * 1024))
+# Tamanho máximo (em bytes) de cada parte enviada numa sessão de upload em partes
+UPLOAD_CHUNK_MAX_SIZE = int(os.getenv('UPLOAD_CHUNK_MAX_SIZE', 32 * 1024 * 1024))
+# Pedidos de exportação com os mesmos filtros dentro deste intervalo (em segundos) reutilizam o arquivo gerado
+EXPORT_FRESHNESS_SECONDS = int(os.getenv('EXPORT_FRESHNESS_SECONDS', 15 * 60))
+# Feed de alterações: atraso (em segundos) antes de entregar uma alteração. No PostgreSQL, o feed também espera as
+# transações abertas (ver changes.oldest_open_transaction_start); este atraso cobre a diferença entre os relógios
+CHANGES_FEED_LAG_SECONDS = int(os.getenv('CHANGES_FEED_LAG_SECONDS', 5))
+# Dias que os registros de remoção (tombstones) ficam disponíveis; cursores mais antigos exigem carga completa
+CHANGES_TOMBSTONE_RETENTION_DAYS = int(os.getenv('CHANGES_TOMBSTONE_RETENTION_DAYS', 30))
+# Maior tamanho de página (page_size) aceito na paginação por cursor das listagens do catálogo
+PAGINATION_MAX_PAGE_SIZE = int(os.getenv('PAGINATION_MAX_PAGE_SIZE', 100))
+# Acima desta quantidade estimada de linhas, listagens de peças e modelos de carro informam a estimativa
+# do PostgreSQL em vez do COUNT(*) exato
+COUNT_ESTIMATE_THRESHOLD = int(os.getenv('COUNT_ESTIMATE_THRESHOLD', 100000))
+# Segundos que as respostas de leitura do catálogo ficam no cache (0 desativa); alterações as invalidam antes
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 300))
+# Cache em memória de cada processo para o detalhe de peças e modelos de carro: máximo de segundos que um
+# processo pode usar gerações desatualizadas se perder a invalidação via Redis pub/sub (0 desativa) e de entradas
+CATALOG_LOCAL_CACHE_TTL = float(os.getenv('CATALOG_LOCAL_CACHE_TTL', 5))
+CATALOG_LOCAL_CACHE_MAX_ENTRIES = int(os.getenv('CATALOG_LOCAL_CACHE_MAX_ENTRIES', 5000))
 # Configuração do Cache com Redis
 CACHES = {
     "default": {
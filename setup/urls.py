@@ -1,6 +1,6 @@
 from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
-from automotivePartsManager.views import CSVUploadView, PartViewSet, CarModelViewSet, PartCarModelViewSet, RegisterUserView, UserManagementViewSet
+from automotivePartsManager.views import CSVUploadView, PartViewSet, CarModelViewSet, PartCarModelViewSet, RegisterUserView, UserManagementViewSet, ImportJobViewSet, UploadSessionViewSet, ExportJobViewSet, ChangeFeedView, CacheStatsView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
@@ -26,6 +26,9 @@ router.register(r'parts', PartViewSet, basename='part')
 router.register(r'carmodels', CarModelViewSet, basename='carmodel')
 router.register(r'part-carmodel', PartCarModelViewSet, basename='partcarmodel')
 router.register(r'users', UserManagementViewSet, basename='user')
+router.register(r'imports', ImportJobViewSet, basename='importjob')
+router.register(r'upload-sessions', UploadSessionViewSet, basename='uploadsession')
+router.register(r'exports', ExportJobViewSet, basename='exportjob')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -36,6 +39,8 @@ urlpatterns = [
     path('part-carmodel/parts-by-car-model/', PartCarModelViewSet.as_view({'get': 'get_parts_by_car_model'}), name='get-parts-by-car-model'),
     path('part-carmodel/car-models-by-part/', PartCarModelViewSet.as_view({'get': 'get_car_models_by_part'}), name='get-car-models-by-part'),
     path('upload-csv/', CSVUploadView.as_view(), name='upload_csv'),
+    path('changes/', ChangeFeedView.as_view(), name='changes'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
 ]
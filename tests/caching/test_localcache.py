@@ -0,0 +1,160 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from automotivePartsManager.caching import (
+    bump_generations, get_generation_state, invalidation_listener, local_generations, local_responses, redis_responses,
+)
+from automotivePartsManager.localcache import InvalidationListener, LocalCache
+from automotivePartsManager.models import CarModel, CustomUser, Part
+
+# Testes do cache em memória do processo
+@override_settings(CATALOG_LOCAL_CACHE_MAX_ENTRIES=2)
+class LocalCacheTests(SimpleTestCase):
+    # Teste de descarte do item menos usado recentemente acima do limite de entradas
+    def test_evicts_least_recently_used(self):
+        local = LocalCache()
+        local.set('a', 1, 60)
+        local.set('b', 2, 60)
+        local.get('a')
+        local.set('c', 3, 60)
+
+        self.assertEqual(local.get('a'), 1)
+        self.assertIsNone(local.get('b'))
+        self.assertEqual(local.get('c'), 3)
+        self.assertEqual(local.stats(), {'hits': 3, 'misses': 1, 'entries': 2, 'max_entries': 2})
+
+    # Teste de expiração das entradas
+    def test_entries_expire(self):
+        local = LocalCache()
+        with mock.patch('automotivePartsManager.localcache.time.monotonic', return_value=100):
+            local.set('a', 1, 5)
+        with mock.patch('automotivePartsManager.localcache.time.monotonic', return_value=104):
+            self.assertEqual(local.get('a'), 1)
+        with mock.patch('automotivePartsManager.localcache.time.monotonic', return_value=105):
+            self.assertIsNone(local.get('a'))
+
+    # Teste de valor lido antes de uma invalidação, descartado ao ser guardado
+    def test_set_ignores_value_read_before_invalidation(self):
+        local = LocalCache()
+        epoch = local.epoch
+        local.delete_many(['a'])
+        local.set('a', 1, 60, epoch)
+        self.assertIsNone(local.get('a'))
+
+    # Teste das mensagens de invalidação recebidas por pub/sub
+    def test_listener_applies_messages(self):
+        received, resets = [], []
+        listener = InvalidationListener(received.append, lambda: resets.append(True))
+        pubsub = mock.Mock()
+        pubsub.listen.return_value = iter([
+            {'type': 'message', 'data': b'part,fitment'},
+            {'type': 'message', 'data': b'car_model'},
+        ])
+        client = mock.Mock(pubsub=mock.Mock(return_value=pubsub))
+
+        # Interrompe o laço de reconexão depois da primeira conexão
+        with mock.patch('automotivePartsManager.localcache.time.sleep', side_effect=SystemExit), self.assertRaises(SystemExit):
+            listener._run(client)
+
+        pubsub.subscribe.assert_called_once_with('catalog:invalidate')
+        self.assertEqual(received, [['part', 'fitment'], ['car_model']])
+        self.assertEqual(resets, [True])
+        self.assertEqual(listener.stats(), {'subscribed': False, 'messages': 2})
+
+# Testes da camada local na frente do Redis nas leituras do catálogo
+class TwoTierCacheTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="user@email.com",
+            username="user",
+            password="User!123",
+            role="user"
+        )
+        self.admin = CustomUser.objects.create_user(
+            email="admin@email.com",
+            username="admin",
+            password="Admin!123",
+            role="admin"
+        )
+        # Os dados iniciais são confirmados: as gravações de cada teste começam uma nova transação de invalidação
+        with self.captureOnCommitCallbacks(execute=True):
+            self.part = Part.objects.create(part_number="12345", name="Filtro de Óleo", details="Filtro", price=50.00, quantity=3)
+            self.car_model = CarModel.objects.create(name="Civic", manufacturer="Honda", year=2022)
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+    # Teste do detalhe repetido atendido pela memória do processo, sem consultar o Redis
+    def test_detail_is_served_from_local_tier(self):
+        url = reverse('part-detail', args=[self.part.id])
+        response = self.client.get(url)
+
+        local_hits, redis_hits = local_responses.hits, redis_responses.stats()['hits']
+        with self.assertNumQueries(1), mock.patch('automotivePartsManager.caching.cache.get') as redis_get:
+            cached = self.client.get(url)
+        redis_get.assert_not_called()
+        self.assertEqual(cached.data, response.data)
+        self.assertEqual(local_responses.hits, local_hits + 1)
+        self.assertEqual(redis_responses.stats()['hits'], redis_hits)
+
+    # Teste das entradas locais sem o serializer (e a requisição) da resposta que as gerou
+    def test_local_entries_are_detached_from_serializer(self):
+        url = reverse('part-detail', args=[self.part.id])
+        with mock.patch.object(local_responses, 'set', wraps=local_responses.set) as local_set:
+            response = self.client.get(url)
+
+        stored = local_set.call_args.args[1]
+        self.assertIs(type(stored), dict)
+        self.assertIs(type(stored['car_models']), list)
+        self.assertFalse(hasattr(stored, 'serializer'))
+        self.assertEqual(stored, response.data)
+
+    # Teste de invalidação das gerações locais ao gravar uma peça
+    def test_write_drops_local_generations(self):
+        url = reverse('part-detail', args=[self.part.id])
+        self.client.get(url)
+        self.part.name = "Filtro de Ar"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.part.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['name'], "Filtro de Ar")
+
+    # Teste do limite de desatualização: sem a invalidação, as gerações locais expiram em CATALOG_LOCAL_CACHE_TTL
+    @override_settings(CATALOG_LOCAL_CACHE_TTL=5)
+    def test_local_generations_are_bounded_by_ttl(self):
+        with mock.patch('automotivePartsManager.localcache.time.monotonic', return_value=1000):
+            before, _ = get_generation_state(('part',), local=True)
+        # Outro processo incrementa a geração; a mensagem de invalidação não chega a este
+        with mock.patch.object(local_generations, 'delete_many'):
+            bump_generations('part')
+
+        with mock.patch('automotivePartsManager.localcache.time.monotonic', return_value=1004):
+            self.assertEqual(get_generation_state(('part',), local=True)[0], before)
+        with mock.patch('automotivePartsManager.localcache.time.monotonic', return_value=1005):
+            self.assertGreater(get_generation_state(('part',), local=True)[0], before)
+
+    # Teste da camada local desativada com CATALOG_LOCAL_CACHE_TTL=0
+    @override_settings(CATALOG_LOCAL_CACHE_TTL=0)
+    def test_local_tier_disabled(self):
+        url = reverse('carmodel-detail', args=[self.car_model.id])
+        self.client.get(url)
+        local_hits = local_responses.hits
+        self.client.get(url)
+        self.assertEqual(local_responses.hits, local_hits)
+
+    # Teste das estatísticas por camada, apenas para administradores
+    def test_cache_stats(self):
+        response = self.client.get(reverse('cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        response = self.client.get(reverse('cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {'pid', 'local', 'redis', 'invalidation'})
+        self.assertEqual(set(response.data['redis']), {'hits', 'misses'})
+        self.assertIn('generations', response.data['local'])
+        self.assertEqual(response.data['invalidation']['subscribed'], invalidation_listener.subscribed)
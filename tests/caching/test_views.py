@@ -0,0 +1,182 @@
+from unittest import mock
+from django.db import IntegrityError, transaction
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.http import parse_http_date
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from automotivePartsManager.caching import bump_generations, get_generations
+from automotivePartsManager.models import CarModel, CustomUser, Part, PartCarModel
+
+# Testes do cache das respostas de leitura do catálogo
+class CatalogResponseCacheTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="user@email.com",
+            username="user",
+            password="User!123",
+            role="user"
+        )
+        self.admin = CustomUser.objects.create_user(
+            email="admin@email.com",
+            username="admin",
+            password="Admin!123",
+            role="admin"
+        )
+        # Os dados iniciais são confirmados: as gravações de cada teste começam uma nova transação de invalidação
+        with self.captureOnCommitCallbacks(execute=True):
+            self.part = Part.objects.create(part_number="12345", name="Filtro de Óleo", details="Filtro", price=50.00, quantity=3)
+            self.car_model = CarModel.objects.create(name="Civic", manufacturer="Honda", year=2022)
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+    # Teste de listagem repetida atendida pelo cache, com os parâmetros em qualquer ordem
+    def test_list_is_served_from_cache(self):
+        response = self.client.get(reverse('part-list'), {'ordering': 'price', 'page': 1})
+
+        # Apenas a autenticação consulta o banco
+        with self.assertNumQueries(1):
+            cached = self.client.get(reverse('part-list'), {'page': 1, 'ordering': 'price'})
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, response.data)
+
+    # Teste de invalidação ao gravar uma peça, sem apagar chaves
+    def test_save_invalidates_cached_list(self):
+        self.client.get(reverse('part-list'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Part.objects.filter(pk=self.part.pk).first().save()
+            Part.objects.create(part_number="67890", name="Bateria", details="60Ah", price=500.00, quantity=1)
+
+        response = self.client.get(reverse('part-list'))
+        self.assertEqual(response.data['count'], 2)
+
+    # Teste de invalidação das consultas de associações ao associar uma peça pela API
+    def test_association_invalidates_cached_lookup(self):
+        url = reverse('get-car-models-by-part')
+        response = self.client.get(url, {'part_id': self.part.id})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        with self.captureOnCommitCallbacks(execute=True):
+            other = CarModel.objects.create(name="Fit", manufacturer="Honda", year=2015)
+            PartCarModel.objects.create(part=self.part, car_model=other)
+        self.client.get(url, {'part_id': self.part.id})
+
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('associate-parts-to-car-models'),
+                {'part_ids': [self.part.id], 'car_model_ids': [self.car_model.id]}, format='json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(url, {'part_id': self.part.id})
+        self.assertEqual(response.data['count'], 2)
+
+    # Teste de gerações independentes por modelo
+    def test_generations_are_bumped_per_model(self):
+        before = get_generations(('part', 'car_model', 'fitment'))
+        CarModel.objects.create(name="Corolla", manufacturer="Toyota", year=2021)
+        after = get_generations(('part', 'car_model', 'fitment'))
+
+        self.assertEqual(after[0], before[0])
+        self.assertGreater(after[1], before[1])
+        self.assertEqual(after[2], before[2])
+
+    # Teste de invalidação agrupada por transação: um incremento na primeira gravação e outro no commit
+    def test_writes_in_one_transaction_bump_generation_twice(self):
+        with mock.patch('automotivePartsManager.caching.bump_generations', wraps=bump_generations) as bump:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                for i in range(10):
+                    Part.objects.create(part_number=f"PN{i}", name="Vela", details="Ok", price=5, quantity=1)
+                self.assertEqual(bump.call_args_list, [mock.call('part')])
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(bump.call_args_list, [mock.call('part'), mock.call('part')])
+
+    # Teste de gravação depois do rollback de um savepoint, que descarta o on_commit registrado nele
+    def test_write_after_rolled_back_savepoint_bumps_generation(self):
+        with mock.patch('automotivePartsManager.caching.bump_generations', wraps=bump_generations) as bump:
+            with self.captureOnCommitCallbacks() as callbacks:
+                with self.assertRaises(IntegrityError), transaction.atomic():
+                    Part.objects.create(part_number="PN1", name="Vela", details="Ok", price=5, quantity=1)
+                    Part.objects.create(part_number="PN1", name="Vela", details="Ok", price=5, quantity=1)
+                Part.objects.create(part_number="PN2", name="Vela", details="Ok", price=5, quantity=1)
+
+        self.assertEqual(bump.call_args_list, [mock.call('part'), mock.call('part')])
+        self.assertEqual(len(callbacks), 1)
+
+    # Teste do cache desativado com CATALOG_CACHE_TIMEOUT=0
+    @override_settings(CATALOG_CACHE_TIMEOUT=0)
+    def test_cache_disabled(self):
+        self.client.get(reverse('carmodel-list'))
+        # Autenticação + COUNT + página
+        with self.assertNumQueries(3):
+            self.client.get(reverse('carmodel-list'))
+
+# Testes das requisições condicionais (ETag/Last-Modified) nas leituras do catálogo
+@override_settings(CATALOG_CACHE_TIMEOUT=0)
+class CatalogConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="user@email.com",
+            username="user",
+            password="User!123",
+            role="user"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.part = Part.objects.create(part_number="12345", name="Filtro de Óleo", details="Filtro", price=50.00, quantity=3)
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+    # Teste dos validadores presentes nas respostas 200
+    def test_response_has_validators(self):
+        response = self.client.get(reverse('part-detail', args=[self.part.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+    # Teste de If-None-Match correspondente: 304 sem consultar o banco nem serializar, mesmo sem o cache de respostas
+    def test_matching_etag_returns_not_modified(self):
+        response = self.client.get(reverse('part-list'), {'ordering': 'price'})
+
+        # Apenas a autenticação consulta o banco
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(reverse('part-list'), {'ordering': 'price'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(not_modified.content, b'')
+
+    # Teste de If-Modified-Since igual ao Last-Modified
+    def test_if_modified_since_returns_not_modified(self):
+        response = self.client.get(reverse('part-list'))
+        not_modified = self.client.get(reverse('part-list'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    # Teste de ETag diferente para outros parâmetros e após uma alteração
+    def test_etag_changes_with_parameters_and_writes(self):
+        etag = self.client.get(reverse('part-list'))['ETag']
+        self.assertNotEqual(self.client.get(reverse('part-list'), {'ordering': 'price'})['ETag'], etag)
+
+        Part.objects.create(part_number="67890", name="Bateria", details="60Ah", price=500.00, quantity=1)
+        response = self.client.get(reverse('part-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+    # Teste de If-Modified-Since depois de duas alterações no mesmo segundo: o Last-Modified sempre avança
+    def test_last_modified_advances_for_changes_within_one_second(self):
+        bump_generations('part')
+        first = self.client.get(reverse('part-list'))
+        bump_generations('part')
+
+        response = self.client.get(reverse('part-list'), HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(parse_http_date(response['Last-Modified']), parse_http_date(first['Last-Modified']))
+
+    # Teste de respostas de erro sem validadores
+    def test_not_found_has_no_etag(self):
+        response = self.client.get(reverse('part-detail', args=[self.part.id + 100]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
@@ -154,3 +154,20 @@ class CarModelViewTests(APITestCase):
         self.assertEqual(response.data['next'], None)
         self.assertEqual(response.data['previous'], None)
         self.assertEqual(len(response.data['results']), 2)
+
+    # Teste de paginação por cursor na ordem de fabricante, nome e ano
+    def test_cursor_pagination_car_models(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        CarModel.objects.create(name="Civic", manufacturer="Honda", year=2020)
+        CarModel.objects.create(name="Fit", manufacturer="Honda", year=2015)
+
+        response = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 2})
+        seen = [(car['manufacturer'], car['name'], car['year']) for car in response.data['results']]
+        response = self.client.get(response.data['next'])
+        seen.extend((car['manufacturer'], car['name'], car['year']) for car in response.data['results'])
+
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(seen, [
+            ("Honda", "Civic", 2020), ("Honda", "Civic", 2022), ("Honda", "Fit", 2015), ("Toyota", "Corolla", 2021),
+        ])
@@ -0,0 +1,205 @@
+from datetime import timedelta
+from unittest import mock, skipUnless
+from django.db import connection, connections
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from automotivePartsManager.changes import CHANGE_SOURCES, changes_since, encode_cursor, oldest_open_transaction_start
+from automotivePartsManager.models import CarModel, CustomUser, Part, PartCarModel, Tombstone
+
+@override_settings(CHANGES_FEED_LAG_SECONDS=0)
+class ChangeFeedViewTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="user@email.com",
+            username="user",
+            password="User!123",
+            role="user"
+        )
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        self.part = Part.objects.create(part_number="PN1", name="Filtro", details="Ok", price=10.00, quantity=1)
+        self.car_model = CarModel.objects.create(name="Civic", manufacturer="Honda", year=2020)
+        self.fitment = PartCarModel.objects.create(part=self.part, car_model=self.car_model)
+        self.url = reverse('changes')
+
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    # Teste de carga inicial sem cursor retornando todo o catálogo como criado
+    def test_initial_sync_returns_created_records(self):
+        data = self.sync()
+
+        self.assertFalse(data['has_more'])
+        self.assertEqual(
+            sorted((change['entity'], change['action'], change['id']) for change in data['results']),
+            [('car_model', 'created', self.car_model.id), ('fitment', 'created', self.fitment.id), ('part', 'created', self.part.id)],
+        )
+
+    # Teste de sincronização incremental com alterações e remoções (tombstones)
+    def test_incremental_sync_returns_updates_and_tombstones(self):
+        cursor = self.sync()['next_cursor']
+
+        fitment_id = self.fitment.id
+        self.part.price = 12.00
+        self.part.save()
+        self.fitment.delete()
+        data = self.sync(cursor)
+
+        self.assertEqual(
+            [(change['entity'], change['action'], change['id']) for change in data['results']],
+            [('part', 'updated', self.part.id), ('fitment', 'deleted', fitment_id)],
+        )
+        self.assertEqual(data['results'][0]['data']['price'], 12)
+        self.assertEqual(data['results'][1]['data'], {'part_id': self.part.id, 'car_model_id': self.car_model.id})
+
+        # Sem novas alterações, o feed fica vazio e o cursor não muda
+        empty = self.sync(data['next_cursor'])
+        self.assertEqual(empty['results'], [])
+        self.assertEqual(empty['next_cursor'], data['next_cursor'])
+
+    # Teste de remoção em cascata registrando tombstones da peça e das suas associações
+    def test_cascade_delete_records_tombstones(self):
+        cursor = self.sync()['next_cursor']
+        self.part.delete()
+
+        data = self.sync(cursor)
+
+        self.assertEqual(
+            sorted((change['entity'], change['action']) for change in data['results']),
+            [('fitment', 'deleted'), ('part', 'deleted')],
+        )
+        self.assertEqual(Tombstone.objects.get(entity='part').data, {'part_number': 'PN1'})
+
+    # Teste de remoção em cascata com número de consultas fixo, independente do número de associações
+    def test_cascade_delete_records_tombstones_in_bulk(self):
+        car_models = CarModel.objects.bulk_create(
+            CarModel(name=f"Modelo {i}", manufacturer="Honda", year=2020) for i in range(50)
+        )
+        PartCarModel.objects.bulk_create(PartCarModel(part=self.part, car_model=car_model) for car_model in car_models)
+
+        # Consulta das associações, DELETE das associações, DELETE da peça e INSERT dos tombstones
+        with self.assertNumQueries(4):
+            self.part.delete()
+
+        self.assertEqual(Tombstone.objects.filter(entity='fitment').count(), 51)
+        self.assertEqual(
+            Tombstone.objects.get(entity='fitment', object_id=self.fitment.id).data,
+            {'part_id': self.fitment.part_id, 'car_model_id': self.car_model.id},
+        )
+
+    # Teste de remoção por QuerySet registrando os tombstones das linhas removidas
+    def test_queryset_delete_records_tombstones(self):
+        CarModel.objects.filter(pk=self.car_model.pk).delete()
+
+        self.assertEqual(
+            Tombstone.objects.get(entity='car_model').data,
+            {'manufacturer': 'Honda', 'name': 'Civic', 'year': 2020},
+        )
+        self.assertEqual(Tombstone.objects.get(entity='fitment').object_id, self.fitment.id)
+
+    # Teste de paginação por cursor com vários registros gravados no mesmo instante
+    def test_pagination_with_identical_timestamps(self):
+        Part.objects.bulk_create(
+            Part(part_number=f"PN{i}", name=f"Peça {i}", details="Ok", price=1, quantity=1) for i in range(2, 8)
+        )
+        instant = timezone.now() - timedelta(minutes=1)
+        Part.objects.update(updated_at=instant)
+        CarModel.objects.update(updated_at=instant)
+        PartCarModel.objects.update(created_at=instant)
+
+        seen, cursor = [], None
+        while True:
+            data = self.sync(cursor, limit=3)
+            seen.extend((change['entity'], change['id']) for change in data['results'])
+            cursor = data['next_cursor']
+            if not data['has_more']:
+                break
+
+        self.assertEqual(len(seen), 9)
+        self.assertEqual(len(set(seen)), 9)
+
+    # Teste de sincronização sem alterações custando uma consulta por tabela
+    def test_empty_sync_runs_one_query_per_source(self):
+        _, cursor, _, _ = changes_since()
+        # No PostgreSQL, mais uma consulta para as transações abertas
+        with self.assertNumQueries(len(CHANGE_SOURCES) + (connection.vendor == 'postgresql')):
+            changes, _, _, _ = changes_since(cursor)
+        self.assertEqual(changes, [])
+
+    # Teste de linhas gravadas com instante anterior ao cursor, mas confirmadas depois dele (lote longo de importação)
+    def test_rows_committed_after_cursor_with_earlier_timestamp(self):
+        now = timezone.now()
+        Part.objects.filter(pk=self.part.pk).update(updated_at=now - timedelta(minutes=10))
+        CarModel.objects.update(updated_at=now - timedelta(minutes=10))
+        PartCarModel.objects.update(created_at=now - timedelta(minutes=10))
+        transaction_start = now - timedelta(minutes=5)
+        later = Part.objects.create(part_number="PN3", name="Vela", details="Ok", price=5, quantity=1)
+        Part.objects.filter(pk=later.pk).update(updated_at=now - timedelta(minutes=1))
+
+        # Um lote iniciado há 5 minutos ainda não foi confirmado: o feed para antes do início dele
+        with mock.patch('automotivePartsManager.changes.oldest_open_transaction_start', return_value=transaction_start):
+            data = self.sync()
+        self.assertEqual(len(data['results']), 3)
+        self.assertNotIn(later.id, [change['id'] for change in data['results'] if change['entity'] == 'part'])
+
+        # O lote confirma linhas com o instante do seu início, anterior ao da última alteração entregue
+        batch = Part.objects.create(part_number="PN2", name="Bateria", details="60Ah", price=500, quantity=1)
+        Part.objects.filter(pk=batch.pk).update(updated_at=transaction_start)
+
+        data = self.sync(data['next_cursor'])
+        self.assertEqual(
+            [(change['entity'], change['id']) for change in data['results']],
+            [('part', batch.id), ('part', later.id)],
+        )
+
+    # Teste do limite do feed antes da transação aberta mais antiga, informado em complete_until
+    def test_feed_is_capped_before_oldest_open_transaction(self):
+        transaction_start = timezone.now() - timedelta(minutes=5)
+        Part.objects.filter(pk=self.part.pk).update(updated_at=transaction_start - timedelta(minutes=1))
+        CarModel.objects.update(updated_at=transaction_start)
+        PartCarModel.objects.update(created_at=transaction_start + timedelta(minutes=1))
+
+        with mock.patch('automotivePartsManager.changes.oldest_open_transaction_start', return_value=transaction_start):
+            data = self.sync()
+
+        self.assertEqual(data['complete_until'], transaction_start - timedelta(microseconds=1))
+        self.assertEqual([(change['entity'], change['id']) for change in data['results']], [('part', self.part.id)])
+        self.assertFalse(data['has_more'])
+
+    # Teste da transação aberta por outra conexão
+    @skipUnless(connection.vendor == 'postgresql', "pg_stat_activity exige PostgreSQL")
+    def test_oldest_open_transaction_start(self):
+        other = connections.create_connection('default')
+        self.addCleanup(other.close)
+        other.set_autocommit(False)
+        with other.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+        started = oldest_open_transaction_start()
+
+        self.assertIsNotNone(started)
+        self.assertLessEqual(started, timezone.now())
+        other.rollback()
+
+    # Teste de cursor inválido (deve retornar erro 400) e expirado (deve retornar erro 410)
+    def test_invalid_and_expired_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'invalido'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        expired = encode_cursor(timezone.now() - timedelta(days=365), 0, 1)
+        response = self.client.get(self.url, {'cursor': expired})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    # Teste de acesso sem autenticação (deve retornar erro 401)
+    def test_changes_unauthenticated(self):
+        self.client.credentials()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
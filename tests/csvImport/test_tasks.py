@@ -0,0 +1,503 @@
+import bz2
+import gzip
+import io
+import lzma
+import shutil
+import tempfile
+import zipfile
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from datetime import timedelta
+from automotivePartsManager.caching import get_generations
+from automotivePartsManager.importers import _parse_range, iter_csv_records, iter_csv_rows, load_parts_copy, plan_shards
+from automotivePartsManager.importers import iter_rejected_rows_files, load_parts, received_chunks, store_chunk
+from automotivePartsManager.models import CarModel, ImportJob, ImportShard, Part, PartCarModel, UploadSession
+from automotivePartsManager.tasks import process_csv, process_csv_shard, purge_upload_blobs
+from setup.celery import app
+
+CSV_HEADER = "part_number,name,details,price,quantity\n"
+
+class ProcessCSVTaskTest(TestCase):
+    """Testes para a tarefa process_csv"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, CSV_IMPORT_BATCH_SIZE=2)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def save_csv(self, content, name="parts.csv"):
+        data = content if isinstance(content, bytes) else content.encode('utf-8')
+        return default_storage.save(f"uploads/{name}", ContentFile(data))
+
+    def create_job(self, content, mode='insert', kind='parts', dry_run=False):
+        return ImportJob.objects.create(file_path=self.save_csv(content), mode=mode, kind=kind, dry_run=dry_run)
+
+    def test_process_csv_reads_file_from_storage_in_batches(self):
+        """Testa se todas as linhas são inseridas mesmo quando excedem o tamanho do lote"""
+        rows = "".join(f"PN{i},Peça {i},Detalhes {i},{i}.50,{i}\n" for i in range(1, 6))
+        job = self.create_job(CSV_HEADER + rows)
+
+        total = process_csv(job.id)
+
+        self.assertEqual(total, 5)
+        self.assertEqual(Part.objects.count(), 5)
+        part = Part.objects.get(part_number="PN3")
+        self.assertEqual(part.name, "Peça 3")
+        self.assertEqual(str(part.price), "3.50")
+        self.assertEqual(part.quantity, 3)
+
+    def test_process_csv_invalidates_cached_parts(self):
+        """Testa se cada lote gravado incrementa a geração das peças no cache, e a simulação não"""
+        rows = "".join(f"PN{i},Peça {i},Detalhes {i},{i}.50,{i}\n" for i in range(1, 4))
+        before = get_generations(('part', 'car_model'))
+
+        process_csv(self.create_job(CSV_HEADER + rows, dry_run=True).id)
+        self.assertEqual(get_generations(('part', 'car_model')), before)
+
+        process_csv(self.create_job(CSV_HEADER + rows).id)
+        after = get_generations(('part', 'car_model'))
+        self.assertEqual(after[0], before[0] + 2)
+        self.assertEqual(after[1], before[1])
+
+    def test_process_csv_with_only_header(self):
+        """Testa se um CSV sem linhas não insere nenhuma peça"""
+        job = self.create_job(CSV_HEADER)
+
+        self.assertEqual(process_csv(job.id), 0)
+        self.assertEqual(Part.objects.count(), 0)
+
+    def test_process_csv_upsert_updates_existing_parts(self):
+        """Testa se o modo upsert atualiza peças existentes e insere as novas pelo part_number"""
+        Part.objects.create(part_number="PN1", name="Filtro", details="Antigo", price=10.00, quantity=1)
+        job = self.create_job(
+            CSV_HEADER
+            + "PN1,Filtro,Novo,12.00,7\n"
+            + "PN2,Bateria,60Ah,500.00,3\n",
+            mode='upsert',
+        )
+
+        process_csv(job.id)
+
+        self.assertEqual(Part.objects.count(), 2)
+        part = Part.objects.get(part_number="PN1")
+        self.assertEqual(part.details, "Novo")
+        self.assertEqual(str(part.price), "12.00")
+        self.assertEqual(part.quantity, 7)
+
+    def test_upsert_keeps_unchanged_parts_untouched(self):
+        """Testa se o upsert não regrava (nem altera o updated_at de) peças idênticas às cadastradas"""
+        Part.objects.create(part_number="PN1", name="Filtro", details="Igual", price=12.00, quantity=7)
+        Part.objects.create(part_number="PN2", name="Bateria", details="60Ah", price=500.00, quantity=3)
+        before = timezone.now() - timedelta(days=1)
+        Part.objects.update(updated_at=before)
+
+        load_parts([("PN1", "Filtro", "Igual", Decimal("12.00"), 7), ("PN2", "Bateria", "60Ah", Decimal("450.00"), 3)], 'upsert')
+
+        self.assertEqual(Part.objects.get(part_number="PN1").updated_at, before)
+        changed = Part.objects.get(part_number="PN2")
+        self.assertGreater(changed.updated_at, before)
+        self.assertEqual(changed.price, Decimal("450.00"))
+
+    def test_process_csv_insert_ignores_existing_parts(self):
+        """Testa se o modo insert não duplica nem altera peças já cadastradas"""
+        Part.objects.create(part_number="PN1", name="Filtro", details="Antigo", price=10.00, quantity=1)
+        job = self.create_job(CSV_HEADER + "PN1,Filtro,Novo,12.00,7\nPN1,Filtro,Repetido,13.00,8\n")
+
+        process_csv(job.id)
+
+        self.assertEqual(Part.objects.filter(part_number="PN1").count(), 1)
+        self.assertEqual(Part.objects.get(part_number="PN1").details, "Antigo")
+        # As linhas ignoradas pelo ON CONFLICT DO NOTHING não contam como gravadas
+        job.refresh_from_db()
+        self.assertEqual(job.rows_processed, 0)
+        self.assertEqual((job.rows_inserted, job.rows_updated, job.rows_unchanged), (0, 0, 2))
+
+    def test_process_csv_counts_inserted_updated_and_unchanged_parts(self):
+        """Testa se a importação separa as peças inseridas, atualizadas e mantidas"""
+        Part.objects.create(part_number="PN1", name="Filtro", details="Igual", price=10.00, quantity=1)
+        Part.objects.create(part_number="PN2", name="Vela", details="Antiga", price=20.00, quantity=2)
+        content = CSV_HEADER + "PN1,Filtro,Igual,10.00,1\nPN2,Vela,Nova,25.00,2\nPN3,Correia,Ok,30.00,3\n"
+
+        insert_job = self.create_job(content)
+        process_csv(insert_job.id)
+        insert_job.refresh_from_db()
+        self.assertEqual(insert_job.rows_processed, 1)
+        self.assertEqual((insert_job.rows_inserted, insert_job.rows_updated, insert_job.rows_unchanged), (1, 0, 2))
+
+        Part.objects.filter(part_number="PN3").delete()
+        upsert_job = self.create_job(content, mode='upsert')
+        process_csv(upsert_job.id)
+        upsert_job.refresh_from_db()
+        self.assertEqual(upsert_job.rows_processed, 2)
+        self.assertEqual((upsert_job.rows_inserted, upsert_job.rows_updated, upsert_job.rows_unchanged), (1, 1, 1))
+
+    def test_shards_cover_every_row_exactly_once(self):
+        """Testa se os intervalos de bytes cobrem todas as linhas, sem repetir nenhuma"""
+        rows = "".join(f"PN{i},Peça {i},\"Detalhes, {i}\",{i}.00,{i}\n" for i in range(1, 50))
+        file_path = self.save_csv(CSV_HEADER + rows)
+
+        for shard_size in (1, 7, 64, 10 ** 6):
+            shards = plan_shards(file_path, shard_size)
+            part_numbers = [
+                row['part_number']
+                for start, end in shards
+                for row in iter_csv_rows(file_path, start, end)
+            ]
+            self.assertEqual(part_numbers, [f"PN{i}" for i in range(1, 50)])
+
+    def test_process_csv_fans_out_large_files_in_shards(self):
+        """Testa se arquivos maiores que CSV_SHARD_SIZE são importados por shards em paralelo"""
+        rows = "".join(f"PN{i},Peça {i},Detalhes {i},{i}.00,{i}\n" for i in range(1, 21))
+        job = self.create_job(CSV_HEADER + rows)
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, 'task_always_eager', False)
+
+        with override_settings(CSV_SHARD_SIZE=100):
+            process_csv(job.id)
+
+        self.assertEqual(Part.objects.count(), 20)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertGreater(job.total_shards, 1)
+        self.assertEqual(job.rows_processed, 20)
+
+    def test_shards_keep_quoted_newlines_in_one_record(self):
+        """Testa se os shards começam em inícios de registro, sem dividir campos entre aspas com quebras de linha"""
+        details = "Linha 1\nPNX,Falsa,Linha,1.00,1\nLinha 3"
+        rows = "".join(f"PN{i},Peça {i},\"{details} {i}\",{i}.00,{i}\n" for i in range(1, 11))
+        job = self.create_job(CSV_HEADER + rows)
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, 'task_always_eager', False)
+
+        with override_settings(CSV_SHARD_SIZE=30):
+            process_csv(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertGreater(job.total_shards, 1)
+        self.assertEqual(job.rows_processed, 10)
+        self.assertEqual(job.rows_rejected, 0)
+        self.assertEqual(
+            list(Part.objects.order_by('price').values_list('part_number', 'details')),
+            [(f"PN{i}", f"{details} {i}") for i in range(1, 11)],
+        )
+
+    def test_redelivered_process_csv_skips_claimed_shards(self):
+        """Testa se uma nova execução não reenvia os shards ainda em processamento por outra tarefa"""
+        rows = "".join(f"PN{i},Peça {i},Detalhes {i},{i}.00,{i}\n" for i in range(1, 21))
+        job = self.create_job(CSV_HEADER + rows)
+
+        with override_settings(CSV_SHARD_SIZE=100), patch('automotivePartsManager.tasks.chord') as mock_chord:
+            process_csv(job.id)
+            dispatched = list(mock_chord.call_args.args[0])
+            self.assertEqual(len(dispatched), job.shards.count())
+            self.assertEqual(
+                sorted(signature.options['task_id'] for signature in dispatched),
+                sorted(job.shards.values_list('claimed_by', flat=True)),
+            )
+
+            # Reentrega enquanto os shards do chord ainda estão em processamento
+            mock_chord.reset_mock()
+            self.assertIsNone(process_csv(job.id))
+            mock_chord.assert_not_called()
+
+            # Um shard sem lote gravado há mais de CSV_SHARD_CLAIM_TIMEOUT foi abandonado e é reenviado
+            stale = job.shards.first()
+            ImportShard.objects.filter(pk=stale.pk).update(claimed_at=timezone.now() - timedelta(hours=1))
+            process_csv(job.id)
+            self.assertEqual([signature.args[1] for signature in mock_chord.call_args.args[0]], [stale.id])
+
+        self.assertEqual(Part.objects.count(), 0)
+
+    def test_process_csv_shard_ignores_shard_claimed_by_another_task(self):
+        """Testa se uma mensagem antiga de um shard reivindicado por outra tarefa não grava nada"""
+        job = self.create_job(CSV_HEADER + "PN1,Peça 1,Detalhes 1,1.00,1\n")
+        shard = ImportShard.objects.create(job=job, start=0, end=None, committed_offset=0, claimed_by='outra', claimed_at=timezone.now())
+
+        result = process_csv_shard.apply(args=(job.id, shard.id), task_id='antiga').get()
+
+        self.assertEqual(result, 0)
+        self.assertEqual(Part.objects.count(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.rows_processed, 0)
+
+    def test_process_csv_parses_in_process_pool(self):
+        """Testa se a validação em vários processos grava cada linha exatamente uma vez, na ordem do arquivo"""
+        rows = "".join(
+            f"PN{i},Peça {i},Detalhes {i},{i}.00,{i}\n" if i % 7 else f"PN{i},Peça {i},Inválida,abc,{i}\n"
+            for i in range(1, 41)
+        )
+        job = self.create_job(CSV_HEADER + rows)
+
+        with override_settings(CSV_PARSE_PROCESSES=2, CSV_PARSE_CHUNK_SIZE=100):
+            process_csv(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.rows_processed, 35)
+        self.assertEqual(job.rows_rejected, 5)
+        self.assertEqual(Part.objects.count(), 35)
+        self.assertEqual(job.shards.get().committed_offset, len((CSV_HEADER + rows).encode('utf-8')))
+
+    def test_parse_chunks_keep_quoted_newlines_in_one_record(self):
+        """Testa se um campo entre aspas com quebras de linha que atravessa o limite de um bloco é lido inteiro"""
+        details = "Linha 1\nPNX,Falsa,Linha,1.00,1\nLinha 3"
+        rows = "".join(f"PN{i},Peça {i},\"{details} {i}\",{i}.00,{i}\n" for i in range(1, 11))
+        job = self.create_job(CSV_HEADER + rows)
+
+        with override_settings(CSV_PARSE_PROCESSES=2, CSV_PARSE_CHUNK_SIZE=30):
+            process_csv(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.rows_processed, 10)
+        self.assertEqual(job.rows_rejected, 0)
+        self.assertEqual(
+            list(Part.objects.order_by('price').values_list('part_number', 'details')),
+            [(f"PN{i}", f"{details} {i}") for i in range(1, 11)],
+        )
+
+    def test_parse_workers_return_original_row_only_for_rejected_rows(self):
+        """Testa se os processos de validação devolvem a linha original apenas das linhas rejeitadas"""
+        content = CSV_HEADER + "PN1,Peça 1,Detalhes 1,1.00,1\nPN2,Peça 2,Detalhes 2,abc,2\n"
+        file_path = self.save_csv(content)
+
+        valid, rejected = _parse_range('parts', file_path, 0, len(content.encode('utf-8')))
+
+        self.assertEqual(valid[:3], (None, ("PN1", "Peça 1", "Detalhes 1", Decimal("1.00"), 1), None))
+        self.assertEqual(rejected[0]['price'], "abc")
+        self.assertEqual(rejected[1:3], (None, "Preço inválido."))
+
+    def test_process_csv_rejects_invalid_rows_and_loads_valid_ones(self):
+        """Testa se linhas inválidas são rejeitadas sem impedir a gravação das válidas"""
+        job = self.create_job(
+            CSV_HEADER
+            + "PN1,Filtro,Ok,10.00,1\n"
+            + "PN2,Vela,Preço inválido,abc,1\n"
+            + "PN3,Bateria,Ok,500.00,3\n"
+            + "PN4,Correia,Quantidade negativa,80.00,-1\n"
+            + ",Sem número,Ok,1.00,1\n"
+        )
+
+        process_csv(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.rows_processed, 2)
+        self.assertEqual(job.rows_rejected, 3)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(sorted(Part.objects.values_list('part_number', flat=True)), ["PN1", "PN3"])
+        rejected = b"".join(default_storage.open(path).read() for path in iter_rejected_rows_files(job)).decode()
+        self.assertIn("PN2,Vela,Preço inválido,abc,1,Preço inválido.", rejected)
+        self.assertIn("A quantidade não pode ser negativa.", rejected)
+        self.assertIn("O campo 'part_number' é obrigatório.", rejected)
+
+    def test_process_csv_imports_car_models_ignoring_existing(self):
+        """Testa se a importação de modelos de carro ignora modelos já cadastrados"""
+        CarModel.objects.create(name="Civic", manufacturer="Honda", year=2020)
+        job = self.create_job(
+            "name,manufacturer,year\n"
+            + "Civic,Honda,2020\n"
+            + "Corolla,Toyota,2021\n"
+            + "Gol,Volkswagen,abc\n"
+            + "Onix,Chevrolet,2022\n",
+            kind='car_models',
+        )
+
+        process_csv(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.rows_rejected, 1)
+        self.assertEqual((job.rows_processed, job.rows_unchanged), (2, 1))
+        self.assertEqual(CarModel.objects.count(), 3)
+        rejected = b"".join(default_storage.open(path).read() for path in iter_rejected_rows_files(job)).decode()
+        self.assertIn("Gol,Volkswagen,abc,", rejected)
+
+    def test_process_csv_imports_fitments_and_rejects_unknown_references(self):
+        """Testa se as compatibilidades são associadas pelas chaves naturais e referências inexistentes são rejeitadas"""
+        filtro = Part.objects.create(part_number="PN1", name="Filtro", details="Ok", price=10.00, quantity=1)
+        vela = Part.objects.create(part_number="PN2", name="Vela", details="Ok", price=20.00, quantity=1)
+        civic = CarModel.objects.create(name="Civic", manufacturer="Honda", year=2020)
+        corolla = CarModel.objects.create(name="Corolla", manufacturer="Toyota", year=2021)
+        PartCarModel.objects.create(part=filtro, car_model=civic)
+        job = self.create_job(
+            "part_number,manufacturer,name,year\n"
+            + "PN1,Honda,Civic,2020\n"
+            + "PN1,Toyota,Corolla,2021\n"
+            + "PN2,Honda,Civic,2020\n"
+            + "PN9,Honda,Civic,2020\n"
+            + "PN2,Fiat,Uno,1990\n",
+            kind='fitments',
+        )
+
+        process_csv(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.rows_rejected, 2)
+        self.assertEqual(
+            set(PartCarModel.objects.values_list('part_id', 'car_model_id')),
+            {(filtro.id, civic.id), (filtro.id, corolla.id), (vela.id, civic.id)},
+        )
+        rejected = b"".join(default_storage.open(path).read() for path in iter_rejected_rows_files(job)).decode()
+        self.assertIn("PN9,Honda,Civic,2020,Peça não encontrada.", rejected)
+        self.assertIn("PN2,Fiat,Uno,1990,Modelo de carro não encontrado.", rejected)
+
+    def test_dry_run_counts_changes_without_writing(self):
+        """Testa se a simulação conta inserções, atualizações e linhas mantidas sem alterar as peças"""
+        Part.objects.create(part_number="PN1", name="Filtro", details="Ok", price=10.00, quantity=1)
+        Part.objects.create(part_number="PN2", name="Vela", details="Ok", price=20.00, quantity=2)
+        Part.objects.create(part_number="PN3", name="Correia", details="Antiga", price=30.00, quantity=3)
+        content = (
+            CSV_HEADER
+            + "PN1,Filtro,Ok,10.00,1\n"
+            + "PN2,Vela,Ok,18.00,2\n"
+            + "PN3,Correia,Nova,30.00,3\n"
+            + "PN4,Bateria,Ok,500.00,4\n"
+            + "PN5,Pneu,Ok,abc,1\n"
+        )
+        job = self.create_job(content, mode='upsert', dry_run=True)
+
+        process_csv(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual((job.rows_inserted, job.rows_updated, job.rows_unchanged), (1, 2, 1))
+        self.assertEqual(job.rows_rejected, 1)
+        sample = {change['part_number']: change for change in job.preview_sample(10)}
+        self.assertEqual(sample['PN2']['price_delta'], "-2.00")
+        self.assertEqual(sample['PN3']['price_delta'], "0.00")
+        self.assertEqual(sample['PN4']['action'], 'insert')
+        self.assertEqual(Part.objects.count(), 3)
+        self.assertEqual(Part.objects.get(part_number="PN3").details, "Antiga")
+
+        # No modo insert as peças existentes seriam ignoradas
+        insert_job = self.create_job(content, dry_run=True)
+        process_csv(insert_job.id)
+        insert_job.refresh_from_db()
+        self.assertEqual((insert_job.rows_inserted, insert_job.rows_updated, insert_job.rows_unchanged), (1, 0, 3))
+
+    def test_process_csv_resumes_from_last_committed_batch(self):
+        """Testa se uma importação interrompida continua do último lote gravado, sem reprocessar linhas"""
+        rows = "".join(f"PN{i},Peça {i},Detalhes {i},{i}.00,{i}\n" for i in range(1, 8))
+        job = self.create_job(CSV_HEADER + rows)
+        calls = []
+
+        def fail_on_third_batch(batch, mode):
+            calls.append([row[0] for row in batch])
+            if len(calls) == 3:
+                raise RuntimeError("worker reiniciado")
+            return load_parts(batch, mode)
+
+        with patch('automotivePartsManager.importers.load_parts', side_effect=fail_on_third_batch):
+            with self.assertRaises(RuntimeError):
+                process_csv(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.rows_processed, 4)
+
+        with patch('automotivePartsManager.importers.load_parts', side_effect=load_parts) as mock_load:
+            process_csv(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.rows_processed, 7)
+        self.assertEqual(Part.objects.count(), 7)
+        resumed = [row[0] for call in mock_load.call_args_list for row in call.args[0]]
+        self.assertEqual(resumed, ["PN5", "PN6", "PN7"])
+
+    def test_process_csv_with_compressed_files(self):
+        """Testa a importação de arquivos .csv.gz, .csv.bz2, .csv.xz e .zip"""
+        zip_buffer = io.BytesIO()
+        compressors = {
+            "parts.csv.gz": gzip.compress,
+            "parts.csv.bz2": bz2.compress,
+            "parts.csv.xz": lzma.compress,
+        }
+        for index, name in enumerate(list(compressors) + ["parts.zip"]):
+            content = (CSV_HEADER + f"GZ{index},Filtro,Ok,10.00,1\nXX{index},Vela,Ok,5.00,2\n").encode('utf-8')
+            if name.endswith(".zip"):
+                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+                    archive.writestr("parts.csv", content)
+                data = zip_buffer.getvalue()
+            else:
+                data = compressors[name](content)
+            job = ImportJob.objects.create(file_path=self.save_csv(data, name))
+
+            with override_settings(CSV_SHARD_SIZE=10):
+                self.assertEqual(process_csv(job.id), 2)
+
+            self.assertEqual(job.shards.count(), 1)
+            self.assertTrue(Part.objects.filter(part_number=f"XX{index}").exists())
+
+    def test_compressed_file_resumes_from_decompressed_offset(self):
+        """Testa se a leitura de um arquivo compactado pode ser retomada a partir de um offset"""
+        content = CSV_HEADER + "PN1,Filtro,Ok,10.00,1\nPN2,Vela,Ok,5.00,2\nPN3,Bateria,Ok,500.00,3\n"
+        file_path = self.save_csv(gzip.compress(content.encode('utf-8')), "parts.csv.gz")
+        records = list(iter_csv_records(file_path))
+
+        resumed = [row['part_number'] for row, _ in iter_csv_records(file_path, records[0][1])]
+
+        self.assertEqual(resumed, ["PN2", "PN3"])
+
+    def test_purge_upload_blobs_removes_only_stale_files(self):
+        """Testa se a retenção remove apenas arquivos sem importações recentes ou em andamento"""
+        stale = self.create_job(CSV_HEADER)
+        shared = ImportJob.objects.create(file_path=self.save_csv(CSV_HEADER, "shared.csv"), status='done')
+        ImportJob.objects.create(file_path=shared.file_path, status='done')
+        old = timezone.now() - timedelta(days=60)
+        ImportJob.objects.filter(id__in=[stale.id, shared.id]).update(status='done', created_at=old)
+
+        with override_settings(UPLOAD_RETENTION_DAYS=30):
+            removed = purge_upload_blobs()
+
+        self.assertEqual(removed, 1)
+        self.assertFalse(default_storage.exists(stale.file_path))
+        self.assertTrue(default_storage.exists(shared.file_path))
+
+    def test_purge_upload_blobs_removes_abandoned_upload_sessions(self):
+        """Testa se a retenção remove sessões de upload abertas há muito tempo e suas partes"""
+        stale = UploadSession.objects.create(filename="parts.csv")
+        recent = UploadSession.objects.create(filename="parts.csv")
+        store_chunk(stale, 0, b"part_number")
+        store_chunk(recent, 0, b"part_number")
+        UploadSession.objects.filter(id=stale.id).update(created_at=timezone.now() - timedelta(days=60))
+
+        with override_settings(UPLOAD_RETENTION_DAYS=30):
+            purge_upload_blobs()
+
+        self.assertFalse(UploadSession.objects.filter(id=stale.id).exists())
+        self.assertEqual(received_chunks(stale), [])
+        self.assertEqual(received_chunks(recent), [0])
+
+@skipUnless(connection.vendor == 'postgresql', "O caminho COPY só existe no PostgreSQL")
+class LoadPartsCopyTest(TestCase):
+    """Testes para o caminho rápido de importação via COPY"""
+
+    def test_copy_inserts_and_upserts_parts(self):
+        """Testa se o COPY insere peças novas e atualiza as existentes no modo upsert"""
+        Part.objects.create(part_number="PN1", name="Filtro", details="Antigo", price=10.00, quantity=1)
+        rows = [
+            ("PN1", "Filtro", "Novo", Decimal("12.00"), 7),
+            ("PN2", "Bateria", "", Decimal("500.00"), 3),
+        ]
+
+        self.assertEqual(load_parts_copy(rows, 'upsert'), (1, 1))
+
+        self.assertEqual(Part.objects.count(), 2)
+        self.assertEqual(Part.objects.get(part_number="PN1").details, "Novo")
+        self.assertEqual(Part.objects.get(part_number="PN2").details, "")
+        # Peças já cadastradas são ignoradas pelo ON CONFLICT DO NOTHING e não são contadas
+        self.assertEqual(load_parts_copy(rows + [("PN3", "Vela", "Ok", Decimal("5.00"), 1)], 'insert'), (1, 0))
@@ -0,0 +1,393 @@
+import gzip
+import hashlib
+import io
+import shutil
+import tempfile
+import zipfile
+from unittest.mock import patch
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from automotivePartsManager.models import CustomUser, ImportJob, ImportShard, Part, UploadSession
+from automotivePartsManager.tasks import process_csv
+from setup.celery import app
+
+class CSVUploadViewTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = CustomUser.objects.create_user(
+            email="user@email.com",
+            username="user",
+            password="User!123",
+            role="user"
+        )
+        self.admin = CustomUser.objects.create_user(
+            email="admin@email.com",
+            username="admin",
+            password="Admin!123",
+            role="admin"
+        )
+        self.url = reverse('upload_csv')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    # Teste de upload de CSV criando uma importação e enviando apenas o seu id para o Celery
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_upload_csv_creates_import_job(self, mock_delay):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        file = SimpleUploadedFile("parts.csv", b"part_number,name,details,price,quantity\n", content_type="text/csv")
+
+        response = self.client.post(self.url, {'file': file}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = ImportJob.objects.get(id=response.data['job_id'])
+        mock_delay.assert_called_once_with(job.id)
+        self.assertEqual(job.status, 'pending')
+        self.assertTrue(default_storage.exists(job.file_path))
+        self.assertTrue(response.data['status_url'].endswith(reverse('importjob-detail', args=[job.id])))
+
+    # Teste de upload sem arquivo (deve retornar erro 400)
+    def test_upload_without_file(self):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+        response = self.client.post(self.url, {}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Teste de upload com modo de importação inválido (deve retornar erro 400)
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_upload_with_invalid_mode(self, mock_delay):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        file = SimpleUploadedFile("parts.csv", b"part_number,name,details,price,quantity\n", content_type="text/csv")
+
+        response = self.client.post(self.url, {'file': file, 'mode': 'replace'}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_delay.assert_not_called()
+
+    # Teste de upload com tipo de importação inválido (deve retornar erro 400)
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_upload_with_invalid_kind(self, mock_delay):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        file = SimpleUploadedFile("parts.csv", b"part_number,name,details,price,quantity\n", content_type="text/csv")
+
+        response = self.client.post(self.url, {'file': file, 'kind': 'users'}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_delay.assert_not_called()
+
+    # Teste de upload de compatibilidades registrando o tipo da importação
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_upload_fitments_creates_job_with_kind(self, mock_delay):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        file = SimpleUploadedFile("fitments.csv", b"part_number,manufacturer,name,year\n", content_type="text/csv")
+
+        response = self.client.post(self.url, {'file': file, 'kind': 'fitments'}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(ImportJob.objects.get(id=response.data['job_id']).kind, 'fitments')
+
+    # Teste de simulação de importação retornando o resumo das alterações sem gravar peças
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_dry_run_upload_returns_preview(self, mock_delay):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        Part.objects.create(part_number="PN1", name="Filtro", details="Ok", price=10.00, quantity=1)
+        content = b"part_number,name,details,price,quantity\nPN1,Filtro,Ok,12.50,1\nPN2,Vela,Nova,5.00,3\n"
+        file = SimpleUploadedFile("parts.csv", content, content_type="text/csv")
+
+        response = self.client.post(self.url, {'file': file, 'mode': 'upsert', 'dry_run': 'true'}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        process_csv(response.data['job_id'])
+
+        job = self.client.get(reverse('importjob-detail', args=[response.data['job_id']])).data
+        self.assertTrue(job['dry_run'])
+        self.assertEqual(job['preview']['inserted'], 1)
+        self.assertEqual(job['preview']['updated'], 1)
+        self.assertIn(
+            {"part_number": "PN1", "action": "update", "price_before": "10.00", "price_after": "12.50",
+             "price_delta": "2.50", "quantity_before": 1, "quantity_after": 1},
+            job['preview']['sample'],
+        )
+        self.assertEqual(Part.objects.get(part_number="PN1").price, 10)
+        self.assertFalse(Part.objects.filter(part_number="PN2").exists())
+
+        # A simulação não conta como importação: o mesmo arquivo ainda pode ser importado de fato
+        file = SimpleUploadedFile("parts.csv", content, content_type="text/csv")
+        response = self.client.post(self.url, {'file': file, 'mode': 'upsert'}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+    # Teste de simulação solicitada para importação que não é de peças (deve retornar erro 400)
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_dry_run_only_for_parts(self, mock_delay):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        file = SimpleUploadedFile("models.csv", b"name,manufacturer,year\n", content_type="text/csv")
+
+        response = self.client.post(self.url, {'file': file, 'kind': 'car_models', 'dry_run': 'true'}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_delay.assert_not_called()
+
+    # Teste de consulta do andamento de uma importação com linhas rejeitadas
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_import_job_status_and_rejected_rows(self, mock_delay):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        content = b"part_number,name,details,price,quantity\nPN1,Filtro,Ok,10.00,1\nPN2,Vela,Erro,-5,1\n"
+        file = SimpleUploadedFile("parts.csv", content, content_type="text/csv")
+        job_id = self.client.post(self.url, {'file': file}, format='multipart').data['job_id']
+        process_csv(job_id)
+
+        response = self.client.get(reverse('importjob-detail', args=[job_id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'done')
+        self.assertEqual(response.data['rows_processed'], 1)
+        self.assertEqual(response.data['rows_rejected'], 1)
+        self.assertIn('rows_per_second', response.data)
+        self.assertIn('elapsed_seconds', response.data)
+
+        rejected = self.client.get(response.data['rejected_rows_url'])
+        self.assertEqual(rejected.status_code, status.HTTP_200_OK)
+        lines = b"".join(rejected.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "part_number,name,details,price,quantity,error")
+        self.assertEqual(lines[1], "PN2,Vela,Erro,-5,1,O preço deve ser maior que zero.")
+
+    # Teste de consulta de importação com usuário comum (deve retornar erro 403)
+    def test_import_job_status_as_user(self):
+        job = ImportJob.objects.create(file_path="uploads/parts.csv")
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+        response = self.client.get(reverse('importjob-detail', args=[job.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    # Teste de retomada de uma importação que não falhou (deve retornar erro 400)
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_resume_import_job_not_failed(self, mock_delay):
+        job = ImportJob.objects.create(file_path="uploads/parts.csv", status='done')
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+        response = self.client.post(reverse('importjob-resume', args=[job.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_delay.assert_not_called()
+
+    # Teste de retomada de uma importação com falha
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_resume_failed_import_job(self, mock_delay):
+        job = ImportJob.objects.create(file_path="uploads/parts.csv", status='failed')
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+        response = self.client.post(reverse('importjob-resume', args=[job.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        mock_delay.assert_called_once_with(job.id)
+
+    # Teste de retomada de uma importação com shards ainda em processamento (deve retornar erro 409)
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_resume_import_job_with_running_shards(self, mock_delay):
+        job = ImportJob.objects.create(file_path="uploads/parts.csv", status='failed')
+        ImportShard.objects.create(job=job, start=0, end=100, committed_offset=0, claimed_by='tarefa', claimed_at=timezone.now())
+        ImportShard.objects.create(job=job, start=100, end=200, committed_offset=100)
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+        response = self.client.post(reverse('importjob-resume', args=[job.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        mock_delay.assert_not_called()
+
+    # Teste de upload de .zip com mais de um arquivo (deve retornar erro 400)
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_upload_zip_with_multiple_files(self, mock_delay):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr("a.csv", "part_number,name,details,price,quantity\n")
+            archive.writestr("b.csv", "part_number,name,details,price,quantity\n")
+        file = SimpleUploadedFile("parts.zip", buffer.getvalue(), content_type="application/zip")
+
+        response = self.client.post(self.url, {'file': file}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], "O arquivo .zip deve conter um único arquivo CSV.")
+        mock_delay.assert_not_called()
+
+    # Teste de upload de CSV compactado com gzip
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_upload_gzip_csv(self, mock_delay):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        file = SimpleUploadedFile("parts.csv.gz", b"\x1f\x8b", content_type="application/gzip")
+
+        response = self.client.post(self.url, {'file': file}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(ImportJob.objects.get(id=response.data['job_id']).file_path.endswith(".gz"))
+
+    # Teste de reenvio de um arquivo idêntico já importado (deve retornar a importação anterior)
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_upload_identical_file_returns_previous_job(self, mock_delay):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        content = b"part_number,name,details,price,quantity\nPN1,Filtro,Ok,10.00,1\n"
+
+        first = self.client.post(self.url, {'file': SimpleUploadedFile("a.csv", content)}, format='multipart')
+        ImportJob.objects.filter(id=first.data['job_id']).update(status='done')
+        second = self.client.post(self.url, {'file': SimpleUploadedFile("b.csv", content)}, format='multipart')
+        forced = self.client.post(self.url, {'file': SimpleUploadedFile("b.csv", content), 'force': 'true'}, format='multipart')
+
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data['job_id'], first.data['job_id'])
+        self.assertEqual(forced.status_code, status.HTTP_202_ACCEPTED)
+        self.assertNotEqual(forced.data['job_id'], first.data['job_id'])
+        self.assertEqual(mock_delay.call_count, 2)
+        job = ImportJob.objects.get(id=first.data['job_id'])
+        self.assertEqual(job.file_path, f"uploads/{job.file_hash[:2]}/{job.file_hash}.csv")
+        self.assertEqual(ImportJob.objects.get(id=forced.data['job_id']).file_path, job.file_path)
+
+    # Teste de reenvio de um arquivo cuja importação anterior falhou (deve importar novamente)
+    @patch('automotivePartsManager.views.process_csv.delay')
+    def test_upload_identical_file_after_failed_import(self, mock_delay):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        content = b"part_number,name,details,price,quantity\n"
+
+        first = self.client.post(self.url, {'file': SimpleUploadedFile("a.csv", content)}, format='multipart')
+        ImportJob.objects.filter(id=first.data['job_id']).update(status='failed')
+        second = self.client.post(self.url, {'file': SimpleUploadedFile("a.csv", content)}, format='multipart')
+
+        self.assertEqual(second.status_code, status.HTTP_202_ACCEPTED)
+        self.assertNotEqual(second.data['job_id'], first.data['job_id'])
+
+class UploadSessionViewTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, UPLOAD_CHUNK_MAX_SIZE=64)
+        self.settings_override.enable()
+        self.admin = CustomUser.objects.create_user(
+            email="admin@email.com",
+            username="admin",
+            password="Admin!123",
+            role="admin"
+        )
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def open_session(self, **data):
+        response = self.client.post(reverse('uploadsession-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def put_chunk(self, session_id, number, data, **headers):
+        url = reverse('uploadsession-chunk', args=[session_id, number])
+        return self.client.put(url, data, content_type='application/octet-stream', **headers)
+
+    # Teste de envio em partes fora de ordem, com reenvio de parte, até a importação do arquivo montado
+    def test_chunked_upload_imports_assembled_file(self):
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, 'task_always_eager', False)
+        content = gzip.compress(
+            b"part_number,name,details,price,quantity\n"
+            + b"".join(f"PN{i},Peca {i},Detalhes {i},{i}.00,{i}\n".encode() for i in range(1, 11))
+        )
+        chunks = [content[i:i + 64] for i in range(0, len(content), 64)]
+        session_id = self.open_session(filename="parts.csv.gz", mode='upsert')
+
+        for number in reversed(range(len(chunks))):
+            self.assertEqual(self.put_chunk(session_id, number, chunks[number]).status_code, status.HTTP_200_OK)
+        # Reenvio de uma parte após falha na conexão substitui a anterior
+        response = self.put_chunk(session_id, 0, chunks[0], HTTP_X_CHUNK_SHA256=hashlib.sha256(chunks[0]).hexdigest())
+        self.assertEqual(response.data['received_chunks'], list(range(len(chunks))))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('uploadsession-finalize', args=[session_id]), {'total_chunks': len(chunks)}, format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = ImportJob.objects.get(id=response.data['job_id'])
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.rows_processed, 10)
+        self.assertEqual(job.file_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(Part.objects.count(), 10)
+        session = UploadSession.objects.get(id=session_id)
+        self.assertEqual(session.status, 'finalized')
+        self.assertEqual(session.job, job)
+        self.assertEqual(default_storage.listdir(session.chunks_dir)[1], [])
+
+    # Teste de finalização com partes ausentes e de envio após a finalização (devem retornar erro 400)
+    @patch('automotivePartsManager.views.assemble_upload_session.delay')
+    def test_finalize_requires_every_chunk(self, mock_delay):
+        session_id = self.open_session(filename="parts.csv")
+        self.put_chunk(session_id, 0, b"part_number,name")
+        self.put_chunk(session_id, 2, b",price,quantity")
+        finalize_url = reverse('uploadsession-finalize', args=[session_id])
+
+        response = self.client.post(finalize_url, {'total_chunks': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], "Partes ausentes: [1]")
+
+        self.put_chunk(session_id, 1, b",details")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(finalize_url, {'total_chunks': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        mock_delay.assert_called_once_with(session_id)
+
+        self.assertEqual(self.put_chunk(session_id, 3, b"PN1").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(finalize_url, {'total_chunks': 3}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Teste de falha ao criar a importação: a sessão continua aberta e a finalização pode ser repetida
+    @patch('automotivePartsManager.views.assemble_upload_session.delay')
+    def test_failed_finalize_keeps_session_open(self, mock_delay):
+        session_id = self.open_session(filename="parts.csv")
+        self.put_chunk(session_id, 0, b"part_number,name,details,price,quantity\n")
+        finalize_url = reverse('uploadsession-finalize', args=[session_id])
+
+        with patch('automotivePartsManager.views.ImportJob.objects.create', side_effect=RuntimeError("banco indisponível")):
+            with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+                self.client.post(finalize_url, {'total_chunks': 1}, format='json')
+        mock_delay.assert_not_called()
+        self.assertEqual(UploadSession.objects.get(id=session_id).status, 'open')
+        self.assertFalse(ImportJob.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(finalize_url, {'total_chunks': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        mock_delay.assert_called_once_with(session_id)
+
+    # Teste de envio de parte corrompida ou maior que o limite
+    def test_chunk_checksum_and_size_are_validated(self):
+        session_id = self.open_session(filename="parts.csv")
+
+        response = self.put_chunk(session_id, 0, b"part_number", HTTP_X_CHUNK_SHA256="0" * 64)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.put_chunk(session_id, 0, b"x" * 65)
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(self.client.get(reverse('uploadsession-detail', args=[session_id])).data['received_chunks'], [])
@@ -0,0 +1,155 @@
+import io
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from automotivePartsManager.exporters import write_catalog_snapshot
+from automotivePartsManager.models import CarModel, CustomUser, ExportJob, Part, PartCarModel
+from automotivePartsManager.tasks import purge_upload_blobs
+from setup.celery import app
+
+class ExportJobViewTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = CustomUser.objects.create_user(
+            email="user@email.com",
+            username="user",
+            password="User!123",
+            role="user"
+        )
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        self.filtro = Part.objects.create(part_number="PN1", name="Filtro de Óleo", details="Ok", price=10.00, quantity=1)
+        self.bateria = Part.objects.create(part_number="PN2", name="Bateria", details="60Ah", price=500.00, quantity=2)
+        self.civic = CarModel.objects.create(name="Civic", manufacturer="Honda", year=2020)
+        PartCarModel.objects.create(part=self.filtro, car_model=self.civic)
+        PartCarModel.objects.create(part=self.bateria, car_model=self.civic)
+        self.url = reverse('exportjob-list')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    # Teste de exportação assíncrona gerando um .zip com peças filtradas, modelos e compatibilidades
+    def test_export_job_writes_compressed_snapshot(self):
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, 'task_always_eager', False)
+
+        response = self.client.post(self.url, {'filters': {'search': 'Filtro'}}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = self.client.get(reverse('exportjob-detail', args=[response.data['id']])).data
+        self.assertEqual(job['status'], 'done')
+
+        download = self.client.get(job['download_url'])
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        with zipfile.ZipFile(io.BytesIO(b"".join(download.streaming_content))) as archive:
+            self.assertEqual(sorted(archive.namelist()), ['car_models.csv', 'fitments.csv', 'parts.csv'])
+            parts = archive.read('parts.csv').decode('utf-8').splitlines()
+            fitments = archive.read('fitments.csv').decode('utf-8').splitlines()
+            car_models = archive.read('car_models.csv').decode('utf-8').splitlines()
+        self.assertEqual(parts, ["id,part_number,name,details,price,quantity", f"{self.filtro.id},PN1,Filtro de Óleo,Ok,10.00,1"])
+        self.assertEqual(fitments, ["part_number,manufacturer,name,year", "PN1,Honda,Civic,2020"])
+        self.assertEqual(car_models, ["id,name,manufacturer,year", f"{self.civic.id},Civic,Honda,2020"])
+
+    # Teste de reutilização de exportação recente com os mesmos filtros
+    @patch('automotivePartsManager.views.export_catalog.delay')
+    def test_identical_export_within_freshness_window_is_reused(self, mock_delay):
+        first = self.client.post(self.url, {'output': 'ndjson', 'filters': {'name': 'Bateria'}}, format='json')
+        second = self.client.post(self.url, {'output': 'ndjson', 'filters': {'name': 'Bateria'}}, format='json')
+        other_format = self.client.post(self.url, {'filters': {'name': 'Bateria'}}, format='json')
+
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertEqual(other_format.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(mock_delay.call_count, 2)
+
+        # Fora da janela de validade, uma nova exportação é gerada
+        ExportJob.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        third = self.client.post(self.url, {'output': 'ndjson', 'filters': {'name': 'Bateria'}}, format='json')
+        self.assertEqual(third.status_code, status.HTTP_202_ACCEPTED)
+
+    # Teste de exportação com filtro não aceito pela listagem de peças (deve retornar erro 400)
+    @patch('automotivePartsManager.views.export_catalog.delay')
+    def test_export_with_invalid_filter(self, mock_delay):
+        response = self.client.post(self.url, {'filters': {'quantity': 1}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_delay.assert_not_called()
+
+    # Teste de exportação com valores de filtro ou ordenação inválidos (deve retornar erro 400 já no pedido)
+    @patch('automotivePartsManager.views.export_catalog.delay')
+    def test_export_with_invalid_filter_values(self, mock_delay):
+        response = self.client.post(self.url, {'filters': {'price': 'abc'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('price', response.data['error'])
+
+        response = self.client.post(self.url, {'filters': {'ordering': '-price,quantity'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], "Ordenação inválida: quantity.")
+
+        response = self.client.post(self.url, {'filters': {'price': '10.00', 'ordering': '-price,name'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        mock_delay.assert_called_once()
+        self.assertFalse(ExportJob.objects.exclude(id=response.data['id']).exists())
+
+    # Teste de download de exportação ainda não concluída (deve retornar erro 404)
+    @patch('automotivePartsManager.views.export_catalog.delay')
+    def test_download_pending_export(self, mock_delay):
+        response = self.client.post(self.url, {}, format='json')
+        download = self.client.get(reverse('exportjob-download', args=[response.data['id']]))
+        self.assertEqual(download.status_code, status.HTTP_404_NOT_FOUND)
+
+    # Teste de remoção dos arquivos de exportações antigas pela retenção
+    def test_purge_removes_stale_export_files(self):
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, 'task_always_eager', False)
+        job_id = self.client.post(self.url, {}, format='json').data['id']
+        file_path = ExportJob.objects.get(id=job_id).file_path
+        ExportJob.objects.update(created_at=timezone.now() - timedelta(days=60))
+
+        with override_settings(UPLOAD_RETENTION_DAYS=30):
+            purge_upload_blobs()
+
+        self.assertFalse(default_storage.exists(file_path))
+        self.assertIsNone(self.client.get(reverse('exportjob-detail', args=[job_id])).data['download_url'])
+
+    # Teste de exportação sem autenticação (deve retornar erro 401)
+    def test_export_unauthenticated(self):
+        self.client.credentials()
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+# Teste da leitura das três tabelas num único snapshot do PostgreSQL
+@skipUnless(connection.vendor == 'postgresql', "REPEATABLE READ exige PostgreSQL")
+class CatalogSnapshotIsolationTests(TransactionTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        Part.objects.create(part_number="PN1", name="Filtro de Óleo", details="Ok", price=10.00, quantity=1)
+
+    def test_snapshot_is_read_in_one_repeatable_read_transaction(self):
+        job = ExportJob.objects.create(filters_hash="0" * 64)
+
+        with CaptureQueriesContext(connection) as queries:
+            write_catalog_snapshot(job)
+
+        statements = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(statements[0], "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        self.assertFalse(connection.in_atomic_block)
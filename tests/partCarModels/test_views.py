@@ -159,3 +159,62 @@ class PartCarModelViewTests(APITestCase):
 
         response = self.client.post(self.associate_parts_to_car_models_url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    # Teste de listagem de associações com número fixo de consultas, independente da quantidade
+    def test_list_associations_without_n_plus_one_queries(self):
+        car_models = CarModel.objects.bulk_create(
+            CarModel(name=f"Modelo {i}", manufacturer="Fiat", year=2000 + i) for i in range(15)
+        )
+        PartCarModel.objects.bulk_create(PartCarModel(part=self.part1, car_model=car_model) for car_model in car_models)
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+        # Autenticação + COUNT da paginação + página com peça e modelo de carro no mesmo JOIN
+        with self.assertNumQueries(3):
+            response = self.client.get(self.partcarmodel_list_url)
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual(len(response.data['results']), 10)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(f'{self.get_car_models_by_part_url}?part_id={self.part1.id}&page=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+        with self.assertNumQueries(3):
+            response = self.client.get(f'{self.get_parts_by_car_model_url}?car_model_id={car_models[0].id}')
+        self.assertEqual(response.data['results'][0]['part']['part_number'], self.part1.part_number)
+
+    # Teste de paginação por cursor das associações, sem COUNT
+    def test_cursor_pagination_associations(self):
+        car_models = CarModel.objects.bulk_create(
+            CarModel(name=f"Modelo {i}", manufacturer="Fiat", year=2000 + i) for i in range(15)
+        )
+        PartCarModel.objects.bulk_create(PartCarModel(part=self.part1, car_model=car_model) for car_model in car_models)
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+        # Autenticação + página com peça e modelo de carro no mesmo JOIN
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                self.get_car_models_by_part_url, {'part_id': self.part1.id, 'pagination': 'cursor', 'page_size': 10}
+            )
+        self.assertNotIn('count', response.data)
+        ids = [association['car_model']['id'] for association in response.data['results']]
+        with self.assertNumQueries(2):
+            response = self.client.get(response.data['next'])
+        ids.extend(association['car_model']['id'] for association in response.data['results'])
+
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(ids, sorted(car_model.id for car_model in car_models))
+
+    # Teste de consulta de peças de um modelo de carro sem associações (deve retornar erro 404)
+    def test_parts_by_car_model_without_associations(self):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+        response = self.client.get(f'{self.get_parts_by_car_model_url}?car_model_id={self.car_model2.id}')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['error'], "Nenhuma peça associada a este modelo de carro")
@@ -1,4 +1,5 @@
 import unittest
+from django.db import IntegrityError
 from django.test import TestCase
 from automotivePartsManager.models import Part
 
@@ -39,3 +40,9 @@ class PartModelTest(TestCase):
             price=80.00
         )
         self.assertEqual(part.quantity, 0)
+
+    def test_part_number_is_unique(self):
+        """Testa se não é possível cadastrar duas peças com o mesmo part_number"""
+        Part.objects.create(part_number="DUP1", name="Vela", details="Vela de ignição", price=20.00)
+        with self.assertRaises(IntegrityError):
+            Part.objects.create(part_number="DUP1", name="Vela", details="Outra vela", price=22.00)
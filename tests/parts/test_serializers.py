@@ -9,6 +9,7 @@ class PartListSerializerTest(TestCase):
     def test_valid_data(self):
         """Testa a serialização de dados válidos"""
         data = {
+            "part_number": "FO-123",
             "name": "Filtro de Óleo",
             "details": "Filtro de alta qualidade",
             "price": 45.00,
@@ -17,6 +18,22 @@ class PartListSerializerTest(TestCase):
         serializer = PartListSerializer(data=data)
         self.assertTrue(serializer.is_valid())
 
+    def test_part_number_required_on_create(self):
+        """Testa a obrigatoriedade do part_number na criação, mas não na atualização"""
+        data = {
+            "name": "Filtro de Óleo",
+            "details": "Filtro de alta qualidade",
+            "price": 45.00,
+            "quantity": 10
+        }
+        serializer = PartListSerializer(data=data)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("part_number", serializer.errors)
+
+        part = Part.objects.create(part_number="FO-123", name="Filtro", details="", price=10, quantity=1)
+        serializer = PartListSerializer(part, data=data)
+        self.assertTrue(serializer.is_valid())
+
     def test_invalid_price(self):
         """Testa a validação de preço negativo"""
         data = {
@@ -1,7 +1,13 @@
+import json
+from unittest import skipUnless
+from unittest.mock import patch
+from django.db import connection
 from rest_framework import status
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
-from automotivePartsManager.models import Part, CustomUser
+from automotivePartsManager.models import CarModel, Part, CustomUser, PartCarModel
+from automotivePartsManager.pagination import estimate_count
 from automotivePartsManager.serializers import PartListSerializer, PartDetailSerializer
 from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import AccessToken
@@ -54,7 +60,7 @@ class PartViewTests(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
         response = self.client.get(self.url_detail)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        serializer = PartDetailSerializer(self.part1)
+        serializer = PartDetailSerializer(self.part1, context={'request': response.wsgi_request})
         self.assertEqual(response.data, serializer.data)
 
     # Teste de criação de peças com usuário admin autenticado (role: 'admin')
@@ -71,6 +77,37 @@ class PartViewTests(APITestCase):
         response = self.client.post(self.url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    # Teste de criação de peças sem 'part_number', repetida (deve retornar erro 400, não erro de integridade)
+    def test_create_part_without_part_number_twice_as_admin(self):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        data = {
+            'name': 'Amortecedor',
+            'details': 'Amortecedor dianteiro',
+            'price': 1200.50,
+            'quantity': 10
+        }
+        for _ in range(2):
+            response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('part_number', response.data)
+        self.assertEqual(Part.objects.count(), 2)
+
+    # Teste de criação de peça com 'part_number' já existente (deve retornar erro 400)
+    def test_create_part_with_duplicate_part_number_as_admin(self):
+        access_token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        data = {
+            'part_number': self.part1.part_number,
+            'name': 'Amortecedor',
+            'details': 'Amortecedor dianteiro',
+            'price': 1200.50,
+            'quantity': 10
+        }
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('part_number', response.data)
+
     # Teste de criação de peças com usuário admin e com dados inválidos (role: 'admin')
     def test_create_part_with_invalid_data_as_admin(self):
         access_token = AccessToken.for_user(self.admin)
@@ -195,4 +232,257 @@ class PartViewTests(APITestCase):
         self.assertEqual(response.data['count'], 2)
         self.assertEqual(response.data['next'], None)
         self.assertEqual(response.data['previous'], None)
-        self.assertEqual(len(response.data['results']), 2)
\ No newline at end of file
+        self.assertEqual(len(response.data['results']), 2)
+    # Teste de exportação do catálogo em CSV com filtro, busca e ordenação da listagem
+    def test_export_parts_csv_as_user(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        Part.objects.create(part_number="11111", name="Filtro de Ar", details="Filtro", price=80.00, quantity=5)
+
+        response = self.client.get(reverse('part-export'), {'search': 'Filtro', 'ordering': 'price'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b"".join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(lines[0], "id,part_number,name,details,price,quantity")
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ["11111", "12345"])
+
+    # Teste de exportação do catálogo em NDJSON filtrando por 'part_number'
+    def test_export_parts_ndjson_as_user(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+        response = self.client.get(reverse('part-export'), {'output': 'ndjson', 'part_number': '67890'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual(rows, [{
+            "id": self.part2.id, "part_number": "67890", "name": "Bateria",
+            "details": "Bateria de 60Ah", "price": "500.00", "quantity": 15,
+        }])
+
+    # Teste de exportação com formato inválido (deve retornar erro 400)
+    def test_export_parts_with_invalid_output(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        response = self.client.get(reverse('part-export'), {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Teste de exportação sem autenticação (deve retornar erro 401)
+    def test_export_parts_unauthenticated(self):
+        response = self.client.get(reverse('part-export'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    # Teste de detalhe da peça com modelos de carro compatíveis limitados, total e link da lista completa
+    def test_retrieve_part_embeds_capped_car_models(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        car_models = CarModel.objects.bulk_create(
+            CarModel(name=f"Modelo {i:02d}", manufacturer="Fiat", year=2000 + i) for i in range(30)
+        )
+        PartCarModel.objects.bulk_create(PartCarModel(part=self.part1, car_model=car_model) for car_model in car_models)
+
+        # Autenticação + peça com o total de associações + prefetch dos modelos de carro
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url_detail)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['car_models_count'], 30)
+        self.assertEqual(len(response.data['car_models']), 20)
+        self.assertEqual(response.data['car_models'][0]['name'], "Modelo 00")
+        self.assertTrue(response.data['car_models_url'].endswith(f"/part-carmodel/car-models-by-part/?part_id={self.part1.id}"))
+
+    # Teste de listagem com modelos de carro embutidos apenas quando solicitado
+    def test_list_parts_with_car_models_flag(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        civic = CarModel.objects.create(name="Civic", manufacturer="Honda", year=2020)
+        PartCarModel.objects.create(part=self.part1, car_model=civic)
+        PartCarModel.objects.create(part=self.part2, car_model=civic)
+
+        response = self.client.get(self.url)
+        self.assertNotIn('car_models', response.data['results'][0])
+
+        # Autenticação + COUNT da paginação + página de peças + um único prefetch para todas as peças
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url, {'include': 'car_models'})
+        for part in response.data['results']:
+            self.assertEqual(part['car_models_count'], 1)
+            self.assertEqual(part['car_models'][0]['name'], "Civic")
+
+    # Teste de paginação por cursor: percorre as páginas pelos links, com desempate por id em nomes repetidos
+    def test_cursor_pagination_parts(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        for i in range(5):
+            Part.objects.create(part_number=f"DUP-{i}", name="Correia", details="Correia", price=10 + i, quantity=1)
+        expected = list(Part.objects.order_by('name', 'id').values_list('part_number', flat=True))
+
+        # Autenticação + página, sem COUNT
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 3})
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        seen = [part['part_number'] for part in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(part['part_number'] for part in response.data['results'])
+        self.assertEqual(seen, expected)
+
+        # Voltando pelo link 'previous' a partir da última página
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([part['part_number'] for part in response.data['results']], expected[3:6])
+
+    # Teste de paginação por cursor seguindo a ordenação escolhida pelo cliente
+    def test_cursor_pagination_parts_with_ordering(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        Part.objects.create(part_number="11111", name="Vela", details="Vela", price=500.00, quantity=1)
+
+        response = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 2, 'ordering': '-price'})
+        self.assertEqual([part['part_number'] for part in response.data['results']], ["12345", "67890"])
+        # Mesmo preço: o id desempata
+        response = self.client.get(response.data['next'])
+        self.assertEqual([part['part_number'] for part in response.data['results']], ["11111"])
+        self.assertIsNone(response.data['next'])
+
+    # Teste do tamanho de página limitado ao máximo configurado
+    @override_settings(PAGINATION_MAX_PAGE_SIZE=1)
+    def test_cursor_pagination_page_size_is_capped(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        response = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+    # Teste de cursor inválido ou de outra ordenação (deve retornar erro 400)
+    def test_cursor_pagination_invalid_cursor(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        response = self.client.get(self.url, {'cursor': 'invalido'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 1})
+        cursor = response.data['next'].split('cursor=')[1].split('&')[0]
+        response = self.client.get(self.url, {'cursor': cursor, 'ordering': 'price'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Teste de contagem exata abaixo do limite de estimativa
+    def test_list_parts_count_is_exact_below_threshold(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 2)
+        self.assertTrue(response.data['count_is_exact'])
+
+    # Teste de contagem estimada acima do limite: a próxima página é conferida pelas linhas, não pelo total
+    @override_settings(COUNT_ESTIMATE_THRESHOLD=1)
+    def test_list_parts_with_estimated_count(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        Part.objects.bulk_create(
+            Part(part_number=f"EST-{i}", name=f"Peça {i:02d}", details="", price=1, quantity=1) for i in range(10)
+        )
+
+        # Estimativa menor que o total real: a segunda página ainda é entregue
+        with patch('automotivePartsManager.pagination.estimate_count', return_value=5):
+            response = self.client.get(self.url)
+            self.assertEqual(response.data['count'], 5)
+            self.assertFalse(response.data['count_is_exact'])
+            self.assertIsNotNone(response.data['next'])
+
+            response = self.client.get(response.data['next'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data['results']), 2)
+            self.assertIsNone(response.data['next'])
+
+            response = self.client.get(self.url, {'page': 3})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    # Teste da estimativa do planejador do PostgreSQL, com e sem filtros
+    @skipUnless(connection.vendor == 'postgresql', "Estimativas do planejador exigem PostgreSQL")
+    def test_estimate_count_uses_planner(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(Part._meta.db_table)}")
+        self.assertGreaterEqual(estimate_count(Part.objects.all()), 0)
+        self.assertGreaterEqual(estimate_count(Part.objects.filter(name="Bateria")), 0)
+
+    # Teste de busca por '?search=' em qualquer banco
+    def test_search_parts(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        response = self.client.get(self.url, {'search': 'Bateria'})
+        self.assertEqual([part['part_number'] for part in response.data['results']], ["67890"])
+
+    # Teste da busca textual do PostgreSQL: stemming em português, part_number e ordenação por relevância
+    @skipUnless(connection.vendor == 'postgresql', "Busca textual exige PostgreSQL")
+    def test_full_text_search_parts(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        Part.objects.create(part_number="99999", name="Junta", details="Compatível com filtros de óleo", price=10, quantity=1)
+
+        response = self.client.get(self.url, {'search': 'filtros'})
+        # O nome pesa mais que os detalhes
+        self.assertEqual([part['part_number'] for part in response.data['results']], ["12345", "99999"])
+
+        response = self.client.get(self.url, {'search': '67890'})
+        self.assertEqual([part['part_number'] for part in response.data['results']], ["67890"])
+
+        response = self.client.get(self.url, {'search': 'filtro -junta'})
+        self.assertEqual([part['part_number'] for part in response.data['results']], ["12345"])
+
+    # Teste de paginação por cursor dos resultados da busca textual, com relevâncias empatadas
+    @skipUnless(connection.vendor == 'postgresql', "Busca textual exige PostgreSQL")
+    def test_full_text_search_cursor_pagination_with_ties(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        for i in range(4):
+            Part.objects.create(part_number=f"FA-{i}", name="Filtro de ar", details="Filtro", price=10, quantity=1)
+        for i in range(3):
+            Part.objects.create(part_number=f"JT-{i}", name="Junta", details="Para filtros de óleo", price=10, quantity=1)
+        expected = [part['part_number'] for part in self.client.get(self.url, {'search': 'filtro'}).data['results']]
+        self.assertEqual(len(expected), 8)
+
+        response = self.client.get(self.url, {'search': 'filtro', 'pagination': 'cursor', 'page_size': 3})
+        seen = [part['part_number'] for part in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(part['part_number'] for part in response.data['results'])
+        self.assertEqual(seen, expected)
+
+        # Voltando pelo link 'previous' a partir da última página
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([part['part_number'] for part in response.data['results']], expected[3:6])
+
+    # Teste de sugestões por termo parcial em qualquer banco
+    def test_suggest_parts(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        response = self.client.get(reverse('part-suggest'), {'q': 'Bate'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([part['part_number'] for part in response.data['results']], ["67890"])
+
+    # Teste de sugestões sem termo ou com limite inválido (deve retornar erro 400)
+    def test_suggest_parts_with_invalid_params(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        response = self.client.get(reverse('part-suggest'), {'q': 'a'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('part-suggest'), {'q': 'Bateria', 'limit': 1000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Teste de sugestões por trigramas: part_number com separadores e nome com erro de digitação
+    @skipUnless(connection.vendor == 'postgresql', "Busca por trigramas exige PostgreSQL")
+    def test_suggest_parts_fuzzy(self):
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        Part.objects.create(part_number="ABC123", name="Parafuso", details="", price=1, quantity=1)
+
+        response = self.client.get(reverse('part-suggest'), {'q': 'abc-123'})
+        self.assertEqual(response.data['results'][0]['part_number'], "ABC123")
+        self.assertEqual(response.data['results'][0]['similarity'], 1.0)
+
+        response = self.client.get(reverse('part-suggest'), {'q': 'batera'})
+        self.assertEqual(response.data['results'][0]['part_number'], "67890")
@@ -0,0 +1,89 @@
+import json
+from unittest import skipUnless
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from automotivePartsManager.models import CarModel, CustomUser, Part, PartCarModel
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+# Testes dos planos de execução das listagens mais acessadas: com varreduras sequenciais e ordenações
+# desabilitadas, o planejador só as usa se nenhum índice atender a consulta
+@skipUnless(connection.vendor == 'postgresql', "Planos de execução exigem PostgreSQL")
+@override_settings(CHANGES_FEED_LAG_SECONDS=0)
+class QueryPlanTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="user@email.com",
+            username="user",
+            password="User!123",
+            role="user"
+        )
+        access_token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        parts = Part.objects.bulk_create(
+            Part(part_number=f"PN-{i}", name=f"Peça {i % 7}", details="", price=i, quantity=1) for i in range(30)
+        )
+        car_models = CarModel.objects.bulk_create(
+            CarModel(name=f"Modelo {i}", manufacturer="Fiat", year=2000 + i) for i in range(5)
+        )
+        PartCarModel.objects.bulk_create(
+            PartCarModel(part=part, car_model=car_model) for part in parts for car_model in car_models
+        )
+        self.part = parts[0]
+        self.car_model = car_models[0]
+
+    def assertIndexedPlans(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Exceto a autenticação e a consulta às transações abertas do feed de alterações (catálogo do sistema)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and CustomUser._meta.db_table not in query['sql']
+            and 'pg_stat_activity' not in query['sql']
+        ]
+        self.assertTrue(queries)
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+            for sql in queries:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                node_types = [node['Node Type'] for node in plan_nodes(plan[0]['Plan'])]
+                self.assertNotIn('Seq Scan', node_types, sql)
+                self.assertNotIn('Sort', node_types, sql)
+        return response
+
+    # Teste da listagem de peças na ordem padrão, por preço e por cursor
+    def test_parts_list_plans(self):
+        self.assertIndexedPlans(reverse('part-list'))
+        self.assertIndexedPlans(reverse('part-list'), {'ordering': '-price'})
+        self.assertIndexedPlans(reverse('part-list'), {'name': 'Peça 3'})
+        response = self.assertIndexedPlans(reverse('part-list'), {'pagination': 'cursor'})
+        self.assertIndexedPlans(response.data['next'])
+
+    # Teste da listagem de modelos de carro na ordem padrão
+    def test_car_models_list_plans(self):
+        self.assertIndexedPlans(reverse('carmodel-list'))
+        self.assertIndexedPlans(reverse('carmodel-list'), {'manufacturer': 'Fiat'})
+
+    # Teste da listagem de associações e das consultas por peça e por modelo de carro
+    def test_fitment_lookup_plans(self):
+        self.assertIndexedPlans(reverse('partcarmodel-list'))
+        self.assertIndexedPlans(reverse('get-car-models-by-part'), {'part_id': self.part.id})
+        self.assertIndexedPlans(reverse('get-parts-by-car-model'), {'car_model_id': self.car_model.id})
+
+    # Teste do feed de alterações
+    def test_change_feed_plans(self):
+        self.assertIndexedPlans(reverse('changes'))